@@ -0,0 +1,72 @@
+"""Benchmark monthly aggregates over a fleet-sized event history.
+
+Fills a history database with a year of days for many users, then times
+HistoryStore.aggregate for one user's month.
+
+Usage:
+    uv run python -m benchmarks.bench_history
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+
+from src.calendar import Event
+from src.history import HistoryStore
+
+USERS = 200
+DAYS = 365
+EVENTS_PER_DAY = 6
+QUERIES = 200
+TZ = ZoneInfo("Europe/Berlin")
+PEOPLE = [f"person{index}@example.com" for index in range(50)]
+
+
+def day_events(day, rng):
+    events = []
+    for index in range(EVENTS_PER_DAY):
+        start = datetime(day.year, day.month, day.day, 8 + index, tzinfo=TZ)
+        events.append(
+            Event(
+                summary=f"Meeting {index}",
+                start=start,
+                end=start + timedelta(minutes=rng.choice((15, 30, 45, 60))),
+                attendees=rng.sample(PEOPLE, 3),
+                event_id=f"{day.isoformat()}-{index}",
+            )
+        )
+    return events
+
+
+def main():
+    logger.remove()
+    rng = random.Random(0)
+    first_day = date(2023, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+
+        started = time.perf_counter()
+        for user in range(USERS):
+            for offset in range(DAYS):
+                day = first_day + timedelta(days=offset)
+                store.record_day(f"user{user}", day, day_events(day, rng))
+        rows = USERS * DAYS * EVENTS_PER_DAY
+        print(f"recorded {rows:,} events in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        for _ in range(QUERIES):
+            store.aggregate(
+                f"user{rng.randrange(USERS)}", date(2023, 6, 1), date(2023, 6, 30)
+            )
+        elapsed = (time.perf_counter() - started) / QUERIES
+        print(f"monthly aggregate: {elapsed * 1000:.2f} ms/query")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark logging overhead per digest.
+
+Simulates the log calls made while producing one digest (service setup,
+fetch, per-event parsing and send) and compares the previous setup (eager
+f-strings, per-user init logs at INFO) with lazy formatting, an enqueued
+file sink and sampled per-event debug logs. Console
+output is left out so only the file sink is compared.
+
+Usage:
+    uv run python -m benchmarks.bench_logging
+"""
+
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+from src.logging_config import LogSampler
+
+EVENTS_PER_DIGEST = 50
+DIGESTS = 500
+
+
+def digest_eager():
+    logger.info(f"Digest formatter initialized for timezone: {'Europe/Berlin'}")
+    logger.info(f"Email sender initialized with sender: {'digest@example.com'}")
+    logger.info(f"Fetching events for {'2023-06-26'} in {'Europe/Berlin'}")
+    logger.info(f"Found {EVENTS_PER_DIGEST} events")
+    for index in range(EVENTS_PER_DIGEST):
+        logger.debug(f"Parsed event {index} starting {'2023-06-26T09:00'}")
+    logger.info(f"Returning {EVENTS_PER_DIGEST} filtered events")
+    logger.info(f"Email sent successfully to {'user@example.com'}, ID: {'abc'}")
+
+
+def digest_lazy(sampler):
+    logger.debug("Digest formatter initialized for timezone: {}", "Europe/Berlin")
+    logger.debug("Email sender initialized with sender: {}", "digest@example.com")
+    logger.info("Fetching events for {} in {}", "2023-06-26", "Europe/Berlin")
+    logger.info("Found {} events", EVENTS_PER_DIGEST)
+    for index in range(EVENTS_PER_DIGEST):
+        if sampler():
+            logger.debug("Parsed event {} starting {}", index, "2023-06-26T09:00")
+    logger.info("Returning {} filtered events", EVENTS_PER_DIGEST)
+    logger.info("Email sent successfully to {}, ID: {}", "user@example.com", "abc")
+
+
+def measure(name, func):
+    started = time.perf_counter()
+    for _ in range(DIGESTS):
+        func()
+    caller = time.perf_counter() - started
+    logger.complete()
+    total = time.perf_counter() - started
+    print(
+        f"{name:<40} {caller / DIGESTS * 1e6:>9.1f} us/digest in caller, "
+        f"{total / DIGESTS * 1e6:>9.1f} us/digest incl. flush"
+    )
+
+
+def run_with_sink(name, func, level="INFO", enqueue=False, log_dir="."):
+    logger.remove()
+    logger.add(f"{log_dir}/bench.log", level=level, enqueue=enqueue)
+    measure(name, func)
+
+
+def main():
+    sampler = LogSampler(every=100)
+    with tempfile.TemporaryDirectory() as log_dir:
+        run_with_sink(
+            "sync sink, eager f-strings (INFO)", digest_eager, log_dir=log_dir
+        )
+        run_with_sink(
+            "sync sink, lazy args (INFO)",
+            lambda: digest_lazy(sampler),
+            log_dir=log_dir,
+        )
+        run_with_sink(
+            "enqueued sink, lazy args (INFO)",
+            lambda: digest_lazy(sampler),
+            enqueue=True,
+            log_dir=log_dir,
+        )
+        run_with_sink(
+            "sync sink, unsampled (DEBUG)",
+            lambda: digest_lazy(lambda: True),
+            level="DEBUG",
+            log_dir=log_dir,
+        )
+        run_with_sink(
+            "sync sink, sampled 1/100 (DEBUG)",
+            lambda: digest_lazy(sampler),
+            level="DEBUG",
+            log_dir=log_dir,
+        )
+        logger.remove()
+    logger.add(sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
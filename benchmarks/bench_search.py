@@ -0,0 +1,83 @@
+"""Benchmark search latency over years of event history.
+
+Indexes three years of days for a fleet of users, then times
+SearchIndex.search for typical "who and what" queries.
+
+Usage:
+    uv run python -m benchmarks.bench_search
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+
+from src.calendar import Event
+from src.search import SearchIndex
+
+USERS = 50
+DAYS = 3 * 365
+EVENTS_PER_DAY = 6
+QUERIES = 500
+TZ = ZoneInfo("Europe/Berlin")
+PEOPLE = [f"person{index}@example.com" for index in range(200)]
+TOPICS = ["budget", "hiring", "roadmap", "launch", "retro", "planning", "design"]
+
+
+def day_events(day, rng):
+    events = []
+    for index in range(EVENTS_PER_DAY):
+        start = datetime(day.year, day.month, day.day, 8 + index, tzinfo=TZ)
+        topic = rng.choice(TOPICS)
+        events.append(
+            Event(
+                summary=f"{topic.title()} sync",
+                start=start,
+                end=start + timedelta(minutes=30),
+                attendees=rng.sample(PEOPLE, 3),
+                description=f"Notes on {topic} and {rng.choice(TOPICS)}",
+            )
+        )
+    return events
+
+
+def main():
+    logger.remove()
+    rng = random.Random(0)
+    first_day = date(2021, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, "history.db"))
+
+        started = time.perf_counter()
+        for user in range(USERS):
+            for offset in range(DAYS):
+                day = first_day + timedelta(days=offset)
+                index.index_day(f"user{user}", day, day_events(day, rng))
+        docs = USERS * DAYS * EVENTS_PER_DAY
+        print(f"indexed {docs:,} events in {time.perf_counter() - started:.1f}s")
+
+        for name, make_query in [
+            ("person + topic", lambda: f"{rng.choice(PEOPLE)} {rng.choice(TOPICS)}"),
+            ("topic only", lambda: rng.choice(TOPICS)),
+        ]:
+            latencies = []
+            for _ in range(QUERIES):
+                user = f"user{rng.randrange(USERS)}"
+                query = make_query()
+                started = time.perf_counter()
+                index.search(user, query)
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            print(
+                f"{name:<16} p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms, "
+                f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms"
+            )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark timezone conversion throughput on the event parse path.
+
+Compares the previous pytz-based path (timezone lookup per call, UTC parse
+then astimezone) with the cached zoneinfo backend used by CalendarService.
+
+Usage:
+    uv run python -m benchmarks.bench_timezones
+"""
+
+import timeit
+from datetime import datetime
+
+import pytz
+
+from src.timezones import get_timezone
+
+ZONES = ["Europe/Berlin", "America/New_York", "Asia/Tokyo", "Europe/London"]
+START_STRINGS = [f"2023-06-26T{hour:02d}:15:00Z" for hour in range(24)]
+NUMBER = 20
+
+
+def parse_with_pytz():
+    for zone in ZONES:
+        tz = pytz.timezone(zone)
+        for start_str in START_STRINGS:
+            datetime.fromisoformat(start_str.replace("Z", "+00:00")).astimezone(tz)
+
+
+def parse_with_zoneinfo():
+    for zone in ZONES:
+        tz = get_timezone(zone)
+        for start_str in START_STRINGS:
+            datetime.fromisoformat(start_str.replace("Z", "+00:00")).astimezone(tz)
+
+
+def lookup_with_pytz():
+    for zone in ZONES:
+        pytz.timezone(zone)
+
+
+def lookup_with_zoneinfo():
+    for zone in ZONES:
+        get_timezone(zone)
+
+
+def report(name, func, conversions_per_call):
+    best = min(timeit.repeat(func, number=NUMBER, repeat=5))
+    per_second = conversions_per_call * NUMBER / best
+    print(f"{name:<22} {per_second:>14,.0f} ops/s")
+
+
+def main():
+    conversions = len(ZONES) * len(START_STRINGS)
+    report("parse (pytz)", parse_with_pytz, conversions)
+    report("parse (zoneinfo)", parse_with_zoneinfo, conversions)
+    report("lookup (pytz)", lookup_with_pytz, len(ZONES))
+    report("lookup (zoneinfo)", lookup_with_zoneinfo, len(ZONES))
+
+
+if __name__ == "__main__":
+    main()
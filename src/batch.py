@@ -0,0 +1,345 @@
+"""Batch execution of digests for a roster of users."""
+
+import os
+import socket
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .checkpoint import BatchCheckpoint
+from .credentials import DEFAULT_WARM_AHEAD, CredentialManager
+from .deadlines import deadline_scope
+from .ledger import SendLedger
+from .resilience import CircuitOpenError
+from .roster import UserProfile
+from .sharding import ClaimTable, ShardRing
+from .timezones import LocalDay
+
+DEFAULT_RETRY_ROUNDS = 3
+# A digest sent within this long after DIGEST_HOUR still counts as on time
+DEFAULT_DELIVERY_GRACE = 15 * 60
+
+
+class BatchResult:
+    """Outcome of a batch run."""
+
+    def __init__(self):
+        self.sent: List[str] = []
+        self.failed: List[str] = []
+        self.skipped: List[str] = []
+        # Users still waiting on an open circuit when the run gave up
+        self.deferred: List[str] = []
+        # Seconds past its deadline of each digest sent late
+        self.late: Dict[str, float] = {}
+
+    @property
+    def success(self) -> bool:
+        """Return True if every user was sent or skipped."""
+        return not self.failed and not self.deferred
+
+
+class BatchRunner:
+    """Runs the digest workflow for many users, honouring shards and claims."""
+
+    def __init__(
+        self,
+        shared_config: Dict[str, Any],
+        profiles: List[UserProfile],
+        digest_factory: Callable[[Dict[str, Any]], Any],
+        shard: Optional[Tuple[int, int]] = None,
+        claims: Optional[ClaimTable] = None,
+        takeover: bool = False,
+        job: str = "daily",
+        ledger: Optional[SendLedger] = None,
+        checkpoint: Optional[BatchCheckpoint] = None,
+        due_only: bool = False,
+        retry_rounds: int = DEFAULT_RETRY_ROUNDS,
+        credential_manager: Optional[CredentialManager] = None,
+        delivery_grace: float = DEFAULT_DELIVERY_GRACE,
+        warm_ahead: int = DEFAULT_WARM_AHEAD,
+    ):
+        """
+        Initialize BatchRunner.
+
+        Args:
+            shared_config: Settings shared by all users.
+            profiles: Users to run.
+            digest_factory: Builds an OrbitDigest-like object from a user config.
+            shard: (index, count) of this runner, or None to run every user.
+            claims: Claim table preventing double sends across runners.
+            takeover: Also run users of shards without a live heartbeat.
+            job: Kind of digest being run; jobs other than "daily" are
+                claimed separately so they do not block the daily digest.
+            ledger: Send-once ledger; users whose full digest was already
+                sent today are skipped before any fetch.
+            checkpoint: Per-user stage file; a rerun after a crash resumes
+                each user from its last recorded stage.
+            due_only: Skip users whose local time has not reached their
+                digest_hour yet, for delivery runs started every hour.
+            retry_rounds: Times users deferred by an open circuit breaker
+                are retried once the circuit allows calls again.
+            credential_manager: Refreshes the access tokens of the users
+                to run in the background before their turn; users whose
+                refresh token was rejected are failed without a digest.
+            delivery_grace: Seconds after a user's digest_hour their digest
+                is due; sends after that are reported late.
+            warm_ahead: Number of upcoming users whose access tokens are
+                refreshed in the background while earlier users run.
+        """
+        self.shared_config = shared_config
+        self.profiles = profiles
+        self.digest_factory = digest_factory
+        self.shard = shard
+        self.claims = claims
+        self.takeover = takeover
+        self.job = job
+        self.ledger = ledger
+        self.checkpoint = checkpoint
+        self.due_only = due_only
+        self.retry_rounds = retry_rounds
+        self.credential_manager = credential_manager
+        self.delivery_grace = delivery_grace
+        self.warm_ahead = warm_ahead
+        self.retry_queue: Deque[Tuple[UserProfile, LocalDay]] = deque()
+        self._retry_at = 0.0
+        self.runner_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def run(self) -> BatchResult:
+        """
+        Run the digest for every user assigned to this runner.
+
+        Users run earliest deadline first, so users whose digest is due
+        soon never wait behind users due hours later; the local date is
+        still computed once per timezone. Users hitting an open circuit
+        breaker are queued and retried after the pass, once the circuit's
+        cooldown has passed.
+
+        Returns:
+            BatchResult listing sent, failed, skipped and deferred user ids.
+        """
+        result = BatchResult()
+        is_owned = self._owner_filter()
+
+        by_timezone: Dict[str, List[UserProfile]] = {}
+        for profile in self.profiles:
+            if not is_owned(profile.user_id):
+                result.skipped.append(profile.user_id)
+                continue
+            by_timezone.setdefault(profile.timezone, []).append(profile)
+
+        # (deadline, roster position, profile, day), earliest deadline first
+        queue: List[Tuple[float, int, UserProfile, LocalDay]] = []
+        for timezone_str, group in by_timezone.items():
+            day = LocalDay(timezone_str)
+            logger.debug(
+                "Running {} users in {} for {}", len(group), timezone_str, day.date
+            )
+            local_hour = datetime.now(day.tz).hour
+            for profile in group:
+                if self.due_only and local_hour < profile.digest_hour:
+                    result.skipped.append(profile.user_id)
+                    continue
+                queue.append((self.deadline(profile, day), len(queue), profile, day))
+        queue.sort()
+
+        # Summaries come from the history store and need no calendar access
+        warm = self.credential_manager is not None and not self.shared_config.get(
+            "aggregate_period"
+        )
+        if warm:
+            self._warm(queue[: self.warm_ahead])
+
+        for position, (deadline, _, profile, day) in enumerate(queue):
+            # Move the window of warm tokens along with the run
+            ahead = position + self.warm_ahead
+            if warm and ahead < len(queue):
+                self._warm([queue[ahead]])
+            self._record(result, profile, self.run_user(profile, day), deadline)
+
+        self._run_retry_queue(result)
+
+        logger.info(
+            "Batch finished: {} sent, {} failed, {} skipped, {} deferred",
+            len(result.sent),
+            len(result.failed),
+            len(result.skipped),
+            len(result.deferred),
+        )
+        if result.late:
+            logger.warning(
+                "{} of {} digests sent late, worst by {:.0f} min",
+                len(result.late),
+                len(result.sent),
+                max(result.late.values()) / 60,
+            )
+        return result
+
+    def deadline(self, profile: UserProfile, day: LocalDay) -> float:
+        """
+        Get the time a user's digest is due.
+
+        Args:
+            profile: User.
+            day: Today in the user's timezone.
+
+        Returns:
+            Unix time of the user's digest_hour today plus the grace period.
+        """
+        return day.at(profile.digest_hour).timestamp() + self.delivery_grace
+
+    def _warm(self, upcoming: List[Tuple[float, int, UserProfile, LocalDay]]) -> None:
+        tokens = {
+            profile.user_id: profile.google_refresh_token
+            for _, _, profile, _ in upcoming
+            if profile.google_refresh_token
+        }
+        if tokens:
+            self.credential_manager.warm(tokens)
+
+    def _record(
+        self, result: BatchResult, profile: UserProfile, status: str, deadline: float
+    ) -> None:
+        if status == "deferred":
+            return
+        getattr(result, status).append(profile.user_id)
+        lateness = time.time() - deadline
+        if status == "sent" and lateness > 0:
+            result.late[profile.user_id] = lateness
+
+    def _run_retry_queue(self, result: BatchResult) -> None:
+        for retry_round in range(1, self.retry_rounds + 1):
+            if not self.retry_queue:
+                return
+            wait = self._retry_at - time.monotonic()
+            logger.info(
+                "Retrying {} deferred users (round {}) in {:.0f}s",
+                len(self.retry_queue),
+                retry_round,
+                max(wait, 0),
+            )
+            if wait > 0:
+                time.sleep(wait)
+
+            pending, self.retry_queue = self.retry_queue, deque()
+            self._retry_at = 0.0
+            for profile, day in sorted(pending, key=lambda user: self.deadline(*user)):
+                status = self.run_user(profile, day)
+                self._record(result, profile, status, self.deadline(profile, day))
+
+        result.deferred = [profile.user_id for profile, _ in self.retry_queue]
+        if result.deferred:
+            logger.error(
+                "Gave up on {} users deferred by open circuits", len(result.deferred)
+            )
+
+    def run_user(self, profile: UserProfile, day: Optional[LocalDay] = None) -> str:
+        """
+        Run the digest for one user under a claim.
+
+        Args:
+            profile: User to run.
+            day: Today in the user's timezone (computed if None).
+
+        Returns:
+            "sent", "failed", "skipped" or "deferred" (queued for retry
+            because a provider's circuit is open).
+        """
+        # Long runs must not look dead to shards that may take over
+        self._heartbeat()
+        if day is None:
+            day = LocalDay(profile.timezone)
+        run_date = day.date.isoformat()
+        if self._already_sent(profile, run_date):
+            logger.info("Digest for {} on {} already sent", profile.user_id, run_date)
+            return "skipped"
+        # Update mode sends again on each hourly run, so its claim and
+        # checkpoint only cover the current local hour
+        if self.shared_config.get("digest_mode", "full") == "update":
+            run_date = f"{run_date}T{datetime.now(day.tz).hour:02d}"
+
+        # Read before claiming, as this path neither completes nor releases
+        user_checkpoint = None
+        if self.checkpoint is not None:
+            user_checkpoint = self.checkpoint.user(profile.user_id, run_date)
+            if user_checkpoint.stage == "sent":
+                logger.info("Digest for {} already sent in this run", profile.user_id)
+                return "skipped"
+
+        if self.job != "daily":
+            run_date = f"{run_date}:{self.job}"
+        if self.credential_manager is not None:
+            error = self.credential_manager.revoked(profile.google_refresh_token)
+            if error is not None:
+                logger.error(
+                    "Skipping {}: refresh token was rejected ({})",
+                    profile.user_id,
+                    error,
+                )
+                return "failed"
+
+        if self.claims is not None and not self.claims.claim(
+            profile.user_id, run_date, self.runner_id
+        ):
+            logger.info(
+                "Digest for {} on {} already claimed", profile.user_id, run_date
+            )
+            return "skipped"
+
+        success = False
+        try:
+            digest = self.digest_factory(profile.to_config(self.shared_config))
+            # API timeouts of this user's calls are capped by its deadline;
+            # a user already late (e.g. in a rerun after an outage) gets the
+            # normal timeouts, as there is no deadline left to protect
+            deadline: Optional[float] = self.deadline(profile, day)
+            if deadline <= time.time():
+                deadline = None
+            with deadline_scope(deadline):
+                success = digest.run_digest(checkpoint=user_checkpoint, day=day)
+        except CircuitOpenError as e:
+            logger.warning("Deferring {}: {}", profile.user_id, e)
+            self.retry_queue.append((profile, day))
+            self._retry_at = max(self._retry_at, time.monotonic() + e.retry_after)
+            return "deferred"
+        except Exception as e:
+            logger.error("Error running digest for {}: {}", profile.user_id, e)
+        finally:
+            if self.claims is not None:
+                if success:
+                    self.claims.complete(profile.user_id, run_date)
+                else:
+                    self.claims.release(profile.user_id, run_date, self.runner_id)
+
+        return "sent" if success else "failed"
+
+    def _already_sent(self, profile: UserProfile, run_date: str) -> bool:
+        # Update mode may send several updates a day, so only full digests
+        # are known to be finished once the ledger has them
+        if (
+            self.ledger is None
+            or self.job != "daily"
+            or self.shared_config.get("digest_mode", "full") != "full"
+        ):
+            return False
+        return self.ledger.is_sent(profile.email_recipient, run_date, "digest")
+
+    def _heartbeat(self) -> None:
+        if self.shard is not None and self.claims is not None:
+            self.claims.heartbeat(self.shard[0])
+
+    def _owner_filter(self) -> Callable[[str], bool]:
+        if self.shard is None:
+            return lambda user_id: True
+
+        shard_index, shard_count = self.shard
+        live_shards = None
+        if self.claims is not None:
+            self._heartbeat()
+            if self.takeover:
+                live_shards = self.claims.live_shards() | {shard_index}
+
+        ring = ShardRing(shard_count)
+        return lambda user_id: ring.owner(user_id, live_shards) == shard_index
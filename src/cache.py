@@ -0,0 +1,173 @@
+"""Content-addressed cache for rendered digests."""
+
+import hashlib
+import json
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from .calendar import Event
+
+# Event fields that affect the rendered digest; ids and etags do not.
+RENDERED_FIELDS = ("summary", "start", "end", "location", "attendees", "description")
+
+
+def compute_digest_key(
+    events: List[Event], template_version: str, context: str = ""
+) -> str:
+    """
+    Compute a content hash for a digest.
+
+    Events are normalized and sorted so that the key only changes when the
+    rendered output would change.
+
+    Args:
+        events: Events that make up the digest.
+        template_version: Version of the formatter template.
+        context: Extra rendering context (e.g. header date and timezone).
+
+    Returns:
+        Hex-encoded SHA-256 digest key.
+    """
+    normalized = sorted(
+        (_rendered_fields(event) for event in events),
+        key=lambda item: (item["start"], item["end"], item["summary"]),
+    )
+    payload = json.dumps(
+        {"template": template_version, "context": context, "events": normalized},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _rendered_fields(event: Event) -> Dict[str, Any]:
+    data = event.to_dict()
+    return {field: data[field] for field in RENDERED_FIELDS}
+
+
+class DigestCache:
+    """File-backed cache of rendered digests and last delivered digest keys."""
+
+    LAST_SENT_FILE = "last_sent.json"
+
+    def __init__(self, cache_dir: str, max_entries: int = 256):
+        """
+        Initialize DigestCache.
+
+        Args:
+            cache_dir: Directory used to store rendered digests.
+            max_entries: Maximum number of rendered digests kept on disk.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+        self._last_sent: Optional[Dict[str, str]] = None
+
+    def key_for(
+        self, events: List[Event], template_version: str, day: date, timezone_str: str
+    ) -> str:
+        """
+        Compute the cache key for a digest rendered on a given day.
+
+        Args:
+            events: Events that make up the digest.
+            template_version: Version of the formatter template.
+            day: Date shown in the digest header.
+            timezone_str: IANA timezone string of the digest.
+
+        Returns:
+            Hex-encoded digest key.
+        """
+        context = f"{day.isoformat()}|{timezone_str}"
+        return compute_digest_key(events, template_version, context)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a rendered digest from the cache.
+
+        Args:
+            key: Digest key.
+
+        Returns:
+            Rendered digest, or None if not cached.
+        """
+        try:
+            with open(self._body_path(key), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, body: str) -> None:
+        """
+        Store a rendered digest in the cache.
+
+        Args:
+            key: Digest key.
+            body: Rendered digest.
+        """
+        self._write_atomic(self._body_path(key), body)
+        self._prune()
+
+    def is_last_sent(self, recipient: str, key: str) -> bool:
+        """
+        Check whether a digest is identical to the last one delivered.
+
+        Args:
+            recipient: Email address of the recipient.
+            key: Digest key.
+
+        Returns:
+            True if the last delivered digest had the same key.
+        """
+        return self._load_last_sent().get(recipient) == key
+
+    def mark_sent(self, recipient: str, key: str) -> None:
+        """
+        Record the key of the digest delivered to a recipient.
+
+        Args:
+            recipient: Email address of the recipient.
+            key: Digest key.
+        """
+        last_sent = self._load_last_sent()
+        last_sent[recipient] = key
+        self._write_atomic(
+            os.path.join(self.cache_dir, self.LAST_SENT_FILE), json.dumps(last_sent)
+        )
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _load_last_sent(self) -> Dict[str, str]:
+        if self._last_sent is None:
+            path = os.path.join(self.cache_dir, self.LAST_SENT_FILE)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._last_sent = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._last_sent = {}
+        return self._last_sent
+
+    def _write_atomic(self, path: str, content: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _prune(self) -> None:
+        bodies = [
+            entry
+            for entry in os.scandir(self.cache_dir)
+            if entry.is_file() and entry.name.endswith(".txt")
+        ]
+        excess = len(bodies) - self.max_entries
+        if excess <= 0:
+            return
+
+        bodies.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in bodies[:excess]:
+            os.remove(entry.path)
+        logger.debug(f"Pruned {excess} cached digests")
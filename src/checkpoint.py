@@ -0,0 +1,188 @@
+"""Checkpoint file letting an interrupted batch run resume per user."""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .calendar import Event
+
+
+class UserCheckpoint:
+    """Progress of one user within a checkpointed batch run."""
+
+    def __init__(
+        self, batch: "BatchCheckpoint", user_id: str, local_date: Optional[str] = None
+    ):
+        """
+        Initialize UserCheckpoint.
+
+        Args:
+            batch: Checkpoint file the progress is written to.
+            user_id: User identifier.
+            local_date: The user's local date (ISO format) the run is for.
+        """
+        self.batch = batch
+        self.user_id = user_id
+        self.local_date = local_date
+        self.stage: Optional[str] = None
+        self.events: Optional[List[Event]] = None
+        self.content: Optional[str] = None
+
+    def record_fetched(self, events: List[Event]) -> None:
+        """
+        Record the fetched events so a resumed run does not refetch them.
+
+        Args:
+            events: Events returned by the calendar.
+        """
+        self.stage = "fetched"
+        self.events = events
+        self._append("fetched", events=[event.to_dict() for event in events])
+
+    def record_rendered(self, content: str) -> None:
+        """
+        Record the rendered digest so a resumed run only has to send it.
+
+        Args:
+            content: Rendered digest.
+        """
+        self.stage = "rendered"
+        self.content = content
+        self._append("rendered", content=content)
+
+    def record_sent(self) -> None:
+        """Record that the user's digest was delivered."""
+        self.stage = "sent"
+        # Intermediate results are no longer needed
+        self.events = None
+        self.content = None
+        self._append("sent")
+
+    def _append(self, stage: str, **fields: Any) -> None:
+        self.batch.append(
+            {"user": self.user_id, "date": self.local_date, "stage": stage, **fields}
+        )
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        stage = record["stage"]
+        if stage == "fetched":
+            self.events = [Event.from_dict(data) for data in record["events"]]
+        elif stage == "rendered":
+            self.content = record["content"]
+        elif stage == "sent":
+            self.events = None
+            self.content = None
+        self.stage = stage
+
+
+class BatchCheckpoint:
+    """Append-only JSON lines file of per-user stages for one batch job.
+
+    The first line names the job; a file left over from a different job is
+    discarded. Progress is kept per user and local date, so users east and
+    west of UTC resume the day they are in. Each stage is appended and
+    synced before the next one starts, and a line torn by a crash is
+    ignored. Reopening the file drops days no user can still be in.
+    """
+
+    def __init__(self, path: str, run_key: str):
+        """
+        Open or create a checkpoint.
+
+        Args:
+            path: Checkpoint file path.
+            run_key: Identifier of the job, e.g. "daily" or "prepare".
+        """
+        self.path = path
+        self.run_key = run_key
+        self._users: Dict[Tuple[str, Optional[str]], UserCheckpoint] = {}
+
+        records = self._load()
+        if records:
+            logger.info(
+                "Resuming run {} from checkpoint: {} users in progress or done",
+                run_key,
+                len(self._users),
+            )
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Rewritten without stale days and torn lines, then appended to
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in [{"run": run_key}] + records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().split("\n")
+        except FileNotFoundError:
+            return []
+
+        try:
+            header = json.loads(lines[0])
+        except (json.JSONDecodeError, IndexError):
+            return []
+        if header.get("run") != self.run_key:
+            logger.info(
+                "Checkpoint belongs to run {}, starting fresh", header.get("run")
+            )
+            return []
+
+        # Every timezone's date is at least yesterday in UTC
+        oldest = (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
+        records = []
+        for line in lines[1:]:
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Ignoring torn checkpoint line")
+                continue
+            if record.get("date") is not None and record["date"] < oldest:
+                continue
+            self.user(record["user"], record.get("date"))._apply(record)
+            records.append(record)
+        return records
+
+    def user(self, user_id: str, local_date: Optional[str] = None) -> UserCheckpoint:
+        """
+        Get the progress of a user, creating an empty entry if needed.
+
+        Args:
+            user_id: User identifier.
+            local_date: The user's local date (ISO format); progress of
+                another date is not reused.
+
+        Returns:
+            UserCheckpoint for the user and date.
+        """
+        key = (user_id, local_date)
+        checkpoint = self._users.get(key)
+        if checkpoint is None:
+            checkpoint = self._users[key] = UserCheckpoint(self, user_id, local_date)
+        return checkpoint
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Durably append a record.
+
+        Args:
+            record: JSON-serializable record.
+        """
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Close the checkpoint file."""
+        self._file.close()
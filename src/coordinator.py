@@ -0,0 +1,174 @@
+"""Single-flight fetching of calendars shared by several users."""
+
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .calendar import Event
+
+# Calendar access roles from least to most privileged
+ACCESS_ROLES = ("freeBusyReader", "reader", "writer", "owner")
+PRIVATE_VISIBILITY = ("private", "confidential")
+
+FlightKey = Tuple[str, datetime, datetime, str]
+
+
+def role_rank(role: Optional[str]) -> int:
+    """
+    Rank an access role.
+
+    Args:
+        role: Google Calendar access role.
+
+    Returns:
+        Index in ACCESS_ROLES, or -1 for unknown roles.
+    """
+    try:
+        return ACCESS_ROLES.index(role)
+    except ValueError:
+        return -1
+
+
+def visible_copy(event: Event, role: str) -> Event:
+    """
+    Copy an event as a subscriber with the given role would see it.
+
+    Free/busy readers only see busy blocks; readers see private and
+    confidential events as busy blocks too.
+
+    Args:
+        event: Event fetched with at least the subscriber's access.
+        role: Subscriber's access role on the calendar.
+
+    Returns:
+        New Event the subscriber may modify freely.
+    """
+    rank = role_rank(role)
+    hidden = rank <= role_rank("freeBusyReader") or (
+        rank < role_rank("writer") and event.visibility in PRIVATE_VISIBILITY
+    )
+    if hidden:
+        return Event(
+            summary="Busy",
+            start=event.start,
+            end=event.end,
+            event_id=event.event_id,
+            etag=event.etag,
+            ical_uid=event.ical_uid,
+            recurring_event_id=event.recurring_event_id,
+            visibility=event.visibility,
+        )
+
+    return Event(
+        summary=event.summary,
+        start=event.start,
+        end=event.end,
+        location=event.location,
+        attendees=list(event.attendees),
+        description=event.description,
+        event_id=event.event_id,
+        etag=event.etag,
+        ical_uid=event.ical_uid,
+        recurring_event_id=event.recurring_event_id,
+        organizer_copy=event.organizer_copy,
+        visibility=event.visibility,
+    )
+
+
+class _Flight:
+    """A fetch of one (calendar, window, timezone), shared by its callers."""
+
+    __slots__ = ("done", "events", "role", "error")
+
+    def __init__(self, role: str):
+        self.done = threading.Event()
+        self.events: Optional[List[Event]] = None
+        self.role = role
+        self.error: Optional[BaseException] = None
+
+
+class FetchCoordinator:
+    """Fetches each shared (calendar, window) once per run and fans it out.
+
+    The first subscriber to ask fetches with its own credentials; callers
+    asking while that fetch runs wait for it. Every subscriber gets its own
+    copy, redacted to its access role. A subscriber with more access than
+    the one who fetched refetches, so nobody sees less than Google would
+    show them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[FlightKey, _Flight] = {}
+        self.fetches = 0
+        self.shared = 0
+
+    def get_events(
+        self,
+        calendar_id: str,
+        start: datetime,
+        end: datetime,
+        timezone_str: str,
+        role: str,
+        fetch: Callable[[], List[Event]],
+    ) -> List[Event]:
+        """
+        Get a shared calendar's events for a window, fetching at most once.
+
+        Args:
+            calendar_id: Shared calendar id.
+            start: Window start (timezone-aware).
+            end: Window end (timezone-aware).
+            timezone_str: Timezone the events are parsed in.
+            role: Caller's access role on the calendar.
+            fetch: Fetches and parses the window with the caller's credentials.
+
+        Returns:
+            Events visible to the caller.
+        """
+        key = (calendar_id, start, end, timezone_str)
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None or (
+                    flight.done.is_set()
+                    and flight.error is None
+                    and role_rank(flight.role) < role_rank(role)
+                )
+                if leader:
+                    flight = self._flights[key] = _Flight(role)
+
+            if leader:
+                try:
+                    flight.events = fetch()
+                except BaseException as e:
+                    flight.error = e
+                    with self._lock:
+                        # Let the next subscriber try again
+                        if self._flights.get(key) is flight:
+                            del self._flights[key]
+                    raise
+                finally:
+                    flight.done.set()
+                with self._lock:
+                    self.fetches += 1
+                break
+
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if role_rank(flight.role) >= role_rank(role):
+                with self._lock:
+                    self.shared += 1
+                logger.debug("Serving {} from a shared fetch", calendar_id)
+                break
+            # Fetched with less access than ours; loop to refetch
+
+        return [visible_copy(event, role) for event in flight.events]
+
+    def clear(self) -> None:
+        """Forget all fetched windows."""
+        with self._lock:
+            self._flights.clear()
@@ -0,0 +1,219 @@
+"""Parallel warmup and refresh-ahead of Google OAuth credentials."""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from loguru import logger
+
+from .profiling import stage
+from .resilience import NO_RETRY, CircuitBreaker, RetryPolicy
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
+
+DEFAULT_REFRESH_AHEAD = timedelta(minutes=5)
+DEFAULT_REFRESH_WORKERS = 8
+# Users ahead of the current one whose tokens are kept warm
+DEFAULT_WARM_AHEAD = 2 * DEFAULT_REFRESH_WORKERS
+
+
+class _Entry:
+    """Credentials of one refresh token and its refresh in flight."""
+
+    __slots__ = ("label", "credentials", "future", "error")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.credentials: Optional[Credentials] = None
+        self.future: Optional[Future] = None
+        self.error: Optional[RefreshError] = None
+
+
+class CredentialManager:
+    """Refreshes access tokens for a fleet of users off the critical path.
+
+    warm() starts refreshing the tokens of the next few users on a worker
+    pool, so they are ready by the time each user's digest runs; a batch
+    warms a sliding window ahead of the user running, so no token is
+    fetched long before it is used. get() hands out ready credentials. A
+    token close to expiry is still handed out while a fresh one is
+    fetched in the background; only missing or expired tokens make the
+    caller wait.
+
+    A refresh token Google rejects is remembered and reported as soon as
+    the warmup finds it, so the user can be skipped without building a
+    digest. Transient failures are not remembered; the next get() retries.
+    Every refresh builds new Credentials, so objects already handed out
+    are never changed underneath their users.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        refresh_ahead: timedelta = DEFAULT_REFRESH_AHEAD,
+        max_workers: int = DEFAULT_REFRESH_WORKERS,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Initialize CredentialManager.
+
+        Args:
+            client_id: Google OAuth client ID.
+            client_secret: Google OAuth client secret.
+            refresh_ahead: Tokens expiring within this margin are refreshed
+                in the background.
+            max_workers: Refreshes running in parallel.
+            retry_policy: Retries transient token endpoint failures.
+            circuit_breaker: Breaker of the Google APIs, shared with the
+                calendar calls.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_ahead = refresh_ahead
+        self.retry_policy = retry_policy or NO_RETRY
+        self.circuit_breaker = circuit_breaker
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="token-refresh"
+        )
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def warm(self, refresh_tokens: Dict[str, str]) -> None:
+        """
+        Start refreshing the tokens of upcoming users in the background.
+
+        Tokens that are fresh, already refreshing or rejected are skipped.
+
+        Args:
+            refresh_tokens: Refresh token of each user id, in the order the
+                users will run.
+        """
+        warming = 0
+        for label, refresh_token in refresh_tokens.items():
+            with self._lock:
+                entry = self._entries.get(refresh_token)
+                if entry is None:
+                    entry = self._entries[refresh_token] = _Entry(label)
+                if entry.error is not None or entry.future is not None:
+                    continue
+                if entry.credentials is not None:
+                    remaining = self._remaining(entry.credentials)
+                    if remaining is None or remaining > self.refresh_ahead:
+                        continue
+            self._refresh_async(refresh_token)
+            warming += 1
+        if warming:
+            logger.debug("Warming {} access tokens", warming)
+
+    def get(self, refresh_token: str) -> Credentials:
+        """
+        Get valid credentials for a refresh token.
+
+        Args:
+            refresh_token: Google OAuth refresh token.
+
+        Returns:
+            Credentials with a current access token.
+
+        Raises:
+            RefreshError: If Google rejected the refresh token.
+            CircuitOpenError: If the Google APIs circuit is open.
+            Exception: If the refresh failed for another reason.
+        """
+        with self._lock:
+            entry = self._entries.get(refresh_token)
+            if entry is None:
+                entry = self._entries[refresh_token] = _Entry("on demand")
+            if entry.error is not None:
+                raise entry.error
+            credentials = entry.credentials
+            future = entry.future
+
+        if credentials is not None:
+            remaining = self._remaining(credentials)
+            if remaining is None or remaining > self.refresh_ahead:
+                return credentials
+            if remaining > timedelta(0):
+                # Still usable; refresh for the next caller
+                self._refresh_async(refresh_token)
+                return credentials
+
+        # Only the wait shows in profiles; the refresh runs on a worker
+        with stage("token_refresh"):
+            if future is None:
+                future = self._refresh_async(refresh_token)
+            return future.result()
+
+    def revoked(self, refresh_token: str) -> Optional[RefreshError]:
+        """
+        Check whether a refresh was rejected, without waiting.
+
+        Args:
+            refresh_token: Google OAuth refresh token.
+
+        Returns:
+            The refresh error if Google rejected the token, else None
+            (including while its refresh is still running).
+        """
+        with self._lock:
+            entry = self._entries.get(refresh_token)
+            return entry.error if entry is not None else None
+
+    def shutdown(self) -> None:
+        """Stop the refresh workers without waiting for queued refreshes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _refresh_async(self, refresh_token: str) -> "Future[Credentials]":
+        with self._lock:
+            entry = self._entries[refresh_token]
+            if entry.future is None:
+                entry.future = self._executor.submit(self._refresh, refresh_token)
+            return entry.future
+
+    def _refresh(self, refresh_token: str) -> Credentials:
+        entry = self._entries[refresh_token]
+        credentials = Credentials(
+            None,
+            refresh_token=refresh_token,
+            token_uri=TOKEN_URI,
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+            scopes=SCOPES,
+        )
+        try:
+            self.retry_policy.call(
+                lambda: credentials.refresh(Request()), self.circuit_breaker
+            )
+        except RefreshError as e:
+            logger.error("Refresh token of {} was rejected: {}", entry.label, e)
+            with self._lock:
+                entry.error = e
+                entry.future = None
+            raise
+        except Exception:
+            with self._lock:
+                entry.future = None
+            raise
+
+        with self._lock:
+            entry.credentials = credentials
+            entry.future = None
+            self.refreshes += 1
+        return credentials
+
+    @staticmethod
+    def _remaining(credentials: Credentials) -> Optional[timedelta]:
+        if credentials.expiry is None:
+            return None
+        # google-auth keeps expiry as naive UTC
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - now
@@ -0,0 +1,61 @@
+"""Per-user delivery deadlines propagated to API call timeouts."""
+
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# No call is given less than this, even past the deadline, so a late
+# digest can still go out
+MIN_CALL_TIMEOUT = 5.0
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[None]:
+    """
+    Set the deadline of the work done in a block.
+
+    Args:
+        deadline: Unix time the work should be finished by, or None.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    Get the time left before the current deadline.
+
+    Returns:
+        Seconds left (negative once passed), or None without a deadline.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def cap_timeout(timeout: float, floor: float = MIN_CALL_TIMEOUT) -> float:
+    """
+    Shorten a call timeout to the time left before the current deadline.
+
+    A call that would outlast the deadline holds up users whose digests
+    can still be on time, so it gets at most the time left, but never
+    less than floor.
+
+    Args:
+        timeout: Timeout the call would otherwise use, in seconds.
+        floor: Smallest timeout handed out.
+
+    Returns:
+        Timeout in seconds.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    return min(timeout, max(left, floor))
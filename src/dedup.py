@@ -0,0 +1,74 @@
+"""Deduplication of events merged from several calendars."""
+
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    # calendar.py applies the dedup stage, so import Event for typing only
+    from .calendar import Event
+
+
+def dedup_key(event: "Event") -> Optional[Tuple[Hashable, ...]]:
+    """
+    Build the identity of a meeting across calendars.
+
+    Every copy of a meeting shares its iCalUID; instances of a recurring
+    series also share it, so the start time tells them apart. Aware
+    datetimes compare in UTC, so copies in different calendar timezones
+    still match.
+
+    Args:
+        event: Event to key.
+
+    Returns:
+        Hashable key, or None if the event carries no identifier.
+    """
+    uid = event.ical_uid or event.recurring_event_id or event.event_id
+    if uid is None:
+        return None
+    return (uid, event.start)
+
+
+def dedupe_events(events: List["Event"]) -> List["Event"]:
+    """
+    Collapse copies of the same meeting into one event.
+
+    Runs in a single pass over a hash index, so it stays O(n) in events
+    plus attendees. The organizer's copy wins; attendee lists of all
+    copies are merged in first-seen order. Output keeps input order.
+
+    Args:
+        events: Events from one or more calendars.
+
+    Returns:
+        Deduplicated events.
+    """
+    result: List["Event"] = []
+    index: Dict[Tuple[Hashable, ...], Tuple[int, Set[str]]] = {}
+
+    for event in events:
+        key = dedup_key(event)
+        if key is None:
+            result.append(event)
+            continue
+
+        entry = index.get(key)
+        if entry is None:
+            index[key] = (len(result), set(event.attendees))
+            result.append(event)
+            continue
+
+        position, seen = entry
+        kept = result[position]
+        attendees = kept.attendees
+        for attendee in event.attendees:
+            if attendee not in seen:
+                seen.add(attendee)
+                attendees.append(attendee)
+
+        if event.organizer_copy and not kept.organizer_copy:
+            event.attendees = attendees
+            result[position] = event
+        else:
+            kept.attendees = attendees
+
+    return result
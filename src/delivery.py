@@ -0,0 +1,364 @@
+"""Pluggable email delivery backends."""
+
+import asyncio
+import hashlib
+import smtplib
+import threading
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from typing import Any, Dict, List, Optional
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from .deadlines import cap_timeout
+
+BACKENDS = ("resend", "smtp")
+SMTP_SECURITY = ("starttls", "ssl", "none")
+DEFAULT_SMTP_PORTS = {"starttls": 587, "ssl": 465, "none": 25}
+DEFAULT_SMTP_POOL_SIZE = 4
+# Servers commonly cap messages per session; reconnect before hitting it
+DEFAULT_SMTP_MESSAGES_PER_CONNECTION = 500
+
+RESEND_API_URL = "https://api.resend.com"
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_HTTP_TIMEOUT = 30
+
+
+class DeliveryError(Exception):
+    """Raised when a provider rejects or fails to accept an email."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class DeliveryBackend:
+    """Interface of email delivery backends.
+
+    Backends are shared by every EmailSender of a run and must be safe to
+    use from several threads.
+    """
+
+    def send(self, sender: str, recipient: str, subject: str, body: str) -> str:
+        """
+        Send a plain-text email.
+
+        Args:
+            sender: Email address to send from.
+            recipient: Email address to send to.
+            subject: Email subject.
+            body: Email body (plain text).
+
+        Returns:
+            Provider message id ("" if the provider returned none).
+
+        Raises:
+            Exception: If the email could not be sent.
+        """
+        raise NotImplementedError
+
+    async def send_async(
+        self, sender: str, recipient: str, subject: str, body: str
+    ) -> str:
+        """
+        Send a plain-text email without blocking the event loop.
+
+        The blocking send runs in the default executor, so many sends can
+        be awaited concurrently up to the backend's connection pool size.
+
+        Args:
+            sender: Email address to send from.
+            recipient: Email address to send to.
+            subject: Email subject.
+            body: Email body (plain text).
+
+        Returns:
+            Provider message id ("" if the provider returned none).
+        """
+        return await asyncio.to_thread(self.send, sender, recipient, subject, body)
+
+    def close(self) -> None:
+        """Release connections held by the backend."""
+
+
+class ResendBackend(DeliveryBackend):
+    """Delivery through the Resend HTTP API.
+
+    Each backend has its own API key and HTTP session, so backends for
+    different accounts or sending domains can be used side by side. The
+    session's connection pool keeps TLS connections to the API open
+    between sends and is shared safely by all threads using the backend.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = RESEND_API_URL,
+        pool_size: int = DEFAULT_HTTP_POOL_SIZE,
+        timeout: float = DEFAULT_HTTP_TIMEOUT,
+    ):
+        """
+        Initialize ResendBackend.
+
+        Args:
+            api_key: Resend API key.
+            base_url: API root URL.
+            pool_size: Maximum number of open connections to the API.
+            timeout: Request timeout in seconds.
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+                "User-Agent": "orbit-digest",
+            }
+        )
+
+    def send(self, sender: str, recipient: str, subject: str, body: str) -> str:
+        # A retry after a timeout may repeat a send the API already
+        # accepted; the same key makes Resend drop the duplicate
+        idempotency_key = hashlib.sha256(
+            "\0".join((sender, recipient, subject, body)).encode("utf-8")
+        ).hexdigest()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/emails",
+                json={
+                    "from": sender,
+                    "to": [recipient],
+                    "subject": subject,
+                    "text": body,
+                },
+                headers={"Idempotency-Key": idempotency_key},
+                timeout=cap_timeout(self.timeout),
+            )
+        except requests.RequestException as e:
+            raise DeliveryError(f"Resend request failed: {e}") from e
+
+        if response.status_code >= 400:
+            raise DeliveryError(
+                f"Resend returned {response.status_code}: {_error_message(response)}",
+                status_code=response.status_code,
+            )
+        # The email is accepted at this point; an unreadable body must not
+        # turn the send into a failure that is then sent again
+        try:
+            data = response.json()
+        except ValueError:
+            logger.warning("Resend accepted the email without a readable id")
+            return ""
+        return (data.get("id") if isinstance(data, dict) else None) or ""
+
+    def close(self) -> None:
+        """Close the HTTP session and its pooled connections."""
+        self.session.close()
+
+
+def _error_message(response: requests.Response) -> str:
+    try:
+        return response.json().get("message") or response.text
+    except ValueError:
+        return response.text
+
+
+class SMTPBackend(DeliveryBackend):
+    """Delivery through an SMTP relay over a pool of persistent connections.
+
+    Connections are opened, secured and authenticated once, then reused
+    for many messages. A connection the server has dropped is replaced and
+    the message retried once on the new connection.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        security: str = "starttls",
+        pool_size: int = DEFAULT_SMTP_POOL_SIZE,
+        timeout: float = 30,
+        messages_per_connection: int = DEFAULT_SMTP_MESSAGES_PER_CONNECTION,
+    ):
+        """
+        Initialize SMTPBackend.
+
+        Args:
+            host: SMTP server host.
+            port: SMTP server port (defaults to the port of the security mode).
+            username: Login user, or None for an unauthenticated relay.
+            password: Login password.
+            security: "starttls", "ssl" (implicit TLS) or "none".
+            pool_size: Maximum number of open connections.
+            timeout: Socket timeout in seconds.
+            messages_per_connection: Messages sent before a connection is
+                recycled.
+
+        Raises:
+            ValueError: If security or pool_size is invalid.
+        """
+        if security not in SMTP_SECURITY:
+            raise ValueError(f"Invalid SMTP security: {security}")
+        if pool_size < 1:
+            raise ValueError(f"Invalid SMTP pool size: {pool_size}")
+
+        self.host = host
+        self.port = port or DEFAULT_SMTP_PORTS[security]
+        self.username = username
+        self.password = password
+        self.security = security
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.messages_per_connection = messages_per_connection
+
+        self._available = threading.Condition()
+        self._idle: List[smtplib.SMTP] = []
+        self._sent: Dict[int, int] = {}
+        self._open = 0
+        self.connections_opened = 0
+
+    def send(self, sender: str, recipient: str, subject: str, body: str) -> str:
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid()
+        message.set_content(body)
+
+        connection: Optional[smtplib.SMTP] = self._acquire()
+        try:
+            try:
+                self._set_timeout(connection)
+                connection.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # Idle connections time out on the server; retry once
+                logger.debug("SMTP connection to {} dropped, reconnecting", self.host)
+                self._discard(connection)
+                # Already given back; a failed reconnect must not discard it again
+                connection = None
+                connection = self._acquire()
+                self._set_timeout(connection)
+                connection.send_message(message)
+        except smtplib.SMTPRecipientsRefused:
+            # The session is still usable after a refused recipient
+            self._release(connection)
+            raise
+        except Exception:
+            if connection is not None:
+                self._discard(connection)
+            raise
+
+        self._release(connection)
+        return message["Message-ID"]
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            for connection in idle:
+                self._sent.pop(id(connection), None)
+            self._available.notify_all()
+        for connection in idle:
+            self._quit(connection)
+
+    def _acquire(self) -> smtplib.SMTP:
+        with self._available:
+            while not self._idle and self._open >= self.pool_size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._available:
+                self._open -= 1
+                self._available.notify()
+            raise
+
+    def _release(self, connection: smtplib.SMTP) -> None:
+        with self._available:
+            sent = self._sent.get(id(connection), 0) + 1
+            if sent < self.messages_per_connection:
+                self._sent[id(connection)] = sent
+                self._idle.append(connection)
+                self._available.notify()
+                return
+        self._discard(connection)
+
+    def _discard(self, connection: smtplib.SMTP) -> None:
+        with self._available:
+            self._sent.pop(id(connection), None)
+            self._open -= 1
+            self._available.notify()
+        self._quit(connection)
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.security == "ssl":
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.security == "starttls":
+                connection.starttls()
+                connection.ehlo()
+            if self.username:
+                connection.login(self.username, self.password or "")
+        except Exception:
+            self._quit(connection)
+            raise
+
+        with self._available:
+            self.connections_opened += 1
+        logger.debug("Opened SMTP connection to {}:{}", self.host, self.port)
+        return connection
+
+    def _set_timeout(self, connection: smtplib.SMTP) -> None:
+        # Pooled sockets outlive the user they were opened for
+        if connection.sock is not None:
+            connection.sock.settimeout(cap_timeout(self.timeout))
+
+    @staticmethod
+    def _quit(connection: smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+
+def backend_from_config(config: Dict[str, Any]) -> DeliveryBackend:
+    """
+    Create the delivery backend selected by the configuration.
+
+    Args:
+        config: Configuration with email_backend and its settings.
+
+    Returns:
+        DeliveryBackend instance.
+    """
+    if config.get("email_backend", "resend") == "smtp":
+        return SMTPBackend(
+            host=config["smtp_host"],
+            port=config.get("smtp_port"),
+            username=config.get("smtp_username"),
+            password=config.get("smtp_password"),
+            security=config.get("smtp_security", "starttls"),
+            pool_size=config.get("smtp_pool_size", DEFAULT_SMTP_POOL_SIZE),
+        )
+    return ResendBackend(config.get("resend_api_key"))
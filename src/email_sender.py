@@ -1,29 +1,53 @@
-"""Email sending via Resend API."""
+"""Email composition and sending through a delivery backend."""
 
-import re
 from datetime import datetime
 from typing import Optional
 
-import resend
 from loguru import logger
 
+from .delivery import DeliveryBackend, ResendBackend
+from .ledger import SendLedger, content_hash
+from .resilience import NO_RETRY, CircuitBreaker, CircuitOpenError, RetryPolicy
+from .utils import is_valid_email, today_in_timezone
 
-class EmailSender:
-    """Service for sending emails via Resend."""
 
-    def __init__(self, api_key: str, sender_email: str):
+class EmailSender:
+    """Service for sending digest emails."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        sender_email: str,
+        ledger: Optional[SendLedger] = None,
+        timezone_str: Optional[str] = None,
+        backend: Optional[DeliveryBackend] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
         """
         Initialize EmailSender.
 
         Args:
-            api_key: Resend API key.
+            api_key: Resend API key, used when no backend is given.
             sender_email: Email address to send from.
+            ledger: Send-once ledger; when set, a digest is sent at most
+                once per recipient and day.
+            timezone_str: Recipient's IANA timezone, used for the date in
+                subjects and the ledger.
+            backend: Delivery backend, usually shared by all senders of a
+                run (defaults to Resend with api_key).
+            retry_policy: Retries transient delivery failures (none if None).
+            circuit_breaker: Delivery breaker shared by a run; sends raise
+                CircuitOpenError while it is open.
         """
+        self.ledger = ledger
+        self.timezone_str = timezone_str
+        self.retry_policy = retry_policy or NO_RETRY
+        self.circuit_breaker = circuit_breaker
 
-        resend.api_key = api_key
-        self.client = resend
+        self.backend = backend if backend is not None else ResendBackend(api_key)
         self.sender_email = sender_email
-        logger.info(f"Email sender initialized with sender: {self.sender_email}")
+        logger.debug("Email sender initialized with sender: {}", self.sender_email)
 
     def send_email(self, recipient: str, subject: str, body: str) -> bool:
         """
@@ -36,38 +60,55 @@ class EmailSender:
 
         Returns:
             True if email sent successfully, False otherwise.
+
+        Raises:
+            CircuitOpenError: If the delivery circuit is open.
+        """
+        return self._deliver(recipient, subject, body) is not None
+
+    def _deliver(self, recipient: str, subject: str, body: str) -> Optional[str]:
+        """
+        Send an email and return the provider's message id.
+
+        Args:
+            recipient: Email address to send to.
+            subject: Email subject.
+            body: Email body (plain text).
+
+        Returns:
+            Message id ("" if the provider returned none), or None on failure.
+
+        Raises:
+            CircuitOpenError: If the delivery circuit is open, so the caller
+                can defer the send instead of counting it as failed.
         """
         # Validate inputs
         if not self._validate_email(recipient):
             logger.error(f"Invalid recipient email: {recipient}")
-            return False
+            return None
 
-        if not subject.strip():
+        # isspace() checks in place; strip() would copy large bodies
+        if not subject or subject.isspace():
             logger.error("Empty email subject")
-            return False
+            return None
 
-        if not body.strip():
+        if not body or body.isspace():
             logger.error("Empty email body")
-            return False
+            return None
 
         try:
-            response = self.client.Emails.send(
-                {
-                    "from": self.sender_email,
-                    "to": [recipient],
-                    "subject": subject,
-                    "text": body,
-                }
-            )
-
-            logger.info(
-                f"Email sent successfully to {recipient}, ID: {response.get('id')}"
+            message_id = self.retry_policy.call(
+                lambda: self.backend.send(self.sender_email, recipient, subject, body),
+                self.circuit_breaker,
             )
-            return True
+            logger.info("Email sent successfully to {}, ID: {}", recipient, message_id)
+            return message_id
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Failed to send email to {recipient}: {e}")
-            return False
+            return None
 
     def send_digest(self, recipient: str, content: str) -> bool:
         """
@@ -79,13 +120,74 @@ class EmailSender:
 
         Returns:
             True if email sent successfully, False otherwise.
+
+        Raises:
+            CircuitOpenError: If the delivery circuit is open; the ledger
+                claim is released first.
         """
-        # Generate subject with current date
-        today = datetime.now().strftime("%Y-%m-%d")
-        subject = f"Your schedule for today - {today}"
+        # Subject and ledger use the recipient's date, like the digest body
+        send_date = self._local_date()
+        subject = f"Your schedule for today - {send_date}"
+
+        if self.ledger is None:
+            return self.send_email(recipient, subject, content)
+
+        if not self.ledger.claim(recipient, send_date, "digest", content_hash(content)):
+            if self.ledger.is_sent(recipient, send_date, "digest"):
+                logger.info("Digest for {} already sent on {}", recipient, send_date)
+                return True
+            logger.warning("Digest for {} is being sent by another run", recipient)
+            return False
+
+        try:
+            message_id = self._deliver(recipient, subject, content)
+        except CircuitOpenError:
+            self.ledger.release(recipient, send_date, "digest")
+            raise
+        if message_id is None:
+            self.ledger.release(recipient, send_date, "digest")
+            return False
+
+        self.ledger.complete(recipient, send_date, "digest", message_id)
+        return True
+
+    def send_update(self, recipient: str, content: str) -> bool:
+        """
+        Send a "what changed" update email.
+
+        Args:
+            recipient: Email address to send to.
+            content: Update content.
+
+        Returns:
+            True if email sent successfully, False otherwise.
+        """
+        subject = f"Updates to your schedule - {self._local_date()}"
+
+        return self.send_email(recipient, subject, content)
+
+    def send_aggregate(self, recipient: str, content: str, period: str) -> bool:
+        """
+        Send a weekly or monthly meeting summary email.
+
+        Args:
+            recipient: Email address to send to.
+            content: Summary content.
+            period: "week" or "month".
+
+        Returns:
+            True if email sent successfully, False otherwise.
+        """
+        label = "weekly" if period == "week" else "monthly"
+        subject = f"Your {label} meeting summary - {self._local_date()}"
 
         return self.send_email(recipient, subject, content)
 
+    def _local_date(self) -> str:
+        if self.timezone_str:
+            return today_in_timezone(self.timezone_str).isoformat()
+        return datetime.now().date().isoformat()
+
     def _validate_email(self, email: str) -> bool:
         """
         Validate email address format.
@@ -96,9 +198,4 @@ class EmailSender:
         Returns:
             True if valid, False otherwise.
         """
-        if not email or not isinstance(email, str):
-            return False
-
-        # Basic email regex pattern
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return bool(re.match(pattern, email))
+        return is_valid_email(email)
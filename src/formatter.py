@@ -1,31 +1,82 @@
 """Message formatting for calendar digest."""
 
-from datetime import datetime
-from typing import List
+import io
+from datetime import date, datetime
+from functools import lru_cache
+from typing import List, Optional
 
 from .calendar import Event
+from .history import HistoryAggregate
+from .snapshot import EventDiff
+from .timezones import LocalDay, get_timezone
 from loguru import logger
 
+# Bump whenever the digest layout changes so cached renders are invalidated.
+TEMPLATE_VERSION = "2"
+
+DEFAULT_MAX_CHARS = 100_000
+DEFAULT_MAX_DESCRIPTION_CHARS = 1_000
+DEFAULT_MAX_ATTENDEES = 15
+
+EVENT_SEPARATOR = "\n<============================================================>\n\n"
+CLOSING = "\nHere's to a day full of wins, big and small!"
+# Room for the "... and N more events not shown." line
+MORE_EVENTS_RESERVE = 64
+
+
+@lru_cache(maxsize=64)
+def schedule_header(day: date) -> str:
+    """
+    Build the date line of a digest, shared by every digest of that day.
+
+    Args:
+        day: Local date of the digest.
+
+    Returns:
+        Header line including the trailing blank line.
+    """
+    return (
+        f"Here's your schedule for today ({day.strftime('%a')}, "
+        f"{day.strftime('%B')} {day.day}):\n\n"
+    )
+
 
 class DigestFormatter:
     """Formats calendar events into readable digest messages."""
 
-    def __init__(self, timezone_str: str):
+    def __init__(
+        self,
+        timezone_str: str,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        max_description_chars: int = DEFAULT_MAX_DESCRIPTION_CHARS,
+        max_attendees: int = DEFAULT_MAX_ATTENDEES,
+    ):
         """
         Initialize DigestFormatter.
 
         Args:
             timezone_str: IANA timezone string for formatting times.
+            max_chars: Size cap of a digest; events that do not fit are
+                summarized in a final "more events" line.
+            max_description_chars: Longer descriptions are truncated.
+            max_attendees: Longer attendee lists end with "and N others".
         """
         self.timezone_str = timezone_str
-        logger.info(f"Digest formatter initialized for timezone: {timezone_str}")
+        self.tz = get_timezone(timezone_str)
+        self.max_chars = max_chars
+        self.max_description_chars = max_description_chars
+        self.max_attendees = max_attendees
+        # Reused across renders so large digests do not reallocate
+        self._buffer = io.StringIO()
+        logger.debug("Digest formatter initialized for timezone: {}", timezone_str)
 
-    def format_digest(self, events: List[Event]) -> str:
+    def format_digest(self, events: List[Event], day: Optional[LocalDay] = None) -> str:
         """
         Format events into a digest message.
 
         Args:
             events: List of Event objects to format.
+            day: Today in the formatter's timezone (computed if None).
 
         Returns:
             Formatted digest message as string.
@@ -33,52 +84,178 @@ class DigestFormatter:
         if not events:
             return "You have no meetings scheduled today. Enjoy your day!"
 
+        buffer = self._buffer
+        buffer.seek(0)
+        buffer.truncate()
+        self.write_digest(events, buffer, day)
+        return buffer.getvalue()
+
+    def write_digest(
+        self, events: List[Event], out: io.StringIO, day: Optional[LocalDay] = None
+    ) -> None:
+        """
+        Stream a digest for a non-empty event list into a buffer.
+
+        Events are written one at a time; an event that would push the
+        digest past max_chars is rolled back and replaced by a count of
+        the events left out.
+
+        Args:
+            events: List of Event objects to format.
+            out: Buffer to write to, positioned at its end.
+            day: Today in the formatter's timezone (computed if None).
+        """
         # Sort events by start time
         sorted_events = sorted(events, key=lambda e: e.start)
 
-        # Get current date for header
-        now = datetime.now()
-        day_name = now.strftime("%a")
-        month_name = now.strftime("%B")
-        day = now.day
+        # The header date is the user's local date, not the server's
+        today = day.date if day is not None else datetime.now(self.tz).date()
+
+        write = out.write
+        write("Dear Olusegun! \n\n")
+        write(schedule_header(today))
+
+        # Keep room for the closing lines so the cap is never exceeded
+        limit = self.max_chars - len(CLOSING) - MORE_EVENTS_RESERVE
+        for index, event in enumerate(sorted_events):
+            block_start = out.tell()
+            self._write_event(event, out)
+            if out.tell() > limit:
+                out.seek(block_start)
+                out.truncate()
+                omitted = len(sorted_events) - index
+                write(f"... and {omitted} more events not shown.\n")
+                break
+
+        write(CLOSING)
+
+    def _write_event(self, event: Event, out: io.StringIO) -> None:
+        write = out.write
+        write(
+            f"- {event.start.strftime('%H:%M')} – {event.end.strftime('%H:%M')} "
+            f"\n Summary: {event.summary}\n"
+        )
+
+        if event.location:
+            write(f"  Location: {event.location}\n")
+
+        if event.attendees:
+            write("  Attendees: ")
+            write(", ".join(event.attendees[: self.max_attendees]))
+            others = len(event.attendees) - self.max_attendees
+            if others > 0:
+                write(f" and {others} others")
+            write("\n")
+
+        if event.description:
+            write("  Description: ")
+            if len(event.description) > self.max_description_chars:
+                write(event.description[: self.max_description_chars])
+                write("…")
+            else:
+                write(event.description)
+            write("\n")
+
+        # Spacing between events
+        write(EVENT_SEPARATOR)
+
+    def format_update(self, diff: EventDiff) -> str:
+        """
+        Format the changes since the last digest into a compact message.
+
+        Args:
+            diff: Changes between the last delivered snapshot and now.
+
+        Returns:
+            Formatted update message as string.
+        """
+        if diff.is_empty():
+            return "No changes to your schedule since your last digest."
+
+        lines = ["Here's what changed since your last digest:", ""]
+
+        if diff.added:
+            lines.append("New:")
+            for event in sorted(diff.added, key=lambda e: e.start):
+                lines.append(f"- {self._time_range(event)} {event.summary}")
+            lines.append("")
+
+        if diff.moved:
+            lines.append("Moved:")
+            for old, new in sorted(diff.moved, key=lambda pair: pair[1].start):
+                lines.append(
+                    f"- {new.summary}: {self._time_range(old)} → "
+                    f"{self._time_range(new)}"
+                )
+            lines.append("")
+
+        if diff.updated:
+            lines.append("Updated:")
+            for event in sorted(diff.updated, key=lambda e: e.start):
+                lines.append(f"- {self._time_range(event)} {event.summary}")
+            lines.append("")
+
+        if diff.cancelled:
+            lines.append("Cancelled:")
+            for event in sorted(diff.cancelled, key=lambda e: e.start):
+                lines.append(f"- {self._time_range(event)} {event.summary}")
+            lines.append("")
+
+        # Remove trailing empty line
+        if lines and lines[-1] == "":
+            lines.pop()
+
+        return "\n".join(lines)
+
+    def format_aggregate(self, aggregate: HistoryAggregate, period: str) -> str:
+        """
+        Format weekly or monthly meeting statistics.
+
+        Args:
+            aggregate: Statistics computed from the event history.
+            period: "week" or "month".
+
+        Returns:
+            Formatted summary message as string.
+        """
+        span = (
+            f"{aggregate.start.strftime('%b %d')} – {aggregate.end.strftime('%b %d')}"
+        )
+        if not aggregate.meetings:
+            return f"No meetings recorded for the {period} of {span}."
 
-        # Build digest
         lines = [
-            "Dear Olusegun! ",
+            f"Here's your {period} in meetings ({span}):",
             "",
-            f"Here's your schedule for today ({day_name}, {month_name} {day}):",
+            f"Total: {aggregate.meetings} meetings, {aggregate.hours:.1f} hours",
             "",
         ]
 
-        for event in sorted_events:
-            # Format time range
-            start_time = event.start.strftime("%H:%M")
-            end_time = event.end.strftime("%H:%M")
-
-            # Add event line
-            lines.append(f"- {start_time} – {end_time} \n Summary: {event.summary}")
+        if period == "month" and aggregate.weekly_hours:
+            lines.append("Meeting hours per week:")
+            for week, hours in aggregate.weekly_hours:
+                lines.append(f"- Week of {week.strftime('%b %d')}: {hours:.1f}h")
+            lines.append("")
 
-            # Add location if available
-            if event.location:
-                lines.append(f"  Location: {event.location}")
+        if aggregate.busiest_days:
+            lines.append("Busiest days:")
+            for day, hours, count in aggregate.busiest_days:
+                lines.append(
+                    f"- {day.strftime('%a, %b %d')}: {hours:.1f}h ({count} meetings)"
+                )
+            lines.append("")
 
-            # Add attendees if available
-            if event.attendees:
-                attendees_str = ", ".join(event.attendees)
-                lines.append(f"  Attendees: {attendees_str}")
+        if aggregate.top_attendees:
+            lines.append("Who you met most:")
+            for email, count in aggregate.top_attendees:
+                lines.append(f"- {email}: {count} meetings")
+            lines.append("")
 
-            # Add description if available
-            if event.description:
-                lines.append(f"  Description: {event.description}")
-
-            # Add spacing between events
-            lines.append(
-                "\n<============================================================>\n"
-            )
-
-        lines.append("\nHere's to a day full of wins, big and small!")
         # Remove trailing empty line
         if lines and lines[-1] == "":
             lines.pop()
 
         return "\n".join(lines)
+
+    def _time_range(self, event: Event) -> str:
+        return f"{event.start.strftime('%H:%M')} – {event.end.strftime('%H:%M')}"
@@ -0,0 +1,258 @@
+"""Adaptive timeouts and hedged requests for slow API calls."""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, TypeVar
+
+from loguru import logger
+
+from .deadlines import cap_timeout
+
+T = TypeVar("T")
+
+DEFAULT_WINDOW = 256
+# Percentiles are not trusted below this many samples
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_MIN_TIMEOUT = 2.0
+DEFAULT_MAX_TIMEOUT = 30.0
+DEFAULT_TIMEOUT_MULTIPLIER = 3.0
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_BUDGET = 0.05
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies of one endpoint."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        """
+        Initialize LatencyTracker.
+
+        Args:
+            window: Number of most recent samples kept.
+        """
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """
+        Add a latency sample.
+
+        Args:
+            seconds: Duration of a successful call.
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Get a latency percentile over the window (nearest rank).
+
+        Args:
+            percent: Percentile between 0 and 100.
+
+        Returns:
+            Latency in seconds, or None without samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(percent / 100 * len(samples)))
+        return samples[rank - 1]
+
+
+class HedgedCaller:
+    """Runs calls with per-endpoint adaptive timeouts and optional hedging.
+
+    Each endpoint's timeout is its recent p99 latency times a multiplier,
+    clamped to [min_timeout, max_timeout]. With hedging on, a call still
+    running after the endpoint's p95 latency gets one duplicate and the
+    first response wins. Hedges are limited to hedge_budget of all calls
+    so a slow API is not flooded with duplicates and quota is preserved.
+
+    Calls run on a shared worker pool, so the callable must be safe to
+    run on any thread and, when hedged, twice at once.
+    """
+
+    def __init__(
+        self,
+        hedge: bool = False,
+        hedge_budget: float = DEFAULT_HEDGE_BUDGET,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        min_timeout: float = DEFAULT_MIN_TIMEOUT,
+        max_timeout: float = DEFAULT_MAX_TIMEOUT,
+        timeout_multiplier: float = DEFAULT_TIMEOUT_MULTIPLIER,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        window: int = DEFAULT_WINDOW,
+        max_workers: int = 16,
+    ):
+        """
+        Initialize HedgedCaller.
+
+        Args:
+            hedge: Issue duplicate requests for slow calls.
+            hedge_budget: Maximum fraction of calls that may be hedged.
+            hedge_percentile: Latency percentile after which a call is hedged.
+            min_timeout: Lower bound of the adaptive timeout in seconds.
+            max_timeout: Upper bound, also used until enough samples exist.
+            timeout_multiplier: Timeout as a multiple of the p99 latency.
+            min_samples: Samples needed before timeouts adapt and hedging
+                starts.
+            window: Recent samples kept per endpoint.
+            max_workers: Worker threads running calls.
+        """
+        self.hedge = hedge
+        self.hedge_budget = hedge_budget
+        self.hedge_percentile = hedge_percentile
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.window = window
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="hedged-call"
+        )
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def tracker(self, endpoint: str) -> LatencyTracker:
+        """
+        Get the latency tracker of an endpoint.
+
+        Args:
+            endpoint: Endpoint name, e.g. "events.list".
+
+        Returns:
+            LatencyTracker, created on first use.
+        """
+        with self._lock:
+            tracker = self._trackers.get(endpoint)
+            if tracker is None:
+                tracker = self._trackers[endpoint] = LatencyTracker(self.window)
+            return tracker
+
+    def timeout(self, endpoint: str) -> float:
+        """
+        Get the current timeout of an endpoint.
+
+        Args:
+            endpoint: Endpoint name.
+
+        Returns:
+            Timeout in seconds.
+        """
+        tracker = self.tracker(endpoint)
+        if len(tracker) < self.min_samples:
+            return self.max_timeout
+        p99 = tracker.percentile(99)
+        return min(
+            self.max_timeout, max(self.min_timeout, p99 * self.timeout_multiplier)
+        )
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """
+        Get how long a call may run before it is hedged.
+
+        Args:
+            endpoint: Endpoint name.
+
+        Returns:
+            Delay in seconds, or None if the call must not be hedged.
+        """
+        tracker = self.tracker(endpoint)
+        if not self.hedge or len(tracker) < self.min_samples:
+            return None
+        return tracker.percentile(self.hedge_percentile)
+
+    def call(self, endpoint: str, fn: Callable[[], T]) -> T:
+        """
+        Run a call under the endpoint's timeout, hedging it if slow.
+
+        The timeout is shortened to the time left before the current
+        user's delivery deadline, if one is set.
+
+        Args:
+            endpoint: Endpoint name the latency is tracked under.
+            fn: The call; may run twice concurrently when hedged.
+
+        Returns:
+            Result of the first attempt to succeed.
+
+        Raises:
+            TimeoutError: If no attempt finished within the timeout.
+            Exception: Error of the last failed attempt if all failed.
+        """
+        timeout = cap_timeout(self.timeout(endpoint))
+        delay = self.hedge_delay(endpoint)
+        with self._lock:
+            self.calls += 1
+
+        started = time.monotonic()
+        primary = self._submit(endpoint, fn)
+        attempts: List[Future] = [primary]
+
+        if delay is not None and delay < timeout:
+            done, _ = wait(attempts, timeout=delay)
+            if not done and self._take_hedge():
+                logger.debug("Hedging {} after {:.3f}s", endpoint, delay)
+                attempts.append(self._submit(endpoint, fn))
+
+        error: Optional[BaseException] = None
+        while attempts:
+            remaining = timeout - (time.monotonic() - started)
+            done, _ = wait(
+                attempts, timeout=max(remaining, 0), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"{endpoint} did not respond within {timeout:.1f}s")
+
+            for future in done:
+                attempts.remove(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is not primary:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return result
+
+        raise error
+
+    def shutdown(self) -> None:
+        """Stop the worker threads without waiting for abandoned calls."""
+        self._executor.shutdown(wait=False)
+
+    def _submit(self, endpoint: str, fn: Callable[[], T]) -> "Future[T]":
+        tracker = self.tracker(endpoint)
+
+        def timed() -> T:
+            started = time.monotonic()
+            result = fn()
+            # Late responses of timed-out calls are recorded too, so a
+            # slowdown raises the timeout instead of failing every call
+            tracker.record(time.monotonic() - started)
+            return result
+
+        return self._executor.submit(timed)
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.hedge_budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
@@ -0,0 +1,241 @@
+"""Event history store and weekly/monthly meeting aggregates."""
+
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from .calendar import Event
+from .snapshot import event_key
+
+PERIODS = ("week", "month")
+
+
+def period_bounds(period: str, today: date) -> Tuple[date, date]:
+    """
+    Get the last complete week or month before a date.
+
+    Args:
+        period: "week" (Monday to Sunday) or "month".
+        today: Local date of the run.
+
+    Returns:
+        Tuple of (first day, last day), both inclusive.
+
+    Raises:
+        ValueError: If the period is unknown.
+    """
+    if period == "week":
+        this_monday = today - timedelta(days=today.weekday())
+        return this_monday - timedelta(days=7), this_monday - timedelta(days=1)
+    if period == "month":
+        last_day = today.replace(day=1) - timedelta(days=1)
+        return last_day.replace(day=1), last_day
+    raise ValueError(f"Invalid aggregate period: {period}")
+
+
+class HistoryAggregate:
+    """Meeting statistics for one user over a date range."""
+
+    def __init__(
+        self,
+        start: date,
+        end: date,
+        meetings: int,
+        hours: float,
+        weekly_hours: List[Tuple[date, float]],
+        busiest_days: List[Tuple[date, float, int]],
+        top_attendees: List[Tuple[str, int]],
+    ):
+        """
+        Initialize HistoryAggregate.
+
+        Args:
+            start: First day of the range.
+            end: Last day of the range (inclusive).
+            meetings: Number of meetings.
+            hours: Total meeting hours.
+            weekly_hours: (Monday of week, hours) per week.
+            busiest_days: (day, hours, meetings), busiest first.
+            top_attendees: (email, shared meetings), most frequent first.
+        """
+        self.start = start
+        self.end = end
+        self.meetings = meetings
+        self.hours = hours
+        self.weekly_hours = weekly_hours
+        self.busiest_days = busiest_days
+        self.top_attendees = top_attendees
+
+
+class HistoryStore:
+    """SQLite history of the events seen by each digest run.
+
+    One database serves every user of the fleet. Rows are only ever added
+    for the day being run; rerunning a day replaces that day's rows, and
+    earlier days are never rewritten.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize HistoryStore.
+
+        Args:
+            db_path: Path to the SQLite database.
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                event_key TEXT NOT NULL,
+                summary TEXT,
+                start TEXT NOT NULL,
+                minutes REAL NOT NULL,
+                recorded_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_user_day
+                ON events (user_id, day, minutes);
+            CREATE TABLE IF NOT EXISTS attendees (
+                event_id INTEGER NOT NULL,
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                email TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS attendees_user_day
+                ON attendees (user_id, day, email);
+            """
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def record_day(self, user_id: str, day: date, events: List[Event]) -> None:
+        """
+        Store the events of a user's day, replacing an earlier run's rows.
+
+        Args:
+            user_id: User identifier.
+            day: Local date the events were fetched for.
+            events: Events of that day.
+        """
+        day_str = day.isoformat()
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "DELETE FROM events WHERE user_id = ? AND day = ?", (user_id, day_str)
+            )
+            self._conn.execute(
+                "DELETE FROM attendees WHERE user_id = ? AND day = ?",
+                (user_id, day_str),
+            )
+            for event in events:
+                cursor = self._conn.execute(
+                    "INSERT INTO events "
+                    "(user_id, day, event_key, summary, start, minutes, recorded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        user_id,
+                        day_str,
+                        event_key(event),
+                        event.summary,
+                        event.start.isoformat(),
+                        (event.end - event.start).total_seconds() / 60,
+                        now,
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO attendees (event_id, user_id, day, email) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (cursor.lastrowid, user_id, day_str, email)
+                        for email in set(event.attendees)
+                    ],
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        logger.debug("Recorded {} events for {} on {}", len(events), user_id, day)
+
+    def aggregate(
+        self,
+        user_id: str,
+        start: date,
+        end: date,
+        exclude_attendees: Optional[List[str]] = None,
+        limit: int = 5,
+    ) -> HistoryAggregate:
+        """
+        Compute meeting statistics from the stored history.
+
+        Every query is served by the (user_id, day) indexes, so a month
+        only touches that user's rows for the month.
+
+        Args:
+            user_id: User identifier.
+            start: First day (inclusive).
+            end: Last day (inclusive).
+            exclude_attendees: Addresses left out of the top attendees,
+                typically the user's own.
+            limit: Number of busiest days and top attendees.
+
+        Returns:
+            HistoryAggregate for the range.
+        """
+        bounds = (user_id, start.isoformat(), end.isoformat())
+        in_range = "user_id = ? AND day BETWEEN ? AND ?"
+
+        meetings, minutes = self._conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(minutes), 0) FROM events WHERE {in_range}",
+            bounds,
+        ).fetchone()
+
+        # date(day, 'weekday 0', '-6 days') is the Monday of day's week
+        weekly_hours = [
+            (date.fromisoformat(week), total / 60)
+            for week, total in self._conn.execute(
+                "SELECT date(day, 'weekday 0', '-6 days') AS week, SUM(minutes) "
+                f"FROM events WHERE {in_range} GROUP BY week ORDER BY week",
+                bounds,
+            )
+        ]
+
+        busiest_days = [
+            (date.fromisoformat(day), total / 60, count)
+            for day, total, count in self._conn.execute(
+                "SELECT day, SUM(minutes) AS total, COUNT(*) FROM events "
+                f"WHERE {in_range} GROUP BY day ORDER BY total DESC, day LIMIT ?",
+                bounds + (limit,),
+            )
+        ]
+
+        excluded = list(exclude_attendees or [])
+        exclusion = ""
+        if excluded:
+            exclusion = f" AND email NOT IN ({', '.join('?' * len(excluded))})"
+        top_attendees = self._conn.execute(
+            "SELECT email, COUNT(*) AS meetings FROM attendees "
+            f"WHERE {in_range}{exclusion} "
+            "GROUP BY email ORDER BY meetings DESC, email LIMIT ?",
+            bounds + tuple(excluded) + (limit,),
+        ).fetchall()
+
+        return HistoryAggregate(
+            start=start,
+            end=end,
+            meetings=meetings,
+            hours=minutes / 60,
+            weekly_hours=weekly_hours,
+            busiest_days=busiest_days,
+            top_attendees=[tuple(row) for row in top_attendees],
+        )
@@ -0,0 +1,162 @@
+"""Send-once ledger preventing duplicate digest emails."""
+
+import hashlib
+import sqlite3
+import time
+from typing import Optional
+
+from loguru import logger
+
+DEFAULT_SEND_LEASE_SECONDS = 600
+
+
+def content_hash(content: str) -> str:
+    """
+    Hash email content for the ledger.
+
+    Args:
+        content: Email body.
+
+    Returns:
+        Hex SHA-256 digest.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class SendLedger:
+    """SQLite record of (user, date, kind) sends with atomic claims.
+
+    A send is claimed before calling the provider and completed with the
+    provider's message id afterwards. A claim left behind by a crashed
+    process expires after the lease, so the send can be retried.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: int = DEFAULT_SEND_LEASE_SECONDS):
+        """
+        Initialize SendLedger.
+
+        Args:
+            db_path: Path to the SQLite database.
+            lease_seconds: How long an unfinished claim blocks other senders.
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sends (
+                user_id TEXT NOT NULL,
+                send_date TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                message_id TEXT,
+                claimed_at REAL NOT NULL,
+                sent_at REAL,
+                PRIMARY KEY (user_id, send_date, kind)
+            );
+            """
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def is_sent(self, user_id: str, send_date: str, kind: str = "digest") -> bool:
+        """
+        Check whether a send has completed.
+
+        Args:
+            user_id: User identifier.
+            send_date: Local date of the send (YYYY-MM-DD).
+            kind: Kind of email, e.g. "digest".
+
+        Returns:
+            True if the email was already sent.
+        """
+        row = self._conn.execute(
+            "SELECT 1 FROM sends WHERE user_id = ? AND send_date = ? AND kind = ? "
+            "AND status = 'sent'",
+            (user_id, send_date, kind),
+        ).fetchone()
+        return row is not None
+
+    def claim(self, user_id: str, send_date: str, kind: str, digest_hash: str) -> bool:
+        """
+        Atomically claim a send.
+
+        Args:
+            user_id: User identifier.
+            send_date: Local date of the send (YYYY-MM-DD).
+            kind: Kind of email, e.g. "digest".
+            digest_hash: Hash of the content about to be sent.
+
+        Returns:
+            True if the caller may send, False if the email was already
+            sent or another sender holds an unexpired claim.
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT status, claimed_at FROM sends "
+                "WHERE user_id = ? AND send_date = ? AND kind = ?",
+                (user_id, send_date, kind),
+            ).fetchone()
+            if row is not None:
+                status, claimed_at = row
+                if status == "sent" or claimed_at + self.lease_seconds > now:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                logger.warning(
+                    "Retrying {} for {} on {} after an expired claim",
+                    kind,
+                    user_id,
+                    send_date,
+                )
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sends "
+                "(user_id, send_date, kind, content_hash, status, claimed_at) "
+                "VALUES (?, ?, ?, ?, 'sending', ?)",
+                (user_id, send_date, kind, digest_hash, now),
+            )
+            self._conn.execute("COMMIT")
+            return True
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def complete(
+        self, user_id: str, send_date: str, kind: str, message_id: Optional[str]
+    ) -> None:
+        """
+        Record a finished send.
+
+        Args:
+            user_id: User identifier.
+            send_date: Local date of the send (YYYY-MM-DD).
+            kind: Kind of email, e.g. "digest".
+            message_id: Message id returned by the email provider.
+        """
+        self._conn.execute(
+            "UPDATE sends SET status = 'sent', message_id = ?, sent_at = ? "
+            "WHERE user_id = ? AND send_date = ? AND kind = ?",
+            (message_id, time.time(), user_id, send_date, kind),
+        )
+
+    def release(self, user_id: str, send_date: str, kind: str) -> None:
+        """
+        Drop an unfinished claim after a failed send so it can be retried.
+
+        Args:
+            user_id: User identifier.
+            send_date: Local date of the send (YYYY-MM-DD).
+            kind: Kind of email, e.g. "digest".
+        """
+        self._conn.execute(
+            "DELETE FROM sends WHERE user_id = ? AND send_date = ? AND kind = ? "
+            "AND status = 'sending'",
+            (user_id, send_date, kind),
+        )
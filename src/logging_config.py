@@ -0,0 +1,148 @@
+"""Logging configuration: background sinks, per-module levels and sampling."""
+
+import itertools
+import os
+import sys
+from typing import Dict, Optional
+
+from loguru import logger
+
+from .utils import parse_bool
+
+DEFAULT_LOG_DIR = "logs"
+DEFAULT_SAMPLE_EVERY = 100
+
+
+class LogSampler:
+    """Lets one in every `every` calls through; the first call always passes."""
+
+    def __init__(self, every: int = DEFAULT_SAMPLE_EVERY):
+        """
+        Initialize LogSampler.
+
+        Args:
+            every: Sampling interval (1 logs every call).
+        """
+        self.every = max(1, every)
+        self._counter = itertools.count()
+
+    def __call__(self) -> bool:
+        """Return True if this call should be logged."""
+        return next(self._counter) % self.every == 0
+
+
+# Shared sampler for debug logs inside per-event loops
+debug_sampler = LogSampler()
+
+
+def parse_module_levels(spec: Optional[str]) -> Dict[str, str]:
+    """
+    Parse per-module log levels.
+
+    Args:
+        spec: Comma-separated "module=LEVEL" pairs, e.g.
+            "src.calendar=DEBUG,src.formatter=WARNING".
+
+    Returns:
+        Dict mapping module prefixes to level names.
+
+    Raises:
+        ValueError: If an entry is malformed or the level is unknown.
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        module, sep, level = item.partition("=")
+        if not sep or not module.strip():
+            raise ValueError(f"Invalid module log level: {item}")
+        level = level.strip().upper()
+        logger.level(level)  # Raises ValueError for unknown levels
+        levels[module.strip()] = level
+    return levels
+
+
+class ModuleLevelFilter:
+    """Loguru filter applying the most specific per-module level."""
+
+    def __init__(self, default_level: str, module_levels: Dict[str, str]):
+        """
+        Initialize ModuleLevelFilter.
+
+        Args:
+            default_level: Level for modules without an override.
+            module_levels: Module prefix to level name overrides.
+        """
+        self.default_no = logger.level(default_level).no
+        # Longest prefixes first so "src.calendar" wins over "src"
+        self.overrides = sorted(
+            (
+                (module, logger.level(level).no)
+                for module, level in module_levels.items()
+            ),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self._cache: Dict[str, int] = {}
+
+    def __call__(self, record) -> bool:
+        name = record["name"] or ""
+        level_no = self._cache.get(name)
+        if level_no is None:
+            level_no = self.default_no
+            for module, override_no in self.overrides:
+                if name == module or name.startswith(module + "."):
+                    level_no = override_no
+                    break
+            self._cache[name] = level_no
+        return record["level"].no >= level_no
+
+
+def configure_logging(
+    log_dir: str = DEFAULT_LOG_DIR,
+    level: str = "INFO",
+    module_levels: Optional[Dict[str, str]] = None,
+    enqueue: bool = False,
+    sample_every: int = DEFAULT_SAMPLE_EVERY,
+) -> None:
+    """
+    Configure console and rotating file sinks.
+
+    With `enqueue`, file writes move to a background thread. Each message
+    is then pickled onto a queue, which costs more per call than a buffered
+    local write (see benchmarks/bench_logging.py), so it only pays off when
+    the log volume is slow, e.g. a network mount.
+
+    Args:
+        log_dir: Directory for the rotating log file.
+        level: Default minimum level.
+        module_levels: Per-module level overrides.
+        enqueue: Write the file sink from a background thread.
+        sample_every: Sampling interval for per-event debug logs.
+    """
+    level_filter = ModuleLevelFilter(level, module_levels or {})
+    min_level = min(
+        [level_filter.default_no] + [no for _, no in level_filter.overrides]
+    )
+
+    logger.remove()
+    logger.add(sys.stderr, level=min_level, filter=level_filter)
+    logger.add(
+        os.path.join(log_dir, "orbit_digest.log"),
+        rotation="1 day",
+        retention="7 days",
+        level=min_level,
+        filter=level_filter,
+        enqueue=enqueue,
+    )
+
+    debug_sampler.every = max(1, sample_every)
+
+
+def configure_logging_from_env() -> None:
+    """Configure logging from LOG_* environment variables."""
+    configure_logging(
+        log_dir=os.getenv("LOG_DIR", DEFAULT_LOG_DIR),
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        module_levels=parse_module_levels(os.getenv("LOG_MODULE_LEVELS")),
+        enqueue=parse_bool(os.getenv("LOG_ENQUEUE", "false")),
+        sample_every=int(os.getenv("LOG_SAMPLE_EVERY", str(DEFAULT_SAMPLE_EVERY))),
+    )
@@ -1,67 +1,292 @@
 """Main OrbitDigest application."""
 
-from typing import Dict, Any
+import argparse
+import functools
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 
-from src.calendar import CalendarService
+from src.batch import BatchRunner
+from src.cache import DigestCache
+from src.calendar import CalendarService, Event
+from src.checkpoint import BatchCheckpoint, UserCheckpoint
+from src.coordinator import FetchCoordinator
+from src.credentials import CredentialManager
+from src.delivery import DeliveryBackend, backend_from_config
 from src.email_sender import EmailSender
-from src.formatter import DigestFormatter
-from src.utils import get_env_config
+from src.formatter import TEMPLATE_VERSION, DigestFormatter
+from src.hedging import HedgedCaller
+from src.history import PERIODS, HistoryStore, period_bounds
+from src.ledger import SendLedger
+from src.logging_config import configure_logging_from_env
+from src.notifications import ChangeTracker
+from src.pool import ServicePool
+from src.profiling import Profiler, stage
+from src.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from src.roster import UserProfile, load_roster
+from src.search import SearchIndex
+from src.sharding import DEFAULT_LEASE_SECONDS, ClaimTable, parse_shard
+from src.snapshot import SnapshotStore, diff_events
+from src.staging import StagingStore
+from src.timezones import LocalDay
+from src.utils import get_env_config, get_shared_config, today_in_timezone
 from loguru import logger
 
+PHASES = ("prepare", "deliver")
+
 
 class OrbitDigest:
     """Main application class for OrbitDigest."""
 
-    def __init__(self):
-        """Initialize OrbitDigest with all services."""
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        fetch_coordinator: Optional[FetchCoordinator] = None,
+        delivery_backend: Optional[DeliveryBackend] = None,
+        hedged_caller: Optional[HedgedCaller] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        calendar_breaker: Optional[CircuitBreaker] = None,
+        email_breaker: Optional[CircuitBreaker] = None,
+        credential_manager: Optional[CredentialManager] = None,
+        service_pool: Optional[ServicePool] = None,
+        send_ledger: Optional[SendLedger] = None,
+        history_store: Optional[HistoryStore] = None,
+        search_index: Optional[SearchIndex] = None,
+        staging_store: Optional[StagingStore] = None,
+        change_tracker: Optional[ChangeTracker] = None,
+    ):
+        """
+        Initialize OrbitDigest with all services.
+
+        Args:
+            config: Validated configuration (loaded from the environment if None).
+            fetch_coordinator: Shares fetches of shared calendars between the
+                users of a batch run.
+            delivery_backend: Email backend shared by the users of a batch
+                run (created from the configuration if None).
+            hedged_caller: Adaptive timeouts and hedging for calendar calls,
+                learning latencies across the users of a batch run.
+            retry_policy: Retries transient calendar and delivery failures.
+            calendar_breaker: Calendar API circuit breaker shared by a run.
+            email_breaker: Delivery circuit breaker shared by a run.
+            credential_manager: Hands out access tokens refreshed ahead of
+                the run (refreshed when the calendar is first used if None).
+            service_pool: Keeps calendar clients warm between digests of
+                the same user.
+            send_ledger: Send ledger shared by a run (opened from
+                send_ledger_db if None).
+            history_store: Meeting history shared by a run (opened from
+                history_db if None).
+            search_index: Search index shared by a run (opened from
+                history_db if None).
+            staging_store: Prepared digests shared by a run (opened from
+                staging_db if None).
+            change_tracker: Change tracker shared by a run, used for this
+                user's calendars (opened from change_tracker_db if None).
+        """
         # Load configuration
-        self.config = get_env_config()
+        self.config = config if config is not None else get_env_config()
 
-        # Initialize services
-        self.calendar_service = CalendarService(
-            client_id=self.config["google_client_id"],
-            client_secret=self.config["google_client_secret"],
-            refresh_token=self.config["google_refresh_token"],
+        # Stores are opened once per run and shared by its users; one built
+        # here from the config is only for a standalone digest
+        tracker_db = self.config.get("change_tracker_db")
+        if change_tracker is None and tracker_db:
+            change_tracker = ChangeTracker(tracker_db)
+        self.change_tracker = (
+            change_tracker.for_owner(self._user_id()) if change_tracker else None
         )
 
+        # Created on first use, so a run resumed past the fetch skips the
+        # token refresh and discovery build
+        self._calendar_service: Optional[CalendarService] = None
+        self.fetch_coordinator = fetch_coordinator
+        self.hedged_caller = hedged_caller
+        self.retry_policy = retry_policy
+        self.calendar_breaker = calendar_breaker
+        self.credential_manager = credential_manager
+        self.service_pool = service_pool
+
+        ledger_db = self.config.get("send_ledger_db")
+        if send_ledger is None and ledger_db:
+            send_ledger = SendLedger(ledger_db)
+        if delivery_backend is None:
+            delivery_backend = backend_from_config(self.config)
         self.email_sender = EmailSender(
-            api_key=self.config["resend_api_key"],
+            api_key=self.config.get("resend_api_key"),
             sender_email=self.config["sender_email"],  # Default sender
+            ledger=send_ledger,
+            timezone_str=self.config["timezone"],
+            backend=delivery_backend,
+            retry_policy=retry_policy,
+            circuit_breaker=email_breaker,
         )
 
         self.formatter = DigestFormatter(
             timezone_str=self.config["timezone"],
         )
 
+        cache_dir = self.config.get("digest_cache_dir")
+        self.digest_cache = DigestCache(cache_dir) if cache_dir else None
+
+        snapshot_dir = self.config.get("snapshot_dir")
+        self.snapshot_store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+
+        history_db = self.config.get("history_db")
+        if history_store is None and history_db:
+            history_store = HistoryStore(history_db)
+        self.history_store = history_store
+        if search_index is None and history_db:
+            search_index = SearchIndex(history_db)
+        self.search_index = search_index
+
+        staging_db = self.config.get("staging_db")
+        if staging_store is None and staging_db:
+            staging_store = StagingStore(staging_db)
+        self.staging_store = staging_store
+
         logger.info("OrbitDigest initialized successfully")
 
-    def run_digest(self) -> bool:
+    @property
+    def calendar_service(self) -> CalendarService:
+        """Calendar client, connected on first access or taken from the pool."""
+        if self._calendar_service is None:
+            if self.service_pool is None:
+                self._calendar_service = self._connect_calendar()
+            else:
+                key = (
+                    self._user_id(),
+                    self.config["google_refresh_token"],
+                    tuple(self.config.get("calendar_ids") or ()),
+                    self.config.get("expand_recurring_locally", False),
+                )
+                self._calendar_service = self.service_pool.get(
+                    key, self._connect_calendar
+                )
+                self._calendar_service.begin_run()
+            self._ensure_watch_channels()
+        return self._calendar_service
+
+    def _connect_calendar(self) -> CalendarService:
+        credentials = None
+        if self.credential_manager is not None:
+            credentials = self.credential_manager.get(
+                self.config["google_refresh_token"]
+            )
+        return CalendarService(
+            client_id=self.config["google_client_id"],
+            client_secret=self.config["google_client_secret"],
+            refresh_token=self.config["google_refresh_token"],
+            expand_recurring_locally=self.config.get("expand_recurring_locally", False),
+            change_tracker=self.change_tracker,
+            calendar_ids=self.config.get("calendar_ids"),
+            fetch_coordinator=self.fetch_coordinator,
+            hedged_caller=self.hedged_caller,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.calendar_breaker,
+            credentials=credentials,
+        )
+
+    def _ensure_watch_channels(self) -> None:
+        webhook_address = self.config.get("webhook_address")
+        if self.change_tracker is None or not webhook_address:
+            return
+
+        for calendar_id in self._calendar_service.calendar_ids:
+            try:
+                self.change_tracker.ensure_channel(
+                    self._calendar_service.service, calendar_id, webhook_address
+                )
+            except Exception as e:
+                # Without a channel the calendar is simply polled
+                logger.warning(
+                    f"Could not register watch channel for {calendar_id}: {e}"
+                )
+
+    def run_digest(
+        self,
+        checkpoint: Optional[UserCheckpoint] = None,
+        day: Optional[LocalDay] = None,
+    ) -> bool:
         """
         Run the complete digest workflow.
 
+        Args:
+            checkpoint: Progress of this user in a checkpointed batch run;
+                stages already recorded there are not repeated.
+            day: Today in the user's timezone, shared by a batch run across
+                users of the same timezone (computed if None).
+
         Returns:
             True if email sent successfully, False otherwise.
+
+        Raises:
+            CircuitOpenError: If a provider's circuit is open; the user
+                should be retried later rather than counted as failed.
         """
+        period = self.config.get("aggregate_period")
+        if period:
+            success = self.run_aggregate_digest(period)
+            if success and checkpoint is not None:
+                checkpoint.record_sent()
+            return success
+
+        if day is None:
+            day = LocalDay(self.config["timezone"])
+
+        phase = self.config.get("digest_phase")
+        if phase == "prepare":
+            success = self.prepare_digest(day)
+            if success and checkpoint is not None:
+                checkpoint.record_sent()
+            return success
+        if phase == "deliver":
+            success = self._deliver_staged(day)
+            if success is not None:
+                if success and checkpoint is not None:
+                    checkpoint.record_sent()
+                return success
+
         try:
             logger.info("Starting digest workflow")
 
             # Get today's events
-            events = self.calendar_service.get_today_events(
-                timezone_str=self.config["timezone"],
-                quiet_start=self.config["quiet_hours_start"],
-                quiet_end=self.config["quiet_hours_end"],
-            )
+            if checkpoint is not None and checkpoint.events is not None:
+                logger.info("Using events from checkpoint")
+                events = checkpoint.events
+            else:
+                with stage("fetch"):
+                    events = self.calendar_service.get_today_events(
+                        timezone_str=self.config["timezone"],
+                        quiet_start=self.config["quiet_hours_start"],
+                        quiet_end=self.config["quiet_hours_end"],
+                        day=day,
+                    )
+                if checkpoint is not None:
+                    checkpoint.record_fetched(events)
 
-            # Format digest
-            digest_content = self.formatter.format_digest(events)
+            recipient = self.config["email_recipient"]
 
-            # Send via email
-            email_success = self.email_sender.send_digest(
-                recipient=self.config["email_recipient"],
-                content=digest_content,
-            )
+            if self.history_store is not None:
+                self._record_history(events, day)
+
+            previous = None
+            if (
+                self.snapshot_store is not None
+                and self.config.get("digest_mode") == "update"
+            ):
+                previous = self.snapshot_store.load(recipient, day.date)
+
+            if previous is None:
+                success = self._send_full_digest(recipient, events, day, checkpoint)
+            else:
+                success = self._send_update(recipient, previous, events)
 
-            success = email_success
+            if success and self.snapshot_store is not None:
+                self.snapshot_store.save(recipient, events, day.date)
+
+            if success and checkpoint is not None:
+                checkpoint.record_sent()
 
             if success:
                 logger.info("Digest sent successfully via email")
@@ -70,35 +295,536 @@ class OrbitDigest:
 
             return success
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Error in digest workflow: {e}")
             return False
 
+    def prepare_digest(self, day: Optional[LocalDay] = None) -> bool:
+        """
+        Fetch and render today's digest into the staging store without sending.
+
+        Args:
+            day: Today in the user's timezone (computed if None).
 
-def main():
+        Returns:
+            True if the digest was staged (or there is nothing to stage in
+            update mode), False otherwise.
+        """
+        if self.staging_store is None:
+            logger.error("Preparing digests needs STAGING_DB")
+            return False
+        if self.config.get("digest_mode") == "update":
+            # Updates are diffed against what was delivered, at delivery time
+            logger.info("Update digests are not prepared ahead")
+            return True
+
+        if day is None:
+            day = LocalDay(self.config["timezone"])
+
+        try:
+            # Taken before the fetch, so changes made during it count as stale
+            prepared_at = time.time()
+            with stage("fetch"):
+                events = self.calendar_service.get_today_events(
+                    timezone_str=self.config["timezone"],
+                    quiet_start=self.config["quiet_hours_start"],
+                    quiet_end=self.config["quiet_hours_end"],
+                    day=day,
+                )
+
+            if self.history_store is not None:
+                self._record_history(events, day)
+
+            with stage("format"):
+                content = self.formatter.format_digest(events, day)
+            self.staging_store.put(
+                self._user_id(), day.date.isoformat(), content, events, prepared_at
+            )
+            logger.info("Digest prepared for {}", day.date)
+            return True
+
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Error preparing digest: {e}")
+            return False
+
+    def _deliver_staged(self, day: LocalDay) -> Optional[bool]:
+        """
+        Send the digest staged by the prepare phase if it is still current.
+
+        Args:
+            day: Today in the user's timezone.
+
+        Returns:
+            Whether the staged digest was sent, or None if there is no
+            usable staged digest and the full workflow must run instead.
+        """
+        if self.staging_store is None or self.config.get("digest_mode") == "update":
+            return None
+
+        user_id = self._user_id()
+        send_date = day.date.isoformat()
+        try:
+            staged = self.staging_store.get(user_id, send_date)
+            if staged is None:
+                logger.info(
+                    "No prepared digest for {}, running full workflow", send_date
+                )
+                return None
+
+            prepared = datetime.fromtimestamp(staged.prepared_at, timezone.utc)
+            with stage("freshness"):
+                changed = self.calendar_service.changed_since(prepared)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            # The full workflow fetches again, so it does not depend on
+            # whatever failed here
+            logger.warning(f"Could not check prepared digest: {e}")
+            return None
+
+        if changed:
+            logger.info("Calendar changed since the digest was prepared")
+            self.staging_store.discard(user_id, send_date)
+            return None
+
+        try:
+            recipient = self.config["email_recipient"]
+            with stage("send"):
+                success = self.email_sender.send_digest(
+                    recipient=recipient, content=staged.content
+                )
+            if success:
+                self.staging_store.discard(user_id, send_date)
+                if self.snapshot_store is not None:
+                    self.snapshot_store.save(recipient, staged.events, day.date)
+                logger.info("Prepared digest sent successfully via email")
+            else:
+                logger.error("Failed to send prepared digest via email")
+            return success
+
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Error delivering prepared digest: {e}")
+            return False
+
+    def run_aggregate_digest(self, period: str) -> bool:
+        """
+        Send meeting statistics for the last complete week or month.
+
+        Statistics come from the history store, so nothing is refetched.
+
+        Args:
+            period: "week" or "month".
+
+        Returns:
+            True if email sent successfully, False otherwise.
+        """
+        if self.history_store is None:
+            logger.error("Aggregate digests need HISTORY_DB")
+            return False
+
+        try:
+            recipient = self.config["email_recipient"]
+            start, end = period_bounds(
+                period, today_in_timezone(self.config["timezone"])
+            )
+            aggregate = self.history_store.aggregate(
+                self._user_id(), start, end, exclude_attendees=[recipient]
+            )
+            content = self.formatter.format_aggregate(aggregate, period)
+            return self.email_sender.send_aggregate(
+                recipient=recipient, content=content, period=period
+            )
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in aggregate digest workflow: {e}")
+            return False
+
+    def profile_digest(self, output_dir: str) -> bool:
+        """
+        Run the digest workflow under the profiler.
+
+        Args:
+            output_dir: Directory for the pstats, collapsed-stack and
+                summary files.
+
+        Returns:
+            True if email sent successfully, False otherwise.
+        """
+        with Profiler(output_dir):
+            return self.run_digest()
+
+    def _user_id(self) -> str:
+        return self.config.get("user_id") or self.config["email_recipient"]
+
+    def _record_history(self, events: List[Event], day: LocalDay) -> None:
+        """Add today's events to the history and search index.
+
+        Failures do not stop the send.
+        """
+        user_id = self._user_id()
+        try:
+            self.history_store.record_day(user_id, day.date, events)
+            self.search_index.index_day(user_id, day.date, events)
+        except Exception as e:
+            logger.warning(f"Could not record event history: {e}")
+
+    def _send_full_digest(
+        self,
+        recipient: str,
+        events: List[Event],
+        day: LocalDay,
+        checkpoint: Optional[UserCheckpoint] = None,
+    ) -> bool:
+        """
+        Render and send the full daily digest.
+
+        Args:
+            recipient: Email address to send to.
+            events: Today's events.
+            day: Today in the user's timezone.
+            checkpoint: Batch checkpoint holding or receiving the render.
+
+        Returns:
+            True if the digest was sent or was unchanged since last delivery.
+        """
+        # Format digest, reusing a cached render when nothing changed
+        digest_key = None
+        digest_content = None
+        if checkpoint is not None and checkpoint.content is not None:
+            digest_content = checkpoint.content
+        if self.digest_cache is not None:
+            digest_key = self.digest_cache.key_for(
+                events,
+                TEMPLATE_VERSION,
+                day.date,
+                self.config["timezone"],
+            )
+            if digest_content is None:
+                digest_content = self.digest_cache.get(digest_key)
+
+        if digest_content is None:
+            with stage("format"):
+                digest_content = self.formatter.format_digest(events, day)
+            if digest_key is not None:
+                self.digest_cache.put(digest_key, digest_content)
+        else:
+            logger.info("Reusing cached digest render")
+
+        if checkpoint is not None and checkpoint.content is None:
+            checkpoint.record_rendered(digest_content)
+
+        if (
+            digest_key is not None
+            and self.config.get("suppress_duplicate_digests")
+            and self.digest_cache.is_last_sent(recipient, digest_key)
+        ):
+            logger.info("Digest unchanged since last delivery, skipping send")
+            return True
+
+        # Send via email
+        with stage("send"):
+            email_success = self.email_sender.send_digest(
+                recipient=recipient,
+                content=digest_content,
+            )
+
+        if email_success and digest_key is not None:
+            self.digest_cache.mark_sent(recipient, digest_key)
+
+        return email_success
+
+    def _send_update(
+        self, recipient: str, previous: List[Event], events: List[Event]
+    ) -> bool:
+        """
+        Send only the changes since the last delivered digest.
+
+        Args:
+            recipient: Email address to send to.
+            previous: Events from the last delivered snapshot.
+            events: Today's events.
+
+        Returns:
+            True if the update was sent or there was nothing to send.
+        """
+        diff = diff_events(previous, events)
+        if diff.is_empty():
+            logger.info("No changes since last digest, skipping send")
+            return True
+
+        with stage("format"):
+            update_content = self.formatter.format_update(diff)
+        with stage("send"):
+            return self.email_sender.send_update(
+                recipient=recipient,
+                content=update_content,
+            )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse command line arguments.
+
+    Args:
+        argv: Argument list (defaults to sys.argv).
+
+    Returns:
+        Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Daily Google Calendar digest")
+    parser.add_argument(
+        "--roster",
+        default=os.getenv("ROSTER_FILE"),
+        help="JSON, TOML or CSV roster of users to run (default: single user)",
+    )
+    parser.add_argument(
+        "--shard",
+        help="Only run users owned by shard i of N (format: i/N)",
+    )
+    parser.add_argument(
+        "--claims-db",
+        default=os.getenv("CLAIMS_DB"),
+        help="SQLite claim table shared by runners, prevents double sends",
+    )
+    parser.add_argument(
+        "--lease",
+        type=int,
+        default=DEFAULT_LEASE_SECONDS,
+        help="Claim and heartbeat lease in seconds",
+    )
+    parser.add_argument(
+        "--takeover",
+        action="store_true",
+        help="Also run users of shards without a live heartbeat",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Profile the run and write pstats, collapsed stacks and "
+        "per-stage timings to DIR",
+    )
+    parser.add_argument(
+        "--aggregate",
+        choices=PERIODS,
+        help="Send meeting statistics for the last week or month from "
+        "HISTORY_DB instead of today's digest",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=os.getenv("CHECKPOINT_FILE"),
+        help="Checkpoint file; rerunning after a crash resumes each user "
+        "where it stopped",
+    )
+    parser.add_argument(
+        "--phase",
+        choices=PHASES,
+        help="prepare: fetch and render digests into STAGING_DB without "
+        "sending; deliver: send users whose DIGEST_HOUR has come, reusing "
+        "prepared digests that are still current",
+    )
+    args = parser.parse_args(argv)
+
+    if args.shard is not None:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.takeover and (args.shard is None or args.claims_db is None):
+        parser.error("--takeover requires --shard and --claims-db")
+
+    if args.phase and args.aggregate:
+        parser.error("--phase cannot be combined with --aggregate")
+
+    # The staged digest is dropped once sent, so without a record of sends
+    # every later hourly run would send the full digest again
+    if args.phase == "deliver" and not (args.claims_db or os.getenv("SEND_LEDGER_DB")):
+        parser.error("--phase deliver requires SEND_LEDGER_DB or --claims-db")
+
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
     """Main entry point for the application."""
+    args = parse_args(argv)
+
     # Configure logging
-    logger.add(
-        "logs/orbit_digest.log",
-        rotation="1 day",
-        retention="7 days",
-        level="INFO",
+    configure_logging_from_env()
+
+    if args.roster:
+        shared_config = get_shared_config()
+        profiles = load_roster(args.roster, defaults=_roster_defaults())
+    else:
+        shared_config = get_env_config()
+        profiles = [UserProfile.from_config(shared_config)]
+
+    if args.aggregate:
+        shared_config["aggregate_period"] = args.aggregate
+    if args.phase:
+        shared_config["digest_phase"] = args.phase
+
+    claims = None
+    if args.claims_db:
+        claims = ClaimTable(args.claims_db, lease_seconds=args.lease)
+
+    # Stores are opened once and shared by every user of the run
+    ledger = None
+    if shared_config.get("send_ledger_db"):
+        ledger = SendLedger(shared_config["send_ledger_db"])
+    history_db = shared_config.get("history_db")
+    history_store = HistoryStore(history_db) if history_db else None
+    search_index = SearchIndex(history_db) if history_db else None
+    staging_db = shared_config.get("staging_db")
+    staging_store = StagingStore(staging_db) if staging_db else None
+    tracker_db = shared_config.get("change_tracker_db")
+    change_tracker = ChangeTracker(tracker_db) if tracker_db else None
+    stores = [ledger, history_store, search_index, staging_store, change_tracker]
+
+    coordinator = FetchCoordinator()
+    # One backend for the whole run, so SMTP connections are reused
+    delivery_backend = backend_from_config(shared_config)
+    hedged_caller = HedgedCaller(
+        hedge=shared_config.get("calendar_hedging", False),
+        hedge_budget=shared_config.get("calendar_hedge_budget", 0.05),
     )
+    # Breakers are per provider, so a brownout seen by one user fast-fails
+    # the rest instead of each waiting out its own timeouts
+    retry_policy = RetryPolicy(max_attempts=shared_config.get("retry_max_attempts", 3))
+    breakers = [
+        CircuitBreaker(
+            provider,
+            failure_rate=shared_config.get("circuit_failure_rate", 0.5),
+            cooldown=shared_config.get("circuit_cooldown", 30.0),
+        )
+        for provider in ("calendar", shared_config.get("email_backend", "resend"))
+    ]
+    calendar_breaker, email_breaker = breakers
+    # Access tokens are refreshed in the background ahead of each user
+    credential_manager = CredentialManager(
+        shared_config.get("google_client_id"),
+        shared_config.get("google_client_secret"),
+        retry_policy=retry_policy,
+        circuit_breaker=calendar_breaker,
+    )
+    # Calendar clients are reused when a user runs again in this process
+    service_pool = ServicePool(
+        CalendarService.estimated_bytes,
+        max_bytes=shared_config.get("calendar_pool_mb", 512) * 2**20,
+        on_evict=CalendarService.close,
+    )
+    # Preparing is claimed separately so it does not block delivery
+    job = args.aggregate or ("prepare" if args.phase == "prepare" else "daily")
+    checkpoint = None
+    if args.checkpoint:
+        # Users resume by their own local date, kept per user in the file
+        checkpoint = BatchCheckpoint(args.checkpoint, job)
+
+    runner = BatchRunner(
+        shared_config,
+        profiles,
+        digest_factory=functools.partial(
+            OrbitDigest,
+            fetch_coordinator=coordinator,
+            delivery_backend=delivery_backend,
+            hedged_caller=hedged_caller,
+            retry_policy=retry_policy,
+            calendar_breaker=calendar_breaker,
+            email_breaker=email_breaker,
+            credential_manager=credential_manager,
+            service_pool=service_pool,
+            send_ledger=ledger,
+            history_store=history_store,
+            search_index=search_index,
+            staging_store=staging_store,
+            change_tracker=change_tracker,
+        ),
+        shard=args.shard,
+        claims=claims,
+        takeover=args.takeover,
+        job=job,
+        ledger=ledger,
+        checkpoint=checkpoint,
+        due_only=args.phase == "deliver",
+        retry_rounds=shared_config.get("retry_queue_rounds", 3),
+        credential_manager=credential_manager,
+        delivery_grace=shared_config.get("delivery_grace_minutes", 15) * 60,
+    )
+    if args.profile:
+        with Profiler(args.profile):
+            result = runner.run()
+    else:
+        result = runner.run()
 
-    # try:
-    digest = OrbitDigest()
-    success = digest.run_digest()
+    if checkpoint is not None:
+        checkpoint.close()
+    delivery_backend.close()
+    hedged_caller.shutdown()
+    credential_manager.shutdown()
+    service_pool.clear()
+    for store in stores:
+        if store is not None:
+            store.close()
 
-    if success:
+    if coordinator.shared:
+        logger.info(
+            "Shared calendars: {} fetches, {} served from a shared fetch",
+            coordinator.fetches,
+            coordinator.shared,
+        )
+
+    if hedged_caller.hedges or hedged_caller.timeouts:
+        logger.info(
+            "Calendar calls: {} total, {} hedged ({} won), {} timed out",
+            hedged_caller.calls,
+            hedged_caller.hedges,
+            hedged_caller.hedge_wins,
+            hedged_caller.timeouts,
+        )
+
+    if service_pool.hits:
+        logger.info(
+            "Calendar clients: {} reused ({:.0%} hit rate), {} evicted, "
+            "pool peaked at {:.1f} MB",
+            service_pool.hits,
+            service_pool.hit_rate,
+            service_pool.evictions,
+            service_pool.peak_bytes / 2**20,
+        )
+
+    for breaker in breakers:
+        if breaker.opened:
+            logger.warning(
+                "{} circuit opened {} times, {} calls rejected",
+                breaker.name,
+                breaker.opened,
+                breaker.rejected,
+            )
+
+    if result.success:
         logger.info("OrbitDigest completed successfully")
-        return 0
     else:
         logger.error("OrbitDigest failed")
-        return 1
 
-    # except Exception as e:
-    #     logger.error(f"Fatal error in OrbitDigest: {e}")
-    #     return 1
+    # Flush the background log sink before exiting
+    logger.complete()
+    return 0 if result.success else 1
+
+
+def _roster_defaults() -> Dict[str, Any]:
+    """Collect per-user defaults for roster entries from the environment."""
+    defaults = {}
+    for name in ("timezone", "digest_hour", "quiet_hours_start", "quiet_hours_end"):
+        value = os.getenv(name.upper())
+        if value:
+            defaults[name] = value
+    return defaults
 
 
 if __name__ == "__main__":
@@ -0,0 +1,463 @@
+"""Calendar push-notification channels and webhook receiver."""
+
+import argparse
+import copy
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from loguru import logger
+
+DEFAULT_CHANNEL_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_RENEW_BEFORE_SECONDS = 3600
+
+
+class WatchChannel:
+    """A registered events.watch notification channel."""
+
+    __slots__ = (
+        "channel_id",
+        "calendar_id",
+        "resource_id",
+        "token",
+        "expiration",
+        "owner",
+    )
+
+    def __init__(
+        self,
+        channel_id: str,
+        calendar_id: str,
+        resource_id: str,
+        token: str,
+        expiration: float,
+        owner: str = "",
+    ):
+        self.channel_id = channel_id
+        self.calendar_id = calendar_id
+        self.resource_id = resource_id
+        self.token = token
+        self.expiration = expiration
+        # Calendar ids such as "primary" are only unique per user
+        self.owner = owner
+
+    def is_active(self, now: Optional[float] = None) -> bool:
+        """Return True if the channel has not expired."""
+        return self.expiration > (now if now is not None else time.time())
+
+
+class ChangeTracker:
+    """SQLite-backed record of watch channels and calendars with pending changes.
+
+    The webhook receiver and the digest runner may live in different
+    processes; both open the same database. Channels and dirty calendars
+    are kept per owner, so the users of a roster can share one database
+    even though each has a calendar called "primary". The items last
+    fetched for each calendar are kept too, so a run in a new process can
+    skip calendars that have not changed since.
+    """
+
+    def __init__(self, db_path: str, owner: str = ""):
+        """
+        Initialize ChangeTracker.
+
+        Args:
+            db_path: Path to the SQLite database.
+            owner: User whose calendars this tracker looks up and marks.
+                The receiver needs none; it marks the owner of the
+                notified channel.
+        """
+        self.db_path = db_path
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(channels)")]
+        if columns and "owner" not in columns:
+            # Rows without an owner cannot be told apart; their calendars
+            # are polled until a new channel is registered
+            self._conn.executescript(
+                """
+                DROP TABLE channels;
+                DROP TABLE IF EXISTS dirty;
+                """
+            )
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS channels (
+                channel_id TEXT PRIMARY KEY,
+                calendar_id TEXT NOT NULL,
+                resource_id TEXT NOT NULL,
+                token TEXT NOT NULL,
+                expiration REAL NOT NULL,
+                owner TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dirty (
+                owner TEXT NOT NULL,
+                calendar_id TEXT NOT NULL,
+                marked_at REAL NOT NULL,
+                PRIMARY KEY (owner, calendar_id)
+            );
+            CREATE TABLE IF NOT EXISTS windows (
+                owner TEXT NOT NULL,
+                calendar_id TEXT NOT NULL,
+                time_min TEXT NOT NULL,
+                time_max TEXT NOT NULL,
+                items TEXT NOT NULL,
+                PRIMARY KEY (owner, calendar_id)
+            );
+            """
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def for_owner(self, owner: str) -> "ChangeTracker":
+        """
+        Get a tracker for another user on the same connection.
+
+        Args:
+            owner: User whose calendars the returned tracker looks up and marks.
+
+        Returns:
+            ChangeTracker sharing this tracker's connection, so closing
+            either closes both.
+        """
+        tracker = copy.copy(self)
+        tracker.owner = owner
+        return tracker
+
+    def add_channel(self, channel: WatchChannel) -> None:
+        """
+        Record a registered channel.
+
+        Args:
+            channel: Channel returned by events.watch.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    channel.channel_id,
+                    channel.calendar_id,
+                    channel.resource_id,
+                    channel.token,
+                    channel.expiration,
+                    channel.owner,
+                ),
+            )
+
+    def get_channel(self, channel_id: str) -> Optional[WatchChannel]:
+        """
+        Look up a channel by id.
+
+        Args:
+            channel_id: Channel identifier from the X-Goog-Channel-ID header.
+
+        Returns:
+            WatchChannel, or None if unknown.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM channels WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        return WatchChannel(*row) if row else None
+
+    def active_channel(self, calendar_id: str) -> Optional[WatchChannel]:
+        """
+        Get the longest-lived unexpired channel for a calendar of the owner.
+
+        Args:
+            calendar_id: Calendar identifier.
+
+        Returns:
+            WatchChannel, or None if the calendar is not watched.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM channels "
+                "WHERE owner = ? AND calendar_id = ? AND expiration > ? "
+                "ORDER BY expiration DESC LIMIT 1",
+                (self.owner, calendar_id, time.time()),
+            ).fetchone()
+        return WatchChannel(*row) if row else None
+
+    def expired_channels(self) -> List[WatchChannel]:
+        """Get channels past their expiration."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM channels WHERE expiration <= ?", (time.time(),)
+            ).fetchall()
+        return [WatchChannel(*row) for row in rows]
+
+    def remove_channel(self, channel_id: str) -> None:
+        """
+        Forget a channel.
+
+        Args:
+            channel_id: Channel identifier.
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM channels WHERE channel_id = ?", (channel_id,)
+            )
+
+    def mark_dirty(self, calendar_id: str, owner: Optional[str] = None) -> None:
+        """
+        Record that a calendar has changed since it was last fetched.
+
+        Args:
+            calendar_id: Calendar identifier.
+            owner: User owning the calendar (this tracker's owner if None).
+        """
+        owner = self.owner if owner is None else owner
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirty VALUES (?, ?, ?)",
+                (owner, calendar_id, time.time()),
+            )
+
+    def mark_clean(self, calendar_id: str) -> None:
+        """
+        Record that a calendar is about to be fetched.
+
+        Call this before fetching, so a notification arriving during the
+        fetch leaves the calendar dirty for the next run.
+
+        Args:
+            calendar_id: Calendar identifier.
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM dirty WHERE owner = ? AND calendar_id = ?",
+                (self.owner, calendar_id),
+            )
+
+    def cached_items(
+        self, calendar_id: str, time_min: str, time_max: str
+    ) -> Optional[List[dict]]:
+        """
+        Get the items last fetched for a calendar window of the owner.
+
+        Args:
+            calendar_id: Calendar identifier.
+            time_min: Window start (UTC ISO format).
+            time_max: Window end (UTC ISO format).
+
+        Returns:
+            Raw event items, or None if this window was not fetched last.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT items FROM windows WHERE owner = ? AND calendar_id = ? "
+                "AND time_min = ? AND time_max = ?",
+                (self.owner, calendar_id, time_min, time_max),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_items(
+        self, calendar_id: str, time_min: str, time_max: str, items: List[dict]
+    ) -> None:
+        """
+        Keep the items fetched for a calendar window, replacing the last one.
+
+        Args:
+            calendar_id: Calendar identifier.
+            time_min: Window start (UTC ISO format).
+            time_max: Window end (UTC ISO format).
+            items: Raw event items.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO windows VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.owner,
+                    calendar_id,
+                    time_min,
+                    time_max,
+                    json.dumps(items, separators=(",", ":")),
+                ),
+            )
+
+    def needs_refresh(self, calendar_id: str) -> bool:
+        """
+        Check whether a calendar must be fetched.
+
+        Calendars without an active channel always need a refresh, so an
+        expired or missing channel falls back to polling.
+
+        Args:
+            calendar_id: Calendar identifier.
+
+        Returns:
+            True if the calendar is dirty or not watched.
+        """
+        if self.active_channel(calendar_id) is None:
+            return True
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM dirty WHERE owner = ? AND calendar_id = ?",
+                (self.owner, calendar_id),
+            ).fetchone()
+        return row is not None
+
+    def record_notification(
+        self, channel_id: str, resource_state: str, token: Optional[str]
+    ) -> Optional[str]:
+        """
+        Handle a push notification.
+
+        Args:
+            channel_id: Value of the X-Goog-Channel-ID header.
+            resource_state: Value of the X-Goog-Resource-State header.
+            token: Value of the X-Goog-Channel-Token header.
+
+        Returns:
+            The calendar id marked dirty, or None if the notification was
+            ignored (unknown channel, bad token or initial sync message).
+        """
+        channel = self.get_channel(channel_id)
+        if channel is None or not secrets.compare_digest(channel.token, token or ""):
+            logger.warning("Ignoring notification for unknown channel {}", channel_id)
+            return None
+
+        if resource_state == "sync":
+            return None
+
+        self.mark_dirty(channel.calendar_id, owner=channel.owner)
+        logger.debug("Calendar {} changed ({})", channel.calendar_id, resource_state)
+        return channel.calendar_id
+
+    def ensure_channel(
+        self,
+        service,
+        calendar_id: str,
+        address: str,
+        ttl_seconds: int = DEFAULT_CHANNEL_TTL_SECONDS,
+        renew_before_seconds: int = DEFAULT_RENEW_BEFORE_SECONDS,
+    ) -> WatchChannel:
+        """
+        Register an events.watch channel unless a long-lived one exists.
+
+        Args:
+            service: Google Calendar API service resource.
+            calendar_id: Calendar to watch.
+            address: HTTPS URL of the notification receiver.
+            ttl_seconds: Requested channel lifetime.
+            renew_before_seconds: Renew channels expiring within this window.
+
+        Returns:
+            The active WatchChannel.
+        """
+        channel = self.active_channel(calendar_id)
+        if channel is not None and channel.expiration > (
+            time.time() + renew_before_seconds
+        ):
+            return channel
+
+        token = secrets.token_urlsafe(24)
+        response = (
+            service.events()
+            .watch(
+                calendarId=calendar_id,
+                body={
+                    "id": str(uuid.uuid4()),
+                    "type": "web_hook",
+                    "address": address,
+                    "token": token,
+                    "params": {"ttl": str(ttl_seconds)},
+                },
+            )
+            .execute()
+        )
+
+        channel = WatchChannel(
+            channel_id=response["id"],
+            calendar_id=calendar_id,
+            resource_id=response["resourceId"],
+            token=token,
+            expiration=int(response["expiration"]) / 1000,
+            owner=self.owner,
+        )
+        self.add_channel(channel)
+        # Changes before the channel existed were not observed
+        self.mark_dirty(calendar_id)
+        logger.info(
+            "Registered watch channel {} for {}", channel.channel_id, calendar_id
+        )
+        return channel
+
+
+def create_receiver(
+    tracker: ChangeTracker, host: str = "0.0.0.0", port: int = 8080
+) -> ThreadingHTTPServer:
+    """
+    Create an HTTP server that records push notifications.
+
+    Args:
+        tracker: ChangeTracker receiving the notifications.
+        host: Interface to bind.
+        port: Port to bind (0 picks a free port).
+
+    Returns:
+        Unstarted ThreadingHTTPServer.
+    """
+
+    class NotificationHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            # Notification bodies are empty, but drain any payload
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+
+            channel_id = self.headers.get("X-Goog-Channel-ID")
+            resource_state = self.headers.get("X-Goog-Resource-State")
+            if not channel_id or not resource_state:
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            tracker.record_notification(
+                channel_id, resource_state, self.headers.get("X-Goog-Channel-Token")
+            )
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            # Lazy, so the request line is only formatted when debug logs are on
+            logger.opt(lazy=True).debug(
+                "Notification receiver: {}", lambda: format % args
+            )
+
+    return ThreadingHTTPServer((host, port), NotificationHandler)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the notification receiver."""
+    parser = argparse.ArgumentParser(description="Calendar push notification receiver")
+    parser.add_argument("--tracker-db", required=True, help="ChangeTracker database")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    server = create_receiver(ChangeTracker(args.tracker_db), args.host, args.port)
+    logger.info("Listening for calendar notifications on {}:{}", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,173 @@
+"""Memory-bounded LRU pool of per-user API clients."""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+DEFAULT_POOL_BYTES = 512 * 1024 * 1024
+
+
+class ServicePool(Generic[T]):
+    """Keeps warm clients by key and evicts the least recently used.
+
+    Clients are kept while the estimated memory of all of them stays
+    within max_bytes. Entries grow while in use (their caches fill during
+    a run), so the entry handed out last is measured again on the next
+    get, before anything is evicted. The entry being handed out is never
+    evicted, even if it alone exceeds the budget.
+
+    Pooled clients keep whatever they were built with, so a long-lived
+    pool must be used with long-lived collaborators.
+    """
+
+    def __init__(
+        self,
+        size_of: Callable[[T], int],
+        max_bytes: int = DEFAULT_POOL_BYTES,
+        on_evict: Optional[Callable[[T], None]] = None,
+    ):
+        """
+        Initialize ServicePool.
+
+        Args:
+            size_of: Estimates the memory held by a client in bytes.
+            max_bytes: Memory budget of all pooled clients.
+            on_evict: Releases an evicted client's resources.
+        """
+        self.size_of = size_of
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+
+        self._entries: "OrderedDict[Hashable, T]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._last_key: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of gets served from the pool."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: Hashable, create: Callable[[], T]) -> T:
+        """
+        Get the client of a key, creating it on a miss.
+
+        Args:
+            key: Identifies the client, e.g. the user and their settings.
+            create: Builds a new client; called without the pool lock.
+
+        Returns:
+            Pooled or newly created client.
+        """
+        with self._lock:
+            self._remeasure_last()
+            client = self._entries.get(key)
+            if client is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._last_key = key
+                evicted = self._evict(keep=key)
+            else:
+                self.misses += 1
+
+        if client is not None:
+            self._release(evicted)
+            return client
+
+        client = create()
+        evicted = []
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # Built concurrently by another caller; keep theirs
+                evicted.append(client)
+                client = existing
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = client
+                self._sizes[key] = self.size_of(client)
+                self.bytes += self._sizes[key]
+                self.peak_bytes = max(self.peak_bytes, self.bytes)
+            self._last_key = key
+            evicted.extend(self._evict(keep=key))
+
+        self._release(evicted)
+        return client
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Remove a client, e.g. after its credentials were revoked.
+
+        Args:
+            key: Client key.
+        """
+        with self._lock:
+            client = self._pop(key)
+        if client is not None:
+            self._release([client])
+
+    def clear(self) -> None:
+        """Remove and release all clients."""
+        with self._lock:
+            clients = list(self._entries.values())
+            self._entries.clear()
+            self._sizes.clear()
+            self._last_key = None
+            self.bytes = 0
+        self._release(clients)
+
+    def _remeasure_last(self) -> None:
+        key = self._last_key
+        if key is None or key not in self._entries:
+            return
+        size = self.size_of(self._entries[key])
+        self.bytes += size - self._sizes[key]
+        self._sizes[key] = size
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+
+    def _evict(self, keep: Hashable) -> list:
+        evicted = []
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            evicted.append(self._pop(key))
+            self.evictions += 1
+        if evicted:
+            logger.debug(
+                "Evicted {} clients, pool at {:.1f} MB",
+                len(evicted),
+                self.bytes / 2**20,
+            )
+        return evicted
+
+    def _pop(self, key: Hashable) -> Optional[T]:
+        client = self._entries.pop(key, None)
+        if client is not None:
+            self.bytes -= self._sizes.pop(key)
+            if self._last_key == key:
+                self._last_key = None
+        return client
+
+    def _release(self, clients: list) -> None:
+        if self.on_evict is None:
+            return
+        for client in clients:
+            try:
+                self.on_evict(client)
+            except Exception as e:
+                logger.warning(f"Could not release pooled client: {e}")
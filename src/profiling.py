@@ -0,0 +1,199 @@
+"""Run profiling: cProfile stats, collapsed stacks and stage timings."""
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+PSTATS_FILE = "orbit_digest.pstats"
+COLLAPSED_FILE = "orbit_digest.collapsed"
+SUMMARY_FILE = "orbit_digest.txt"
+
+_NULL_STAGE = contextlib.nullcontext()
+_active: Optional["Profiler"] = None
+
+
+def stage(name: str):
+    """
+    Annotate a block of work as a named stage of the run.
+
+    Stages nest, e.g. "fetch;list". Outside a profiled run this returns a
+    shared no-op context manager, so annotations cost almost nothing.
+
+    Args:
+        name: Stage name, e.g. "token_refresh" or "send".
+
+    Returns:
+        Context manager timing the block.
+    """
+    profiler = _active
+    if profiler is None or threading.get_ident() != profiler.thread_id:
+        return _NULL_STAGE
+    return profiler.stage(name)
+
+
+class StageTiming:
+    """Accumulated wall time of one stage path."""
+
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+class Profiler:
+    """Profiles the calling thread with cProfile and a stack sampler.
+
+    On exit it writes, into `output_dir`:
+
+    - orbit_digest.pstats: cProfile data for `python -m pstats` or snakeviz.
+    - orbit_digest.collapsed: sampled stacks in collapsed format
+      ("frame;frame;frame count"), prefixed with the active stage, ready
+      for flamegraph.pl or speedscope.
+    - orbit_digest.txt: time per stage and the top functions.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+        top_functions: int = 30,
+    ):
+        """
+        Initialize Profiler.
+
+        Args:
+            output_dir: Directory for the output files (created if missing).
+            sample_interval: Seconds between stack samples.
+            top_functions: Number of functions listed in the summary.
+        """
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.top_functions = top_functions
+        self.thread_id: Optional[int] = None
+        self.stages: Dict[str, StageTiming] = {}
+        self.samples: Counter = Counter()
+        self.wall_seconds = 0.0
+        self._stage_stack: List[str] = []
+        self._profile = cProfile.Profile()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        if _active is not None:
+            raise RuntimeError("A profiler is already active")
+
+        self.thread_id = threading.get_ident()
+        _active = self
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="profiler-sampler", daemon=True
+        )
+        self._started = time.perf_counter()
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        global _active
+        self._profile.disable()
+        self.wall_seconds = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+        _active = None
+        self.write()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Time a stage; prefer the module-level stage() in application code.
+
+        Args:
+            name: Stage name.
+        """
+        self._stage_stack.append(name)
+        path = ";".join(self._stage_stack)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing = self.stages.get(path)
+            if timing is None:
+                timing = self.stages[path] = StageTiming()
+            timing.calls += 1
+            timing.seconds += time.perf_counter() - started
+            self._stage_stack.pop()
+
+    def _sample_loop(self) -> None:
+        own_files = {__file__, contextlib.__file__}
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename not in own_files:
+                    frames.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                        f":{code.co_firstlineno})".replace(";", ",")
+                    )
+                frame = frame.f_back
+            if not frames:
+                continue
+            # Copy before joining, the profiled thread may push or pop
+            stages = [f"stage:{name}" for name in list(self._stage_stack)]
+            self.samples[";".join(stages + frames[::-1])] += 1
+
+    def write(self) -> None:
+        """Write pstats, collapsed stacks and the stage summary."""
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self._profile.dump_stats(os.path.join(self.output_dir, PSTATS_FILE))
+
+        with open(
+            os.path.join(self.output_dir, COLLAPSED_FILE), "w", encoding="utf-8"
+        ) as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+        summary = self.summary()
+        with open(
+            os.path.join(self.output_dir, SUMMARY_FILE), "w", encoding="utf-8"
+        ) as f:
+            f.write(summary)
+
+        logger.info("Profile written to {}", self.output_dir)
+        for line in self.stage_lines():
+            logger.info(line)
+
+    def stage_lines(self) -> List[str]:
+        """Format per-stage wall time, slowest first."""
+        wall = self.wall_seconds or 1.0
+        lines = [f"Total wall time: {self.wall_seconds:.3f}s"]
+        for path, timing in sorted(
+            self.stages.items(), key=lambda item: item[1].seconds, reverse=True
+        ):
+            lines.append(
+                f"{path:<32} {timing.calls:>6} calls {timing.seconds:>9.3f}s "
+                f"{timing.seconds / wall:>6.1%}"
+            )
+        return lines
+
+    def summary(self) -> str:
+        """Build the text summary: stage timings and the top functions."""
+        out = io.StringIO()
+        out.write("\n".join(self.stage_lines()))
+        out.write("\n\n")
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(self.top_functions)
+        return out.getvalue()
@@ -0,0 +1,524 @@
+"""Local expansion of recurring calendar events."""
+
+import calendar as calendar_module
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from .timezones import get_timezone
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+SUPPORTED_PARTS = {
+    "FREQ",
+    "INTERVAL",
+    "COUNT",
+    "UNTIL",
+    "BYDAY",
+    "BYMONTHDAY",
+    "BYMONTH",
+    "WKST",
+}
+# Upper bound on generated periods, guards against rules that never match
+MAX_PERIODS = 10000
+
+
+class RecurrenceRule:
+    """Parsed subset of an RFC 5545 RRULE."""
+
+    def __init__(self, rule: str):
+        """
+        Parse an RRULE value.
+
+        Args:
+            rule: Rule such as "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10".
+
+        Raises:
+            ValueError: If the rule uses parts that are not supported.
+        """
+        parts = {}
+        for part in rule.split(";"):
+            if not part:
+                continue
+            name, _, value = part.partition("=")
+            parts[name.upper()] = value
+
+        unsupported = set(parts) - SUPPORTED_PARTS
+        if unsupported:
+            raise ValueError(
+                f"Unsupported RRULE parts: {', '.join(sorted(unsupported))}"
+            )
+
+        self.freq = parts.get("FREQ", "").upper()
+        if self.freq not in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+            raise ValueError(f"Unsupported RRULE frequency: {self.freq or rule}")
+
+        self.interval = int(parts.get("INTERVAL", "1"))
+        self.count = int(parts["COUNT"]) if "COUNT" in parts else None
+        self.until = parts.get("UNTIL")
+        self.by_month = (
+            [int(m) for m in parts["BYMONTH"].split(",")] if "BYMONTH" in parts else []
+        )
+        self.by_month_day = (
+            [int(d) for d in parts["BYMONTHDAY"].split(",")]
+            if "BYMONTHDAY" in parts
+            else []
+        )
+        self.by_day: List[Tuple[Optional[int], int]] = []
+        for item in filter(None, parts.get("BYDAY", "").split(",")):
+            ordinal, weekday = item[:-2], item[-2:].upper()
+            if weekday not in WEEKDAYS:
+                raise ValueError(f"Invalid BYDAY value: {item}")
+            self.by_day.append((int(ordinal) if ordinal else None, WEEKDAYS[weekday]))
+        week_start = parts.get("WKST", "MO").upper()
+        if week_start not in WEEKDAYS:
+            raise ValueError(f"Invalid WKST value: {week_start}")
+        self.week_start = WEEKDAYS[week_start]
+
+        if self.interval < 1:
+            raise ValueError(f"Invalid RRULE interval: {self.interval}")
+        # Without BYMONTH these expand across the whole year, which only the
+        # server does; only dtstart's month is expanded here
+        if (
+            self.freq == "YEARLY"
+            and not self.by_month
+            and (self.by_day or self.by_month_day)
+        ):
+            raise ValueError(f"Unsupported yearly RRULE without BYMONTH: {rule}")
+
+    def occurrences(
+        self,
+        dtstart: datetime,
+        window_end: datetime,
+        window_start: Optional[datetime] = None,
+    ) -> Iterator[datetime]:
+        """
+        Generate occurrence start times in wall-clock time of dtstart.
+
+        Args:
+            dtstart: Timezone-aware start of the first occurrence.
+            window_end: Stop before occurrences starting at or after this time.
+            window_start: Hint to skip whole periods before this time. Ignored
+                when COUNT is set, since every occurrence must be counted.
+
+        Yields:
+            Timezone-aware occurrence start times in the tz of dtstart.
+        """
+        tz = dtstart.tzinfo
+        local_start = dtstart.replace(tzinfo=None)
+        until = self._parse_until(tz)
+        emitted = 0
+
+        first_period = 0
+        if window_start is not None and self.count is None:
+            target = window_start.astimezone(tz).replace(tzinfo=None)
+            first_period = max(0, self._period_offset(local_start, target) - 1)
+
+        for period in range(first_period, first_period + MAX_PERIODS):
+            for candidate in self._period_candidates(local_start, period):
+                if candidate < local_start:
+                    continue
+
+                occurrence = candidate.replace(tzinfo=tz)
+                if until is not None and not until(occurrence):
+                    return
+                if occurrence >= window_end:
+                    return
+
+                yield occurrence
+                emitted += 1
+                if self.count is not None and emitted >= self.count:
+                    return
+
+    def _parse_until(self, tz: tzinfo):
+        if not self.until:
+            return None
+
+        value = self.until
+        if "T" not in value:
+            until_date = datetime.strptime(value, "%Y%m%d").date()
+            return lambda occurrence: occurrence.date() <= until_date
+
+        if value.endswith("Z"):
+            until_dt = datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(
+                tzinfo=timezone.utc
+            )
+        else:
+            until_dt = datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=tz)
+        return lambda occurrence: occurrence <= until_dt
+
+    def _period_offset(self, local_start: datetime, target: datetime) -> int:
+        if target <= local_start:
+            return 0
+        if self.freq == "DAILY":
+            elapsed = (target.date() - local_start.date()).days
+        elif self.freq == "WEEKLY":
+            elapsed = (
+                self._week_of(target.date()) - self._week_of(local_start.date())
+            ).days // 7
+        elif self.freq == "MONTHLY":
+            elapsed = (target.year - local_start.year) * 12 + (
+                target.month - local_start.month
+            )
+        else:
+            elapsed = target.year - local_start.year
+        return elapsed // self.interval
+
+    def _period_candidates(self, local_start: datetime, period: int) -> List[datetime]:
+        start_time = local_start.time()
+        step = period * self.interval
+
+        if self.freq == "DAILY":
+            day = local_start.date() + timedelta(days=step)
+            days = [day] if self._matches_day_filters(day) else []
+        elif self.freq == "WEEKLY":
+            # Weeks start on WKST, which decides the weeks INTERVAL skips
+            week_start = self._week_of(local_start.date()) + timedelta(weeks=step)
+            weekdays = {wd for _, wd in self.by_day} or {local_start.weekday()}
+            days = [
+                week_start + timedelta(days=(wd - self.week_start) % 7)
+                for wd in weekdays
+            ]
+            if self.by_month:
+                days = [d for d in days if d.month in self.by_month]
+        elif self.freq == "MONTHLY":
+            month_index = local_start.month - 1 + step
+            year, month = local_start.year + month_index // 12, month_index % 12 + 1
+            days = []
+            if not self.by_month or month in self.by_month:
+                days = self._days_in_month(year, month, local_start.day)
+        else:
+            year = local_start.year + step
+            days = []
+            for month in self.by_month or [local_start.month]:
+                days.extend(self._days_in_month(year, month, local_start.day))
+
+        return [datetime.combine(day, start_time) for day in sorted(days)]
+
+    def _week_of(self, day: date) -> date:
+        return day - timedelta(days=(day.weekday() - self.week_start) % 7)
+
+    def _matches_day_filters(self, day: date) -> bool:
+        if self.by_month and day.month not in self.by_month:
+            return False
+        if self.by_day and day.weekday() not in {wd for _, wd in self.by_day}:
+            return False
+        if self.by_month_day:
+            days_in_month = calendar_module.monthrange(day.year, day.month)[1]
+            allowed = {d if d > 0 else days_in_month + d + 1 for d in self.by_month_day}
+            if day.day not in allowed:
+                return False
+        return True
+
+    def _days_in_month(self, year: int, month: int, default_day: int) -> List[date]:
+        days_in_month = calendar_module.monthrange(year, month)[1]
+
+        month_days = None
+        if self.by_month_day:
+            month_days = []
+            for value in self.by_month_day:
+                day = value if value > 0 else days_in_month + value + 1
+                if 1 <= day <= days_in_month:
+                    month_days.append(date(year, month, day))
+
+        weekdays = None
+        if self.by_day:
+            weekdays = []
+            for ordinal, weekday in self.by_day:
+                matches = [
+                    date(year, month, day)
+                    for day in range(1, days_in_month + 1)
+                    if date(year, month, day).weekday() == weekday
+                ]
+                if ordinal is None:
+                    weekdays.extend(matches)
+                elif -len(matches) <= ordinal <= len(matches) and ordinal != 0:
+                    weekdays.append(matches[ordinal - 1 if ordinal > 0 else ordinal])
+
+        if month_days is not None and weekdays is not None:
+            # Both limit the set, e.g. Friday the 13th
+            return [day for day in month_days if day in set(weekdays)]
+        if month_days is not None:
+            return month_days
+        if weekdays is not None:
+            return weekdays
+
+        if default_day <= days_in_month:
+            return [date(year, month, default_day)]
+        return []
+
+
+def _parse_date_list(line: str, default_tz: tzinfo) -> List[datetime]:
+    """Parse an EXDATE or RDATE property into timezone-aware datetimes."""
+    params, _, values = line.partition(":")
+    tz = default_tz
+    is_date = False
+    for param in params.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.upper() == "TZID":
+            tz = get_timezone(value)
+        elif name.upper() == "VALUE" and value.upper() == "DATE":
+            is_date = True
+
+    result = []
+    for value in values.split(","):
+        value = value.strip()
+        if not value:
+            continue
+        if is_date or "T" not in value:
+            result.append(datetime.strptime(value, "%Y%m%d").replace(tzinfo=tz))
+        elif value.endswith("Z"):
+            result.append(
+                datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            )
+        else:
+            result.append(datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=tz))
+    return result
+
+
+def _parse_api_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _overlaps(
+    start: datetime, end: datetime, window_start: datetime, window_end: datetime
+) -> bool:
+    return start < window_end and end > window_start
+
+
+def expand_master(
+    master: Dict,
+    window_start: datetime,
+    window_end: datetime,
+    overridden: Optional[Set[datetime]] = None,
+    default_tz: Optional[tzinfo] = None,
+) -> List[Dict]:
+    """
+    Expand a recurring master event into instances overlapping a window.
+
+    Instances are shaped like items returned by events.list with
+    singleEvents=True, so they go through the same parsing and filtering.
+
+    Args:
+        master: Recurring master event with a "recurrence" list.
+        window_start: Start of the window (timezone-aware).
+        window_end: End of the window (timezone-aware).
+        overridden: Original start times (UTC) of instances replaced by
+            exception events; these are not generated.
+        default_tz: Timezone used when the master has no start.timeZone.
+
+    Returns:
+        List of instance event dicts.
+
+    Raises:
+        ValueError: If the recurrence uses unsupported rules.
+    """
+    start_info, end_info = master["start"], master["end"]
+    if "dateTime" not in start_info:
+        return []  # All-day series are never part of the digest
+
+    dtstart = _parse_api_datetime(start_info["dateTime"])
+    tz = (
+        get_timezone(start_info["timeZone"])
+        if start_info.get("timeZone")
+        else default_tz or dtstart.tzinfo
+    )
+    dtstart = dtstart.astimezone(tz)
+    duration = _parse_api_datetime(end_info["dateTime"]) - dtstart
+
+    rules, exdates, rdates = [], set(), []
+    for line in master.get("recurrence", []):
+        name = line.split(":", 1)[0].split(";", 1)[0].upper()
+        if name == "RRULE":
+            rules.append(RecurrenceRule(line.split(":", 1)[1]))
+        elif name == "EXDATE":
+            exdates.update(
+                dt.astimezone(timezone.utc) for dt in _parse_date_list(line, tz)
+            )
+        elif name == "RDATE":
+            rdates.extend(dt.astimezone(tz) for dt in _parse_date_list(line, tz))
+        else:
+            raise ValueError(f"Unsupported recurrence property: {name}")
+
+    # Look back by the event duration so instances already in progress count
+    search_start = window_start - duration
+    starts = set(rdates)
+    for rule in rules:
+        starts.update(rule.occurrences(dtstart, window_end, search_start))
+
+    overridden = overridden or set()
+    instances = []
+    for occurrence in sorted(starts):
+        occurrence_utc = occurrence.astimezone(timezone.utc)
+        if occurrence_utc in exdates or occurrence_utc in overridden:
+            continue
+        if not _overlaps(occurrence, occurrence + duration, window_start, window_end):
+            continue
+
+        instance = {k: v for k, v in master.items() if k != "recurrence"}
+        instance["id"] = f"{master['id']}_{occurrence_utc:%Y%m%dT%H%M%SZ}"
+        instance["recurringEventId"] = master["id"]
+        instance["originalStartTime"] = {
+            "dateTime": occurrence.isoformat(),
+            "timeZone": start_info.get("timeZone"),
+        }
+        instance["start"] = {"dateTime": occurrence.isoformat()}
+        instance["end"] = {"dateTime": (occurrence + duration).isoformat()}
+        instances.append(instance)
+
+    return instances
+
+
+def expand_items(
+    items: List[Dict],
+    window_start: datetime,
+    window_end: datetime,
+    default_tz: Optional[tzinfo] = None,
+) -> List[Dict]:
+    """
+    Expand an events.list response fetched with singleEvents=False.
+
+    Recurring masters are expanded locally, exception instances replace the
+    occurrences they override, and one-off events are kept if they overlap
+    the window.
+
+    Args:
+        items: Raw items (masters, exceptions and one-off events).
+        window_start: Start of the window (timezone-aware).
+        window_end: End of the window (timezone-aware).
+        default_tz: Timezone used for masters without start.timeZone.
+
+    Returns:
+        List of instance dicts ordered by start time.
+    """
+    overrides: Dict[str, Set[datetime]] = {}
+    for item in items:
+        original = item.get("originalStartTime", {}).get("dateTime")
+        if item.get("recurringEventId") and original:
+            overrides.setdefault(item["recurringEventId"], set()).add(
+                _parse_api_datetime(original).astimezone(timezone.utc)
+            )
+
+    result = []
+    for item in items:
+        if item.get("recurrence"):
+            result.extend(
+                expand_master(
+                    item,
+                    window_start,
+                    window_end,
+                    overrides.get(item.get("id"), set()),
+                    default_tz,
+                )
+            )
+            continue
+
+        start, end = item.get("start", {}), item.get("end", {})
+        if "dateTime" not in start or "dateTime" not in end:
+            # All-day events stay in the list so the usual filters apply
+            if item.get("status") != "cancelled":
+                result.append(item)
+            continue
+
+        if _overlaps(
+            _parse_api_datetime(start["dateTime"]),
+            _parse_api_datetime(end["dateTime"]),
+            window_start,
+            window_end,
+        ):
+            result.append(item)
+
+    result.sort(key=_sort_key)
+    logger.debug("Expanded {} items into {} instances", len(items), len(result))
+    return result
+
+
+def _sort_key(item: Dict) -> datetime:
+    start = item.get("start", {})
+    if "dateTime" in start:
+        return _parse_api_datetime(start["dateTime"]).astimezone(timezone.utc)
+    return datetime.min.replace(tzinfo=timezone.utc)
+
+
+class RecurringEventCache:
+    """Caches singleEvents=False listings so windows expand without refetching."""
+
+    def __init__(self, horizon_days: int = 31):
+        """
+        Initialize RecurringEventCache.
+
+        Args:
+            horizon_days: How far past a requested window to fetch, so later
+                windows can be served from the same listing.
+        """
+        self.horizon = timedelta(days=horizon_days)
+        self._entries: Dict[str, Tuple[datetime, datetime, List[Dict]]] = {}
+
+    def get(
+        self, calendar_id: str, start: datetime, end: datetime
+    ) -> Optional[List[Dict]]:
+        """
+        Get cached items covering a window.
+
+        Args:
+            calendar_id: Calendar identifier.
+            start: Window start.
+            end: Window end.
+
+        Returns:
+            Cached raw items, or None if the window is not covered.
+        """
+        entry = self._entries.get(calendar_id)
+        if entry is None:
+            return None
+        cached_start, cached_end, items = entry
+        if cached_start <= start and end <= cached_end:
+            return items
+        return None
+
+    def fetch_range(self, start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+        """
+        Get the range to fetch for a window that is not cached.
+
+        Args:
+            start: Window start.
+            end: Window end.
+
+        Returns:
+            (start, end) widened by the cache horizon.
+        """
+        return start, max(end, start + self.horizon)
+
+    def put(
+        self, calendar_id: str, start: datetime, end: datetime, items: List[Dict]
+    ) -> None:
+        """
+        Cache a listing.
+
+        Args:
+            calendar_id: Calendar identifier.
+            start: Start of the fetched range.
+            end: End of the fetched range.
+            items: Raw items fetched with singleEvents=False.
+        """
+        self._entries[calendar_id] = (start, end, items)
+
+    def clear(self) -> None:
+        """Drop all cached listings."""
+        self._entries.clear()
+
+    def item_count(self) -> int:
+        """Return the number of raw items held by the cache."""
+        return sum(len(items) for _, _, items in self._entries.values())
+
+    def invalidate(self, calendar_id: Optional[str] = None) -> None:
+        """
+        Drop cached listings.
+
+        Args:
+            calendar_id: Calendar to drop, or None to drop everything.
+        """
+        if calendar_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(calendar_id, None)
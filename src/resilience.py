@@ -0,0 +1,274 @@
+"""Retry policy and circuit breakers for calls to external providers."""
+
+import random
+import smtplib
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, TypeVar
+
+from google.auth.exceptions import RefreshError, TransportError
+from googleapiclient.errors import HttpError
+from loguru import logger
+
+from .deadlines import remaining
+from .delivery import DeliveryError
+
+T = TypeVar("T")
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 10.0
+DEFAULT_FAILURE_RATE = 0.5
+DEFAULT_MIN_CALLS = 10
+DEFAULT_BREAKER_WINDOW = 50
+DEFAULT_COOLDOWN = 30.0
+
+# Google reports quota exhaustion as 403 with one of these reasons
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} circuit is open, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Classify an error as worth retrying.
+
+    Rate limiting, server errors, timeouts and connection failures are
+    transient. Authentication failures and other client errors are not:
+    retrying them only repeats the same answer.
+
+    Args:
+        error: Exception raised by a provider call.
+
+    Returns:
+        True if the call may succeed when retried.
+    """
+    if isinstance(error, RefreshError):
+        return False
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status == 403:
+            details = error.error_details
+            if not isinstance(details, list):
+                return False
+            return any(
+                isinstance(detail, dict) and detail.get("reason") in RATE_LIMIT_REASONS
+                for detail in details
+            )
+        return status == 429 or status >= 500
+    if isinstance(error, DeliveryError):
+        # No status means the request never got an answer
+        status = error.status_code
+        return status is None or status == 429 or status >= 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # Timeouts, resets and refused connections (smtplib errors are OSErrors
+    # too, hence the checks above)
+    return isinstance(error, (TransportError, OSError))
+
+
+class CircuitBreaker:
+    """Fails calls to a provider fast while its error rate is high.
+
+    The breaker watches the outcome of the last window calls. Once at
+    least min_calls were made and the share of transient failures reaches
+    failure_rate, it opens: calls raise CircuitOpenError without reaching
+    the provider. After cooldown seconds one probe call is let through;
+    success closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = DEFAULT_FAILURE_RATE,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        window: int = DEFAULT_BREAKER_WINDOW,
+        cooldown: float = DEFAULT_COOLDOWN,
+    ):
+        """
+        Initialize CircuitBreaker.
+
+        Args:
+            name: Provider name used in logs and errors.
+            failure_rate: Share of failed calls that opens the circuit.
+            min_calls: Calls in the window before the rate is trusted.
+            window: Number of most recent call outcomes considered.
+            cooldown: Seconds the circuit stays open before a probe.
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Return "closed", "open" or "half_open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half_open"
+
+    def before_call(self) -> None:
+        """
+        Check that a call may go to the provider.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                probe already in flight.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0 and not self._probing:
+                self._probing = True
+                logger.info("Probing {} after cooldown", self.name)
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(remaining, 0))
+
+    def record_success(self) -> None:
+        """Record a call the provider answered."""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("{} circuit closed", self.name)
+                self._opened_at = None
+                self._probing = False
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Record a call that failed with a transient error."""
+        with self._lock:
+            if self._opened_at is not None:
+                # The probe failed
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return
+
+            self._outcomes.append(False)
+            if len(self._outcomes) < self.min_calls:
+                return
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.failure_rate:
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                logger.warning(
+                    "{} circuit opened: {} of the last {} calls failed",
+                    self.name,
+                    failures,
+                    len(self._outcomes),
+                )
+
+
+class RetryPolicy:
+    """Retries transient failures with capped exponential backoff.
+
+    Delays use full jitter (a random delay up to the exponential bound) so
+    retries from many users do not arrive at the provider in waves. Within
+    a deadline scope, no delay sleeps past the deadline.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ):
+        """
+        Initialize RetryPolicy.
+
+        Args:
+            max_attempts: Attempts per call, the first one included.
+            base_delay: Upper bound of the first backoff in seconds.
+            max_delay: Upper bound of any backoff in seconds.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Get the delay after a failed attempt.
+
+        Args:
+            attempt: Number of the attempt that failed, starting at 1.
+
+        Returns:
+            Delay in seconds.
+        """
+        bound = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, bound)
+
+    def call(self, fn: Callable[[], T], breaker: Optional[CircuitBreaker] = None) -> T:
+        """
+        Run a call, retrying transient failures.
+
+        Args:
+            fn: The provider call.
+            breaker: Circuit breaker of the provider; every attempt is
+                checked against it and reported to it.
+
+        Returns:
+            Result of the first successful attempt.
+
+        Raises:
+            CircuitOpenError: If the breaker rejects an attempt.
+            Exception: The last error if it is not transient or no
+                attempts are left.
+        """
+        attempt = 1
+        while True:
+            if breaker is not None:
+                breaker.before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                transient = is_transient(e)
+                if breaker is not None:
+                    # Permanent errors are answers; the provider is up
+                    if transient:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if not transient or attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                left = remaining()
+                if left is not None:
+                    delay = min(delay, max(left, 0))
+                logger.warning(
+                    "Attempt {} failed ({}), retrying in {:.2f}s", attempt, e, delay
+                )
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+# Calls without a configured policy still report to their breaker
+NO_RETRY = RetryPolicy(max_attempts=1)
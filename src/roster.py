@@ -0,0 +1,213 @@
+"""User roster loading and bulk validation for multi-user runs."""
+
+import csv
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from .utils import is_valid_email, validate_hour, validate_timezone
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+DEFAULT_TIMEZONE = "Europe/Berlin"
+
+
+class UserProfile:
+    """Compact per-user settings record."""
+
+    __slots__ = (
+        "user_id",
+        "email_recipient",
+        "google_refresh_token",
+        "timezone",
+        "digest_hour",
+        "quiet_hours_start",
+        "quiet_hours_end",
+    )
+
+    def __init__(
+        self,
+        user_id: str,
+        email_recipient: str,
+        google_refresh_token: str,
+        timezone: str,
+        digest_hour: int = 7,
+        quiet_hours_start: int = 22,
+        quiet_hours_end: int = 7,
+    ):
+        self.user_id = user_id
+        self.email_recipient = email_recipient
+        self.google_refresh_token = google_refresh_token
+        # Thousands of users share a handful of zones; store one string each
+        self.timezone = sys.intern(timezone)
+        self.digest_hour = digest_hour
+        self.quiet_hours_start = quiet_hours_start
+        self.quiet_hours_end = quiet_hours_end
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "UserProfile":
+        """
+        Create a profile from a single-user configuration dict.
+
+        Args:
+            config: Configuration as returned by get_env_config.
+
+        Returns:
+            UserProfile identified by the recipient email.
+        """
+        return cls(
+            user_id=config.get("user_id") or config["email_recipient"],
+            email_recipient=config["email_recipient"],
+            google_refresh_token=config.get("google_refresh_token"),
+            timezone=config["timezone"],
+            digest_hour=config.get("digest_hour", 7),
+            quiet_hours_start=config.get("quiet_hours_start", 22),
+            quiet_hours_end=config.get("quiet_hours_end", 7),
+        )
+
+    def to_config(self, shared_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the full configuration for this user.
+
+        Args:
+            shared_config: Settings shared by all users (API keys, sender, ...).
+
+        Returns:
+            Configuration dict accepted by OrbitDigest.
+        """
+        config = dict(shared_config)
+        config.update(
+            {
+                "user_id": self.user_id,
+                "email_recipient": self.email_recipient,
+                "google_refresh_token": self.google_refresh_token,
+                "timezone": self.timezone,
+                "digest_hour": self.digest_hour,
+                "quiet_hours_start": self.quiet_hours_start,
+                "quiet_hours_end": self.quiet_hours_end,
+            }
+        )
+        return config
+
+
+def load_roster(
+    path: str, defaults: Optional[Dict[str, Any]] = None
+) -> List[UserProfile]:
+    """
+    Load and validate a user roster file.
+
+    Supported formats are JSON (a list of users or {"users": [...]}), TOML
+    ([[users]] tables) and CSV (one user per row with a header).
+
+    Args:
+        path: Path to the roster file.
+        defaults: Default values for settings missing from a user entry.
+
+    Returns:
+        List of validated UserProfile records.
+
+    Raises:
+        ValueError: If the format is unsupported or any entry is invalid.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        records = data["users"] if isinstance(data, dict) else data
+    elif extension == ".toml":
+        if tomllib is None:
+            raise ValueError("TOML rosters require Python 3.11+ or the tomli package")
+        with open(path, "rb") as f:
+            records = tomllib.load(f).get("users", [])
+    elif extension == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            records = list(csv.DictReader(f))
+    else:
+        raise ValueError(f"Unsupported roster format: {extension or path}")
+
+    profiles = validate_profiles(records, defaults)
+    logger.info(f"Loaded {len(profiles)} user profiles from {path}")
+    return profiles
+
+
+def validate_profiles(
+    records: Iterable[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None
+) -> List[UserProfile]:
+    """
+    Validate raw roster entries in bulk.
+
+    All entries are checked and every error is reported at once. Timezone
+    lookups are cached, so each distinct zone is only validated once.
+
+    Args:
+        records: Raw user entries.
+        defaults: Default values for settings missing from an entry.
+
+    Returns:
+        List of validated UserProfile records.
+
+    Raises:
+        ValueError: If any entry is invalid.
+    """
+    defaults = defaults or {}
+    default_timezone = defaults.get("timezone") or DEFAULT_TIMEZONE
+    profiles = []
+    errors = []
+    seen_ids = set()
+
+    for index, record in enumerate(records, start=1):
+        try:
+            email = record.get("email_recipient") or record.get("email")
+            if not is_valid_email(email):
+                raise ValueError(f"invalid email: {email}")
+
+            refresh_token = record.get("google_refresh_token")
+            if not refresh_token:
+                raise ValueError("missing google_refresh_token")
+
+            user_id = str(record.get("user_id") or email)
+            if user_id in seen_ids:
+                raise ValueError(f"duplicate user_id: {user_id}")
+            seen_ids.add(user_id)
+
+            profiles.append(
+                UserProfile(
+                    user_id=user_id,
+                    email_recipient=email,
+                    google_refresh_token=refresh_token,
+                    timezone=validate_timezone(
+                        record.get("timezone") or default_timezone
+                    ),
+                    digest_hour=_hour(record, defaults, "digest_hour", 7),
+                    quiet_hours_start=_hour(record, defaults, "quiet_hours_start", 22),
+                    quiet_hours_end=_hour(record, defaults, "quiet_hours_end", 7),
+                )
+            )
+        except ValueError as e:
+            errors.append(f"entry {index}: {e}")
+
+    if errors:
+        shown = "; ".join(errors[:10])
+        more = f" (and {len(errors) - 10} more)" if len(errors) > 10 else ""
+        raise ValueError(f"Invalid roster: {shown}{more}")
+
+    return profiles
+
+
+def _hour(
+    record: Dict[str, Any], defaults: Dict[str, Any], name: str, fallback: int
+) -> int:
+    value = record.get(name)
+    if value in (None, ""):
+        value = defaults.get(name, fallback)
+    return validate_hour(name, value)
@@ -0,0 +1,240 @@
+"""Full-text search over the event history."""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from typing import List, Optional
+
+from loguru import logger
+
+from .calendar import Event
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _owner_token(user_id: str) -> str:
+    # Searched as an FTS term, so user filtering is an index intersection
+    return "u" + hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:16]
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching all of its words.
+
+    Each word is quoted, so FTS5 operators in user input are treated as
+    plain text.
+
+    Args:
+        query: Free-text query, e.g. "alice budget".
+
+    Returns:
+        FTS5 MATCH expression, or None if the query has no words.
+    """
+    terms = TERM_PATTERN.findall(query)
+    if not terms:
+        return None
+    return " AND ".join(f'"{term}"' for term in terms)
+
+
+class SearchHit:
+    """An event matching a search."""
+
+    __slots__ = ("day", "start", "summary", "location", "attendees")
+
+    def __init__(
+        self,
+        day: date,
+        start: datetime,
+        summary: str,
+        location: Optional[str],
+        attendees: List[str],
+    ):
+        self.day = day
+        self.start = start
+        self.summary = summary
+        self.location = location
+        self.attendees = attendees
+
+
+class SearchIndex:
+    """SQLite FTS5 index of event summaries, descriptions and attendees.
+
+    Documents live in a regular table; an external-content FTS5 table kept
+    in sync by triggers indexes them. Each run reindexes only the day it
+    fetched.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize SearchIndex.
+
+        Args:
+            db_path: Path to the SQLite database (may be the history database).
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS search_docs (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                day TEXT NOT NULL,
+                start TEXT NOT NULL,
+                start_ts REAL NOT NULL,
+                summary TEXT,
+                location TEXT,
+                attendees TEXT,
+                description TEXT
+            );
+            CREATE INDEX IF NOT EXISTS search_docs_user_day
+                ON search_docs (user_id, day);
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                owner, summary, location, attendees, description,
+                content='search_docs', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS search_docs_insert
+            AFTER INSERT ON search_docs BEGIN
+                INSERT INTO search_fts
+                    (rowid, owner, summary, location, attendees, description)
+                VALUES (new.id, new.owner, new.summary, new.location,
+                        new.attendees, new.description);
+            END;
+            CREATE TRIGGER IF NOT EXISTS search_docs_delete
+            AFTER DELETE ON search_docs BEGIN
+                INSERT INTO search_fts
+                    (search_fts, rowid, owner, summary, location, attendees,
+                     description)
+                VALUES ('delete', old.id, old.owner, old.summary, old.location,
+                        old.attendees, old.description);
+            END;
+            """
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def index_day(self, user_id: str, day: date, events: List[Event]) -> None:
+        """
+        Index the events of a user's day, replacing an earlier run's entries.
+
+        Args:
+            user_id: User identifier.
+            day: Local date the events were fetched for.
+            events: Events of that day.
+        """
+        owner = _owner_token(user_id)
+        day_str = day.isoformat()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "DELETE FROM search_docs WHERE user_id = ? AND day = ?",
+                (user_id, day_str),
+            )
+            self._conn.executemany(
+                "INSERT INTO search_docs (user_id, owner, day, start, start_ts, "
+                "summary, location, attendees, description) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        user_id,
+                        owner,
+                        day_str,
+                        event.start.isoformat(),
+                        event.start.timestamp(),
+                        event.summary,
+                        event.location,
+                        " ".join(event.attendees),
+                        event.description,
+                    )
+                    for event in events
+                ],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        logger.debug("Indexed {} events for {} on {}", len(events), user_id, day)
+
+    def search(self, user_id: str, query: str, limit: int = 10) -> List[SearchHit]:
+        """
+        Find a user's events containing every word of a query.
+
+        Args:
+            user_id: User whose history is searched.
+            query: Free-text query; words match summary, location,
+                attendees or description.
+            limit: Maximum number of hits.
+
+        Returns:
+            Matching events, most recent first.
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+
+        rows = self._conn.execute(
+            "SELECT d.day, d.start, d.summary, d.location, d.attendees "
+            "FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid "
+            "WHERE search_fts MATCH ? ORDER BY d.start_ts DESC LIMIT ?",
+            (f"owner:{_owner_token(user_id)} AND ({match})", limit),
+        )
+        return [
+            SearchHit(
+                day=date.fromisoformat(day),
+                start=datetime.fromisoformat(start),
+                summary=summary,
+                location=location,
+                attendees=attendees.split() if attendees else [],
+            )
+            for day, start, summary, location, attendees in rows
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Search a user's event history from the command line."""
+    parser = argparse.ArgumentParser(description="Search calendar event history")
+    parser.add_argument("query", help='Words to find, e.g. "alice budget"')
+    parser.add_argument(
+        "--user",
+        default=os.getenv("EMAIL_RECIPIENT"),
+        help="User id whose history is searched (default: EMAIL_RECIPIENT)",
+    )
+    parser.add_argument(
+        "--history-db",
+        default=os.getenv("HISTORY_DB"),
+        help="History database (default: HISTORY_DB)",
+    )
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if not args.user or not args.history_db:
+        parser.error(
+            "--user and --history-db (or their environment variables) are required"
+        )
+
+    index = SearchIndex(args.history_db)
+    try:
+        hits = index.search(args.user, args.query, limit=args.limit)
+    finally:
+        index.close()
+
+    if not hits:
+        print("No matching events.")
+        return 1
+
+    for hit in hits:
+        print(f"{hit.start.strftime('%a %Y-%m-%d %H:%M')}  {hit.summary}")
+        if hit.attendees:
+            print(f"    with {', '.join(hit.attendees)}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
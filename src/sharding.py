@@ -0,0 +1,231 @@
+"""Sharded execution across runner nodes with a SQLite claim table."""
+
+import bisect
+import hashlib
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+DEFAULT_REPLICAS = 64
+DEFAULT_LEASE_SECONDS = 900
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification.
+
+    Args:
+        spec: Shard string in format "i/N" with 0 <= i < N.
+
+    Returns:
+        Tuple of (shard index, shard count).
+
+    Raises:
+        ValueError: If the specification is invalid.
+    """
+    try:
+        index_str, count_str = spec.split("/")
+        index, count = int(index_str), int(count_str)
+    except (ValueError, AttributeError):
+        raise ValueError(f"Invalid shard specification: {spec}")
+
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard specification: {spec}")
+
+    return index, count
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+
+
+class ShardRing:
+    """Consistent hash ring mapping user ids to shards."""
+
+    def __init__(self, shard_count: int, replicas: int = DEFAULT_REPLICAS):
+        """
+        Initialize ShardRing.
+
+        Args:
+            shard_count: Total number of shards.
+            replicas: Virtual nodes per shard, for a more even distribution.
+        """
+        self.shard_count = shard_count
+        points = sorted(
+            (_hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shard_count)
+            for replica in range(replicas)
+        )
+        self._hashes: List[int] = [point for point, _ in points]
+        self._shards: List[int] = [shard for _, shard in points]
+
+    def owner(self, user_id: str, live_shards: Optional[Iterable[int]] = None) -> int:
+        """
+        Get the shard responsible for a user.
+
+        When live_shards is given, users of dead shards move to the next live
+        shard on the ring while every other assignment stays unchanged.
+
+        Args:
+            user_id: User identifier.
+            live_shards: Shards currently alive (all shards if None).
+
+        Returns:
+            Shard index owning the user.
+
+        Raises:
+            ValueError: If no live shard is available.
+        """
+        live = None if live_shards is None else set(live_shards)
+        if live is not None and not live:
+            raise ValueError("No live shards available")
+
+        start = bisect.bisect(self._hashes, _hash(user_id))
+        for offset in range(len(self._shards)):
+            shard = self._shards[(start + offset) % len(self._shards)]
+            if live is None or shard in live:
+                return shard
+
+        raise ValueError("No live shards available")
+
+
+class ClaimTable:
+    """SQLite table of per-user run claims and shard heartbeats."""
+
+    def __init__(self, db_path: str, lease_seconds: int = DEFAULT_LEASE_SECONDS):
+        """
+        Initialize ClaimTable.
+
+        Args:
+            db_path: Path to the SQLite database shared by the runners.
+            lease_seconds: How long a claim or heartbeat stays valid.
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS claims (
+                user_id TEXT NOT NULL,
+                run_date TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL,
+                lease_expires REAL NOT NULL,
+                PRIMARY KEY (user_id, run_date)
+            );
+            CREATE TABLE IF NOT EXISTS shards (
+                shard_index INTEGER PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            );
+            """
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def heartbeat(self, shard_index: int) -> None:
+        """
+        Record that a shard is alive.
+
+        Args:
+            shard_index: Index of the shard.
+        """
+        self._conn.execute(
+            "INSERT OR REPLACE INTO shards (shard_index, heartbeat_at) VALUES (?, ?)",
+            (shard_index, time.time()),
+        )
+
+    def live_shards(self) -> Set[int]:
+        """
+        Get shards whose heartbeat is within the lease window.
+
+        Returns:
+            Set of live shard indexes.
+        """
+        cutoff = time.time() - self.lease_seconds
+        rows = self._conn.execute(
+            "SELECT shard_index FROM shards WHERE heartbeat_at >= ?", (cutoff,)
+        )
+        return {row[0] for row in rows}
+
+    def claim(self, user_id: str, run_date: str, owner: str) -> bool:
+        """
+        Atomically claim a user's run for a date.
+
+        A claim succeeds if the run is unclaimed, already held by the same
+        owner, or held by another owner whose lease has expired. Completed
+        runs can never be claimed again.
+
+        Args:
+            user_id: User identifier.
+            run_date: Local date of the digest (YYYY-MM-DD).
+            owner: Identifier of the claiming runner.
+
+        Returns:
+            True if the claim was acquired, False otherwise.
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT owner, status, lease_expires FROM claims "
+                "WHERE user_id = ? AND run_date = ?",
+                (user_id, run_date),
+            ).fetchone()
+
+            if row is not None:
+                current_owner, status, lease_expires = row
+                if status == "done":
+                    self._conn.execute("ROLLBACK")
+                    return False
+                if current_owner != owner and lease_expires > now:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                if current_owner != owner:
+                    logger.warning(
+                        f"Taking over expired claim for {user_id} from {current_owner}"
+                    )
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO claims "
+                "(user_id, run_date, owner, status, lease_expires) "
+                "VALUES (?, ?, ?, 'claimed', ?)",
+                (user_id, run_date, owner, now + self.lease_seconds),
+            )
+            self._conn.execute("COMMIT")
+            return True
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, user_id: str, run_date: str) -> None:
+        """
+        Mark a claimed run as done so it is never repeated.
+
+        Args:
+            user_id: User identifier.
+            run_date: Local date of the digest (YYYY-MM-DD).
+        """
+        self._conn.execute(
+            "UPDATE claims SET status = 'done' WHERE user_id = ? AND run_date = ?",
+            (user_id, run_date),
+        )
+
+    def release(self, user_id: str, run_date: str, owner: str) -> None:
+        """
+        Release an unfinished claim so another runner can retry it.
+
+        Args:
+            user_id: User identifier.
+            run_date: Local date of the digest (YYYY-MM-DD).
+            owner: Identifier of the runner holding the claim.
+        """
+        self._conn.execute(
+            "DELETE FROM claims WHERE user_id = ? AND run_date = ? "
+            "AND owner = ? AND status = 'claimed'",
+            (user_id, run_date, owner),
+        )
@@ -0,0 +1,167 @@
+"""Snapshot store and diff engine for "what changed" update digests."""
+
+import hashlib
+import json
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .calendar import Event
+
+
+def event_key(event: Event) -> str:
+    """
+    Get the identity key used to match an event across snapshots.
+
+    Args:
+        event: Event to identify.
+
+    Returns:
+        The Google event id, or a summary/start fallback for events without one.
+    """
+    if event.event_id:
+        return event.event_id
+    return f"{event.summary}|{event.start.isoformat()}"
+
+
+class EventDiff:
+    """Changes between two event sets."""
+
+    def __init__(
+        self,
+        added: Optional[List[Event]] = None,
+        moved: Optional[List[Tuple[Event, Event]]] = None,
+        updated: Optional[List[Event]] = None,
+        cancelled: Optional[List[Event]] = None,
+    ):
+        """
+        Initialize EventDiff.
+
+        Args:
+            added: Events that did not exist in the previous snapshot.
+            moved: (previous, current) pairs of events whose times changed.
+            updated: Events whose details changed but not their times.
+            cancelled: Events that are no longer on the calendar.
+        """
+        self.added = added or []
+        self.moved = moved or []
+        self.updated = updated or []
+        self.cancelled = cancelled or []
+
+    def is_empty(self) -> bool:
+        """Return True if nothing changed."""
+        return not (self.added or self.moved or self.updated or self.cancelled)
+
+
+def diff_events(previous: List[Event], current: List[Event]) -> EventDiff:
+    """
+    Compute the changes between two event sets.
+
+    Events are matched by id through a hash lookup, so the diff is O(n).
+    Events whose etag is unchanged are skipped without comparing fields.
+
+    Args:
+        previous: Events from the last delivered snapshot.
+        current: Events fetched in this run.
+
+    Returns:
+        EventDiff describing added, moved, updated and cancelled events.
+    """
+    previous_by_key: Dict[str, Event] = {event_key(e): e for e in previous}
+    diff = EventDiff()
+
+    for event in current:
+        old = previous_by_key.pop(event_key(event), None)
+        if old is None:
+            diff.added.append(event)
+        elif event.etag is not None and event.etag == old.etag:
+            continue
+        elif event.start != old.start or event.end != old.end:
+            diff.moved.append((old, event))
+        elif event.to_dict() != old.to_dict():
+            diff.updated.append(event)
+
+    # Whatever was not matched has disappeared from the calendar
+    diff.cancelled.extend(previous_by_key.values())
+    return diff
+
+
+class SnapshotStore:
+    """File-backed store of the last delivered event set per user.
+
+    Each snapshot records the local date it was delivered for. Updates
+    only make sense within one day, so a snapshot of another date is
+    treated as missing and the user gets a full digest instead.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        """
+        Initialize SnapshotStore.
+
+        Args:
+            snapshot_dir: Directory used to store snapshots.
+        """
+        self.snapshot_dir = snapshot_dir
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def load(
+        self, user_id: str, local_date: Optional[date] = None
+    ) -> Optional[List[Event]]:
+        """
+        Load the last delivered event set for a user.
+
+        Args:
+            user_id: User identifier (e.g. recipient email).
+            local_date: The user's current local date; a snapshot delivered
+                for another date is ignored.
+
+        Returns:
+            List of events, or None if no usable snapshot exists.
+        """
+        try:
+            with open(self._path(user_id), encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Ignoring corrupt snapshot for {user_id}")
+            return None
+
+        if local_date is not None and data.get("date") != local_date.isoformat():
+            logger.info(
+                "Snapshot of {} is from {}, not {}",
+                user_id,
+                data.get("date"),
+                local_date,
+            )
+            return None
+
+        return [Event.from_dict(item) for item in data["events"].values()]
+
+    def save(
+        self, user_id: str, events: List[Event], local_date: Optional[date] = None
+    ) -> None:
+        """
+        Persist the delivered event set for a user.
+
+        Args:
+            user_id: User identifier (e.g. recipient email).
+            events: Events included in the delivered digest.
+            local_date: The user's local date the digest was delivered for.
+        """
+        data = {
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "date": local_date.isoformat() if local_date is not None else None,
+            "events": {event_key(event): event.to_dict() for event in events},
+        }
+        path = self._path(user_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _path(self, user_id: str) -> str:
+        name = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.snapshot_dir, f"{name}.json")
@@ -0,0 +1,131 @@
+"""Staging store for digests rendered ahead of delivery."""
+
+import json
+import sqlite3
+from typing import List, Optional
+
+from loguru import logger
+
+from .calendar import Event
+
+
+class StagedDigest:
+    """A digest rendered by the prepare phase, waiting to be delivered."""
+
+    __slots__ = ("content", "events", "prepared_at")
+
+    def __init__(self, content: str, events: List[Event], prepared_at: float):
+        self.content = content
+        self.events = events
+        self.prepared_at = prepared_at
+
+
+class StagingStore:
+    """SQLite table of pre-rendered digests keyed by (user, local date).
+
+    The prepare phase fetches and renders each user's digest off-peak and
+    stores it here; the delivery phase only has to check the calendars for
+    changes since prepared_at and send.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize StagingStore.
+
+        Args:
+            db_path: Path to the SQLite database.
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS staged (
+                user_id TEXT NOT NULL,
+                send_date TEXT NOT NULL,
+                content TEXT NOT NULL,
+                events TEXT NOT NULL,
+                prepared_at REAL NOT NULL,
+                PRIMARY KEY (user_id, send_date)
+            );
+            """
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def put(
+        self,
+        user_id: str,
+        send_date: str,
+        content: str,
+        events: List[Event],
+        prepared_at: float,
+    ) -> None:
+        """
+        Stage a rendered digest, dropping the user's older staged digests.
+
+        Args:
+            user_id: User identifier.
+            send_date: Local date the digest is for (YYYY-MM-DD).
+            content: Rendered digest.
+            events: Events the digest was rendered from.
+            prepared_at: Unix time the fetch started; changes after it make
+                the staged digest stale.
+        """
+        events_json = json.dumps(
+            [event.to_dict() for event in events], separators=(",", ":")
+        )
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "DELETE FROM staged WHERE user_id = ? AND send_date < ?",
+                (user_id, send_date),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO staged VALUES (?, ?, ?, ?, ?)",
+                (user_id, send_date, content, events_json, prepared_at),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        logger.debug("Staged digest for {} on {}", user_id, send_date)
+
+    def get(self, user_id: str, send_date: str) -> Optional[StagedDigest]:
+        """
+        Get a staged digest.
+
+        Args:
+            user_id: User identifier.
+            send_date: Local date the digest is for (YYYY-MM-DD).
+
+        Returns:
+            StagedDigest, or None if nothing was prepared for that day.
+        """
+        row = self._conn.execute(
+            "SELECT content, events, prepared_at FROM staged "
+            "WHERE user_id = ? AND send_date = ?",
+            (user_id, send_date),
+        ).fetchone()
+        if row is None:
+            return None
+
+        content, events_json, prepared_at = row
+        events = [Event.from_dict(data) for data in json.loads(events_json)]
+        return StagedDigest(content, events, prepared_at)
+
+    def discard(self, user_id: str, send_date: str) -> None:
+        """
+        Remove a staged digest once it was delivered or found stale.
+
+        Args:
+            user_id: User identifier.
+            send_date: Local date the digest is for (YYYY-MM-DD).
+        """
+        self._conn.execute(
+            "DELETE FROM staged WHERE user_id = ? AND send_date = ?",
+            (user_id, send_date),
+        )
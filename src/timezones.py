@@ -0,0 +1,98 @@
+"""Timezone handling backed by the standard library zoneinfo module."""
+
+from datetime import date, datetime, time, timedelta, tzinfo
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+@lru_cache(maxsize=512)
+def get_timezone(timezone_str: str) -> ZoneInfo:
+    """
+    Get a cached timezone object.
+
+    Args:
+        timezone_str: IANA timezone string.
+
+    Returns:
+        ZoneInfo object, shared across the process.
+
+    Raises:
+        ValueError: If timezone is invalid.
+    """
+    try:
+        return ZoneInfo(timezone_str)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise ValueError(f"Invalid timezone: {timezone_str}")
+
+
+def day_bounds(tz: tzinfo, day: date) -> Tuple[datetime, datetime]:
+    """
+    Get the local start of a day and of the following day.
+
+    The bounds are built from wall-clock midnights, so days with a DST
+    transition are correctly 23 or 25 hours long.
+
+    Args:
+        tz: Timezone of the day.
+        day: Local date.
+
+    Returns:
+        Tuple of (start of day, start of next day), both timezone-aware.
+    """
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
+def today_bounds(
+    tz: tzinfo, now: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
+    """
+    Get the bounds of the current local day.
+
+    Args:
+        tz: Timezone of the day.
+        now: Current time (defaults to the system clock).
+
+    Returns:
+        Tuple of (start of today, start of tomorrow), both timezone-aware.
+    """
+    now = now.astimezone(tz) if now is not None else datetime.now(tz)
+    return day_bounds(tz, now.date())
+
+
+class LocalDay:
+    """The current day in one timezone, computed once for all its users."""
+
+    __slots__ = ("timezone_str", "tz", "date", "start", "end")
+
+    def __init__(self, timezone_str: str, now: Optional[datetime] = None):
+        """
+        Initialize LocalDay.
+
+        Args:
+            timezone_str: IANA timezone string.
+            now: Current time (defaults to the system clock).
+
+        Raises:
+            ValueError: If timezone is invalid.
+        """
+        self.timezone_str = timezone_str
+        self.tz = get_timezone(timezone_str)
+        self.start, self.end = today_bounds(self.tz, now)
+        self.date = self.start.date()
+
+    def at(self, hour: int) -> datetime:
+        """
+        Get a wall-clock hour of this day.
+
+        Args:
+            hour: Local hour (0-23).
+
+        Returns:
+            Timezone-aware datetime; on DST changes zoneinfo picks the
+            first occurrence of a repeated hour.
+        """
+        return datetime.combine(self.date, time(hour), tzinfo=self.tz)
@@ -2,78 +2,211 @@
 
 import os
 import re
-from datetime import datetime, time
-from typing import Dict, Any
+from datetime import date, datetime, time
+from typing import Dict, Any, List
 
-import pytz
 from loguru import logger
+
+from .delivery import BACKENDS, SMTP_SECURITY
+from .timezones import get_timezone
 # from dotenv import load_dotenv
 
 # load_dotenv()
 
 
-def get_env_config() -> Dict[str, Any]:
-    """
-    Load and validate environment configuration.
+SHARED_REQUIRED_VARS = [
+    "GOOGLE_CLIENT_ID",
+    "GOOGLE_CLIENT_SECRET",
+    "SENDER_EMAIL",
+]
 
-    Returns:
-        Dict containing validated configuration values.
+# Required on top of SHARED_REQUIRED_VARS by each EMAIL_BACKEND
+BACKEND_REQUIRED_VARS = {
+    "resend": ["RESEND_API_KEY"],
+    "smtp": ["SMTP_HOST"],
+}
 
-    Raises:
-        ValueError: If required environment variables are missing or invalid.
-    """
-    required_vars = [
-        "GOOGLE_REFRESH_TOKEN",
-        "GOOGLE_CLIENT_ID",
-        "GOOGLE_CLIENT_SECRET",
-        "RESEND_API_KEY",
-        "EMAIL_RECIPIENT",
-        "SENDER_EMAIL",
-        "TIMEZONE",
-        "DIGEST_HOUR",
-        "QUIET_HOURS_START",
-        "QUIET_HOURS_END",
-    ]
+USER_REQUIRED_VARS = [
+    "GOOGLE_REFRESH_TOKEN",
+    "EMAIL_RECIPIENT",
+    "TIMEZONE",
+    "DIGEST_HOUR",
+    "QUIET_HOURS_START",
+    "QUIET_HOURS_END",
+]
 
-    # Check for missing required variables
+# Basic email regex pattern, compiled once for bulk validation
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+
+def _email_backend() -> str:
+    backend = os.getenv("EMAIL_BACKEND", "resend").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid email backend: {backend}")
+    return backend
+
+
+def _check_required_vars(required_vars: List[str]) -> None:
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     if missing_vars:
         raise ValueError(
             f"Missing required environment variable: {', '.join(missing_vars)}"
         )
 
-    # Load and validate configuration
+
+def get_shared_config() -> Dict[str, Any]:
+    """
+    Load configuration shared by every user of a run.
+
+    Returns:
+        Dict containing API credentials and optional run settings.
+
+    Raises:
+        ValueError: If required environment variables are missing or invalid.
+    """
+    email_backend = _email_backend()
+    _check_required_vars(SHARED_REQUIRED_VARS + BACKEND_REQUIRED_VARS[email_backend])
+
     config = {
-        "google_refresh_token": os.getenv("GOOGLE_REFRESH_TOKEN"),
         "google_client_id": os.getenv("GOOGLE_CLIENT_ID"),
         "google_client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
         "resend_api_key": os.getenv("RESEND_API_KEY"),
-        "email_recipient": os.getenv("EMAIL_RECIPIENT"),
-        "timezone": validate_timezone(os.getenv("TIMEZONE")),
         "sender_email": os.getenv("SENDER_EMAIL"),
+        "email_backend": email_backend,
+        "smtp_host": os.getenv("SMTP_HOST") or None,
+        "smtp_port": int(os.getenv("SMTP_PORT")) if os.getenv("SMTP_PORT") else None,
+        "smtp_username": os.getenv("SMTP_USERNAME") or None,
+        "smtp_password": os.getenv("SMTP_PASSWORD") or None,
+        "smtp_security": os.getenv("SMTP_SECURITY", "starttls").lower(),
+        "smtp_pool_size": int(os.getenv("SMTP_POOL_SIZE", "4")),
+        "digest_cache_dir": os.getenv("DIGEST_CACHE_DIR") or None,
+        "suppress_duplicate_digests": parse_bool(
+            os.getenv("SUPPRESS_DUPLICATE_DIGESTS", "false")
+        ),
+        "digest_mode": os.getenv("DIGEST_MODE", "full").lower(),
+        "snapshot_dir": os.getenv("SNAPSHOT_DIR") or None,
+        "expand_recurring_locally": parse_bool(
+            os.getenv("EXPAND_RECURRING_LOCALLY", "false")
+        ),
+        "change_tracker_db": os.getenv("CHANGE_TRACKER_DB") or None,
+        "webhook_address": os.getenv("WEBHOOK_ADDRESS") or None,
+        "history_db": os.getenv("HISTORY_DB") or None,
+        "send_ledger_db": os.getenv("SEND_LEDGER_DB") or None,
+        "staging_db": os.getenv("STAGING_DB") or None,
+        "calendar_hedging": parse_bool(os.getenv("CALENDAR_HEDGING", "false")),
+        "calendar_hedge_budget": float(os.getenv("CALENDAR_HEDGE_BUDGET", "0.05")),
+        "retry_max_attempts": int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+        "circuit_failure_rate": float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+        "circuit_cooldown": float(os.getenv("CIRCUIT_COOLDOWN", "30")),
+        "retry_queue_rounds": int(os.getenv("RETRY_QUEUE_ROUNDS", "3")),
+        "calendar_pool_mb": int(os.getenv("CALENDAR_POOL_MB", "512")),
+        "delivery_grace_minutes": int(os.getenv("DELIVERY_GRACE_MINUTES", "15")),
+        "calendar_ids": [
+            calendar_id.strip()
+            for calendar_id in os.getenv("CALENDAR_IDS", "primary").split(",")
+            if calendar_id.strip()
+        ]
+        or ["primary"],
     }
 
-    # Validate numeric values
-    try:
-        config["digest_hour"] = int(os.getenv("DIGEST_HOUR", "7"))
-        config["quiet_hours_start"] = int(os.getenv("QUIET_HOURS_START", "22"))
-        config["quiet_hours_end"] = int(os.getenv("QUIET_HOURS_END", "7"))
-    except ValueError:
-        raise ValueError("Invalid hour value")
+    if config["digest_mode"] not in ("full", "update"):
+        raise ValueError(f"Invalid digest mode: {config['digest_mode']}")
+
+    if config["smtp_security"] not in SMTP_SECURITY:
+        raise ValueError(f"Invalid SMTP security: {config['smtp_security']}")
+
+    if config["retry_max_attempts"] < 1:
+        raise ValueError(f"Invalid retry attempts: {config['retry_max_attempts']}")
+
+    if not 0 < config["circuit_failure_rate"] <= 1:
+        raise ValueError(
+            f"Invalid circuit failure rate: {config['circuit_failure_rate']}"
+        )
+
+    return config
+
+
+def get_env_config() -> Dict[str, Any]:
+    """
+    Load and validate environment configuration.
+
+    Returns:
+        Dict containing validated configuration values.
+
+    Raises:
+        ValueError: If required environment variables are missing or invalid.
+    """
+    # Check for missing required variables
+    _check_required_vars(
+        SHARED_REQUIRED_VARS
+        + BACKEND_REQUIRED_VARS[_email_backend()]
+        + USER_REQUIRED_VARS
+    )
+
+    # Load and validate configuration
+    config = get_shared_config()
+    config.update(
+        {
+            "google_refresh_token": os.getenv("GOOGLE_REFRESH_TOKEN"),
+            "email_recipient": os.getenv("EMAIL_RECIPIENT"),
+            "timezone": validate_timezone(os.getenv("TIMEZONE")),
+        }
+    )
 
-    # Validate hour ranges
-    for hour_name, hour_value in [
-        ("digest_hour", config["digest_hour"]),
-        ("quiet_hours_start", config["quiet_hours_start"]),
-        ("quiet_hours_end", config["quiet_hours_end"]),
-    ]:
-        if not 0 <= hour_value <= 23:
-            raise ValueError(f"Invalid hour value for {hour_name}: {hour_value}")
+    # Validate numeric values and hour ranges
+    config["digest_hour"] = validate_hour("digest_hour", os.getenv("DIGEST_HOUR", "7"))
+    config["quiet_hours_start"] = validate_hour(
+        "quiet_hours_start", os.getenv("QUIET_HOURS_START", "22")
+    )
+    config["quiet_hours_end"] = validate_hour(
+        "quiet_hours_end", os.getenv("QUIET_HOURS_END", "7")
+    )
 
     logger.info("Environment configuration loaded successfully")
     return config
 
 
+def validate_hour(hour_name: str, value: Any) -> int:
+    """
+    Validate an hour of the day.
+
+    Args:
+        hour_name: Name of the setting, used in error messages.
+        value: Hour as int or numeric string.
+
+    Returns:
+        Hour as int.
+
+    Raises:
+        ValueError: If the value is not an integer between 0 and 23.
+    """
+    try:
+        hour_value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid hour value")
+
+    if not 0 <= hour_value <= 23:
+        raise ValueError(f"Invalid hour value for {hour_name}: {hour_value}")
+
+    return hour_value
+
+
+def is_valid_email(email: str) -> bool:
+    """
+    Validate email address format.
+
+    Args:
+        email: Email address to validate.
+
+    Returns:
+        True if valid, False otherwise.
+    """
+    if not email or not isinstance(email, str):
+        return False
+
+    return EMAIL_PATTERN.match(email) is not None
+
+
 def validate_timezone(timezone_str: str) -> str:
     """
     Validate timezone string.
@@ -87,11 +220,43 @@ def validate_timezone(timezone_str: str) -> str:
     Raises:
         ValueError: If timezone is invalid.
     """
-    try:
-        pytz.timezone(timezone_str)
-        return timezone_str
-    except pytz.exceptions.UnknownTimeZoneError:
-        raise ValueError(f"Invalid timezone: {timezone_str}")
+    # Timezone objects are cached, so repeated validation is a dict lookup
+    get_timezone(timezone_str)
+    return timezone_str
+
+
+def today_in_timezone(timezone_str: str) -> date:
+    """
+    Get the current local date in a timezone.
+
+    Args:
+        timezone_str: IANA timezone string.
+
+    Returns:
+        Today's date in the given timezone.
+    """
+    return datetime.now(get_timezone(timezone_str)).date()
+
+
+def parse_bool(value: str) -> bool:
+    """
+    Parse a boolean flag from an environment variable value.
+
+    Args:
+        value: String such as "true", "1", "yes", "false", "0" or "no".
+
+    Returns:
+        Parsed boolean value.
+
+    Raises:
+        ValueError: If the value is not a recognised boolean.
+    """
+    normalized = value.strip().lower()
+    if normalized in ("1", "true", "yes", "on"):
+        return True
+    if normalized in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError(f"Invalid boolean value: {value}")
 
 
 def parse_time_string(time_str: str) -> time:
@@ -0,0 +1,291 @@
+from datetime import datetime
+from unittest.mock import ANY, Mock, patch
+
+from src.batch import BatchRunner
+from src.deadlines import remaining
+from src.resilience import CircuitOpenError
+from src.roster import UserProfile
+from src.sharding import ClaimTable, ShardRing
+from src.timezones import LocalDay
+
+
+def make_profiles(count):
+    return [
+        UserProfile(
+            user_id=f"user{i}@example.com",
+            email_recipient=f"user{i}@example.com",
+            google_refresh_token=f"token-{i}",
+            timezone="Europe/London",
+        )
+        for i in range(count)
+    ]
+
+
+class TestBatchRunner:
+    """Test BatchRunner for multi-user runs."""
+
+    def test_runs_every_user(self):
+        """Test that each user gets a digest built from their config."""
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        result = BatchRunner(
+            {"sender_email": "d@example.com"}, make_profiles(3), factory
+        ).run()
+
+        assert result.sent == [f"user{i}@example.com" for i in range(3)]
+        assert result.success is True
+        config = factory.call_args_list[0][0][0]
+        assert config["sender_email"] == "d@example.com"
+        assert config["google_refresh_token"] == "token-0"
+
+    def test_failures_do_not_stop_batch(self):
+        """Test that a failing user is reported and the rest still run."""
+        factory = Mock()
+        factory.return_value.run_digest.side_effect = [
+            True,
+            Exception("boom"),
+            False,
+        ]
+
+        result = BatchRunner({}, make_profiles(3), factory).run()
+
+        assert result.sent == ["user0@example.com"]
+        assert result.failed == ["user1@example.com", "user2@example.com"]
+        assert result.success is False
+
+    def test_shard_runs_only_owned_users(self):
+        """Test that a shard skips users owned by other shards."""
+        profiles = make_profiles(50)
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+        ring = ShardRing(2)
+
+        result = BatchRunner({}, profiles, factory, shard=(0, 2)).run()
+
+        assert result.sent == [
+            p.user_id for p in profiles if ring.owner(p.user_id) == 0
+        ]
+        assert len(result.sent) + len(result.skipped) == 50
+
+    def test_claims_skip_completed_users(self, tmp_path):
+        """Test that a rerun skips users already sent today."""
+        claims = ClaimTable(str(tmp_path / "claims.db"))
+        factory = Mock()
+        factory.return_value.run_digest.side_effect = [True, False, True]
+
+        first = BatchRunner({}, make_profiles(2), factory, claims=claims).run()
+        second = BatchRunner({}, make_profiles(2), factory, claims=claims).run()
+
+        assert first.failed == ["user1@example.com"]
+        assert second.skipped == ["user0@example.com"]
+        assert second.sent == ["user1@example.com"]
+
+    def test_update_mode_claims_each_hour(self, tmp_path):
+        """Test that completed claims do not stop later hourly updates."""
+        claims = ClaimTable(str(tmp_path / "claims.db"))
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+        runner = BatchRunner(
+            {"digest_mode": "update"}, make_profiles(1), factory, claims=claims
+        )
+        profile = make_profiles(1)[0]
+        day = LocalDay("Europe/London")
+
+        with patch("src.batch.datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime(2023, 6, 26, 9, 5)
+            assert runner.run_user(profile, day) == "sent"
+            assert runner.run_user(profile, day) == "skipped"
+            mock_datetime.now.return_value = datetime(2023, 6, 26, 10, 5)
+            assert runner.run_user(profile, day) == "sent"
+
+    def test_checkpointed_user_is_not_left_claimed(self, tmp_path):
+        """Test that a user already sent per the checkpoint takes no claim."""
+        from src.checkpoint import BatchCheckpoint
+
+        claims = ClaimTable(str(tmp_path / "claims.db"))
+        day = LocalDay("Europe/London")
+        checkpoint = BatchCheckpoint(str(tmp_path / "run.jsonl"), "daily")
+        checkpoint.user("user0@example.com", day.date.isoformat()).record_sent()
+        runner = BatchRunner(
+            {}, make_profiles(1), Mock(), claims=claims, checkpoint=checkpoint
+        )
+
+        assert runner.run_user(make_profiles(1)[0], day) == "skipped"
+        assert claims.claim("user0@example.com", day.date.isoformat(), "other")
+        checkpoint.close()
+
+    def test_heartbeat_is_kept_alive_during_the_run(self, tmp_path):
+        """Test that a shard outliving its lease still looks alive."""
+        claims = ClaimTable(str(tmp_path / "claims.db"), lease_seconds=60)
+        factory = Mock()
+        seen_alive = []
+
+        def run_digest(checkpoint=None, day=None):
+            seen_alive.append(0 in claims.live_shards())
+            # Each user takes longer than the lease
+            claims._conn.execute("UPDATE shards SET heartbeat_at = 0")
+            return True
+
+        factory.return_value.run_digest.side_effect = run_digest
+
+        result = BatchRunner(
+            {}, make_profiles(20), factory, shard=(0, 2), claims=claims
+        ).run()
+
+        assert len(seen_alive) == len(result.sent) > 1
+        assert all(seen_alive)
+
+    def test_ledger_skips_users_already_sent(self, tmp_path):
+        """Test that a restarted run skips users sent earlier today."""
+        from src.ledger import SendLedger
+        from src.utils import today_in_timezone
+
+        ledger = SendLedger(str(tmp_path / "ledger.db"))
+        today = today_in_timezone("Europe/London").isoformat()
+        ledger.claim("user0@example.com", today, "digest", "hash")
+        ledger.complete("user0@example.com", today, "digest", "msg-1")
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        result = BatchRunner({}, make_profiles(2), factory, ledger=ledger).run()
+
+        assert result.skipped == ["user0@example.com"]
+        assert result.sent == ["user1@example.com"]
+        factory.assert_called_once()
+        ledger.close()
+
+    def test_checkpoint_skips_users_sent_before_crash(self, tmp_path):
+        """Test that a resumed batch only runs unfinished users."""
+        from src.checkpoint import BatchCheckpoint
+
+        today = LocalDay("Europe/London").date.isoformat()
+        checkpoint = BatchCheckpoint(str(tmp_path / "run.jsonl"), "daily")
+        checkpoint.user("user0@example.com", today).record_sent()
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        result = BatchRunner({}, make_profiles(2), factory, checkpoint=checkpoint).run()
+
+        assert result.skipped == ["user0@example.com"]
+        assert result.sent == ["user1@example.com"]
+        factory.return_value.run_digest.assert_called_once_with(
+            checkpoint=checkpoint.user("user1@example.com", today), day=ANY
+        )
+        checkpoint.close()
+
+    def test_users_share_one_day_per_timezone(self):
+        """Test that day bounds are computed once per timezone group."""
+        profiles = make_profiles(4)
+        profiles[1].timezone = profiles[3].timezone = "Asia/Tokyo"
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        with patch("src.batch.LocalDay", wraps=LocalDay) as local_day:
+            result = BatchRunner({}, profiles, factory).run()
+
+        assert local_day.call_count == 2
+        assert sorted(result.sent) == [f"user{i}@example.com" for i in range(4)]
+        # Users run by deadline, so pair each run with its user's config
+        users = [call.args[0]["user_id"] for call in factory.call_args_list]
+        days = {
+            user: call.kwargs["day"]
+            for user, call in zip(users, factory.return_value.run_digest.call_args_list)
+        }
+        assert days["user0@example.com"] is days["user2@example.com"]
+        assert days["user1@example.com"] is days["user3@example.com"]
+        assert days["user1@example.com"].timezone_str == "Asia/Tokyo"
+
+    def test_due_only_skips_users_before_their_digest_hour(self):
+        """Test that hourly delivery runs only send users whose hour has come."""
+        profiles = make_profiles(2)
+        profiles[0].digest_hour = 5
+        profiles[1].digest_hour = 7
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        with patch("src.batch.datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime(2023, 6, 26, 6, 0)
+            result = BatchRunner({}, profiles, factory, due_only=True).run()
+
+        assert result.sent == ["user0@example.com"]
+        assert result.skipped == ["user1@example.com"]
+
+    def test_open_circuit_defers_users_to_retry_queue(self):
+        """Test that users rejected by an open circuit are retried later."""
+        factory = Mock()
+        factory.return_value.run_digest.side_effect = [
+            True,
+            CircuitOpenError("calendar", 0.01),
+            CircuitOpenError("calendar", 0.01),
+            True,
+            True,
+        ]
+
+        result = BatchRunner({}, make_profiles(3), factory).run()
+
+        assert result.sent == [
+            "user0@example.com",
+            "user1@example.com",
+            "user2@example.com",
+        ]
+        assert result.deferred == []
+        assert result.success is True
+
+    def test_users_still_deferred_after_retry_rounds(self, tmp_path):
+        """Test that a lasting outage reports users deferred and frees claims."""
+        claims = ClaimTable(str(tmp_path / "claims.db"))
+        factory = Mock()
+        factory.return_value.run_digest.side_effect = CircuitOpenError("resend", 0)
+
+        result = BatchRunner(
+            {}, make_profiles(2), factory, claims=claims, retry_rounds=2
+        ).run()
+
+        assert result.deferred == ["user0@example.com", "user1@example.com"]
+        assert result.failed == []
+        assert result.success is False
+        # Initial pass plus two retry rounds
+        assert factory.return_value.run_digest.call_count == 6
+        run_date = LocalDay("Europe/London").date.isoformat()
+        assert claims.claim("user0@example.com", run_date, "other") is True
+
+    def test_users_run_earliest_deadline_first(self):
+        """Test that users due soonest run first, whatever the roster order."""
+        profiles = make_profiles(3)
+        for profile, hour in zip(profiles, (9, 6, 8)):
+            profile.digest_hour = hour
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        result = BatchRunner({}, profiles, factory).run()
+
+        assert result.sent == [
+            "user1@example.com",
+            "user2@example.com",
+            "user0@example.com",
+        ]
+
+    def test_deadline_is_propagated_and_late_sends_reported(self):
+        """Test that runs see their deadline and late sends are measured."""
+        profiles = make_profiles(2)
+        profiles[0].digest_hour = 0
+        profiles[1].digest_hour = 23
+        factory = Mock()
+        seen = []
+
+        def run_digest(checkpoint=None, day=None):
+            seen.append(remaining())
+            return True
+
+        factory.return_value.run_digest.side_effect = run_digest
+        noon = LocalDay("Europe/London").at(12).timestamp()
+
+        with patch("src.batch.time.time", return_value=noon):
+            result = BatchRunner({}, profiles, factory, delivery_grace=2 * 3600).run()
+
+        # Due at 02:00 and 01:00 tomorrow, run at noon; a user already late
+        # keeps the normal timeouts
+        assert seen == [None, 13 * 3600]
+        assert remaining() is None
+        assert result.late == {"user0@example.com": 10 * 3600}
@@ -0,0 +1,66 @@
+from datetime import date, datetime, timezone
+
+from src.cache import DigestCache, compute_digest_key
+from src.calendar import Event
+
+
+def make_event(summary="Team Standup", hour=9):
+    return Event(
+        summary=summary,
+        start=datetime(2023, 6, 26, hour, 0, tzinfo=timezone.utc),
+        end=datetime(2023, 6, 26, hour, 30, tzinfo=timezone.utc),
+        location="Zoom",
+        attendees=["alice@example.com"],
+    )
+
+
+class TestComputeDigestKey:
+    """Test content hashing of digests."""
+
+    def test_key_is_order_independent(self):
+        """Test that event order does not change the key."""
+        first = make_event("First", 9)
+        second = make_event("Second", 13)
+
+        assert compute_digest_key([first, second], "1") == compute_digest_key(
+            [second, first], "1"
+        )
+
+    def test_key_changes_with_content(self):
+        """Test that changed events or template versions change the key."""
+        key = compute_digest_key([make_event()], "1")
+
+        assert key != compute_digest_key([make_event("Renamed")], "1")
+        assert key != compute_digest_key([make_event()], "2")
+        assert key != compute_digest_key([make_event()], "1", context="other")
+
+
+class TestDigestCache:
+    """Test DigestCache storage."""
+
+    def test_get_put_roundtrip(self, tmp_path):
+        """Test that rendered digests are stored and reused."""
+        cache = DigestCache(str(tmp_path))
+        key = cache.key_for([make_event()], "1", date(2023, 6, 26), "Europe/London")
+
+        assert cache.get(key) is None
+        cache.put(key, "Rendered digest")
+        assert cache.get(key) == "Rendered digest"
+
+    def test_last_sent_persists(self, tmp_path):
+        """Test that the last delivered key survives a new cache instance."""
+        cache = DigestCache(str(tmp_path))
+        cache.mark_sent("test@example.com", "abc")
+
+        reloaded = DigestCache(str(tmp_path))
+        assert reloaded.is_last_sent("test@example.com", "abc") is True
+        assert reloaded.is_last_sent("test@example.com", "def") is False
+        assert reloaded.is_last_sent("other@example.com", "abc") is False
+
+    def test_prune_keeps_max_entries(self, tmp_path):
+        """Test that old renders are evicted beyond max_entries."""
+        cache = DigestCache(str(tmp_path), max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, key)
+
+        assert len(list(tmp_path.glob("*.txt"))) == 2
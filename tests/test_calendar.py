@@ -5,7 +5,8 @@ import pytest
 from google.auth.exceptions import RefreshError
 from googleapiclient.errors import HttpError
 
-from src.calendar import CalendarService, Event
+from src.calendar import ITEM_BYTES, CalendarService, Event
+from src.hedging import HedgedCaller
 
 
 class TestEvent:
@@ -106,6 +107,8 @@ class TestCalendarService:
         mock_events.list.return_value.execute.return_value = {
             "items": [
                 {
+                    "id": "evt1",
+                    "etag": '"3181161784712000"',
                     "summary": "Team Standup",
                     "start": {"dateTime": "2023-06-26T09:00:00Z"},
                     "end": {"dateTime": "2023-06-26T09:30:00Z"},
@@ -129,6 +132,8 @@ class TestCalendarService:
         assert event.location == "Zoom"
         assert event.attendees == ["alice@example.com", "bob@example.com"]
         assert event.description == "Daily team sync"
+        assert event.event_id == "evt1"
+        assert event.etag == '"3181161784712000"'
 
     @patch("src.calendar.build")
     @patch("src.calendar.Credentials")
@@ -305,3 +310,300 @@ class TestCalendarService:
         events = service.get_today_events("Europe/London", 22, 7)
 
         assert len(events) == 0
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_get_events_between_expands_recurring_locally(
+        self, mock_request, mock_credentials, mock_build
+    ):
+        """Test that recurring masters are fetched once and expanded locally."""
+        from datetime import timedelta
+
+        from src.timezones import get_timezone
+
+        mock_service = Mock()
+        mock_build.return_value = mock_service
+
+        mock_events = Mock()
+        mock_events.list.return_value.execute.return_value = {
+            "items": [
+                {
+                    "id": "standup",
+                    "summary": "Daily Standup",
+                    "start": {
+                        "dateTime": "2023-06-01T09:00:00+01:00",
+                        "timeZone": "Europe/London",
+                    },
+                    "end": {
+                        "dateTime": "2023-06-01T09:15:00+01:00",
+                        "timeZone": "Europe/London",
+                    },
+                    "recurrence": ["RRULE:FREQ=DAILY"],
+                }
+            ]
+        }
+        mock_service.events.return_value = mock_events
+
+        service = CalendarService(
+            "test_id", "test_secret", "test_token", expand_recurring_locally=True
+        )
+        london = get_timezone("Europe/London")
+        monday = datetime(2023, 6, 26, tzinfo=london)
+
+        today = service.get_events_between(
+            monday, monday + timedelta(days=1), "Europe/London"
+        )
+        week = service.get_events_between(
+            monday, monday + timedelta(days=7), "Europe/London"
+        )
+
+        assert [e.start.hour for e in today] == [9]
+        assert today[0].event_id == "standup_20230626T080000Z"
+        assert len(week) == 7
+        mock_events.list.assert_called_once()
+        assert mock_events.list.call_args.kwargs["singleEvents"] is False
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_get_today_events_skips_unchanged_calendar(
+        self, mock_request, mock_credentials, mock_build, tmp_path
+    ):
+        """Test that a watched calendar is only refetched after a change."""
+        import time
+
+        from src.notifications import ChangeTracker, WatchChannel
+
+        mock_service = Mock()
+        mock_build.return_value = mock_service
+
+        mock_events = Mock()
+        mock_events.list.return_value.execute.return_value = {
+            "items": [
+                {
+                    "summary": "Regular Meeting",
+                    "start": {"dateTime": "2023-06-26T14:00:00Z"},
+                    "end": {"dateTime": "2023-06-26T14:30:00Z"},
+                }
+            ]
+        }
+        mock_service.events.return_value = mock_events
+
+        tracker = ChangeTracker(str(tmp_path / "tracker.db"), owner="me")
+        tracker.add_channel(
+            WatchChannel("ch", "primary", "res", "tok", time.time() + 3600, "me")
+        )
+
+        def run():
+            # Each run is a new process with a new client
+            service = CalendarService(
+                "test_id", "test_secret", "test_token", change_tracker=tracker
+            )
+            return service.get_today_events("Europe/London")
+
+        first = run()
+        second = run()
+
+        assert [e.summary for e in second] == [e.summary for e in first]
+        mock_events.list.assert_called_once()
+
+        tracker.mark_dirty("primary")
+        run()
+        assert mock_events.list.call_count == 2
+        tracker.close()
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_get_today_events_merges_calendars(
+        self, mock_request, mock_credentials, mock_build
+    ):
+        """Test that a meeting on two calendars appears once."""
+        mock_service = Mock()
+        mock_build.return_value = mock_service
+
+        meeting = {
+            "iCalUID": "planning@example.com",
+            "summary": "Planning",
+            "start": {"dateTime": "2023-06-26T10:00:00Z"},
+            "end": {"dateTime": "2023-06-26T11:00:00Z"},
+        }
+        responses = {
+            "primary": [
+                dict(meeting, id="a", attendees=[{"email": "me@example.com"}]),
+            ],
+            "team@example.com": [
+                dict(
+                    meeting,
+                    id="b",
+                    organizer={"email": "team@example.com", "self": True},
+                    attendees=[{"email": "lead@example.com"}],
+                ),
+                {
+                    "id": "c",
+                    "summary": "Retro",
+                    "start": {"dateTime": "2023-06-26T15:00:00Z"},
+                    "end": {"dateTime": "2023-06-26T16:00:00Z"},
+                },
+            ],
+        }
+        mock_service.events.return_value.list.side_effect = lambda **params: Mock(
+            execute=Mock(return_value={"items": responses[params["calendarId"]]})
+        )
+
+        service = CalendarService(
+            "test_id",
+            "test_secret",
+            "test_token",
+            calendar_ids=["primary", "team@example.com"],
+        )
+        events = service.get_today_events("Europe/London")
+
+        assert [e.summary for e in events] == ["Planning", "Retro"]
+        assert events[0].event_id == "b"
+        assert events[0].attendees == ["me@example.com", "lead@example.com"]
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_changed_since_asks_for_one_updated_event(
+        self, mock_request, mock_credentials, mock_build
+    ):
+        """Test the cheap freshness check used before delivering a staged digest."""
+        mock_list = mock_build.return_value.events.return_value.list
+        mock_list.return_value.execute.return_value = {"items": []}
+        tracker = Mock()
+        tracker.needs_refresh.side_effect = lambda calendar_id: (
+            calendar_id == "team@example.com"
+        )
+        service = CalendarService(
+            "test_id",
+            "test_secret",
+            "test_token",
+            change_tracker=tracker,
+            calendar_ids=["primary", "team@example.com"],
+        )
+        since = datetime(2023, 6, 26, 6, 0, tzinfo=timezone.utc)
+
+        assert service.changed_since(since) is False
+
+        # The watched, unchanged primary calendar needs no API call
+        mock_list.assert_called_once()
+        params = mock_list.call_args.kwargs
+        assert params["calendarId"] == "team@example.com"
+        assert params["updatedMin"] == "2023-06-26T05:59:00+00:00"
+        assert params["showDeleted"] is True
+        assert params["maxResults"] == 1
+        assert "timeMin" not in params and "timeMax" not in params
+
+        mock_list.return_value.execute.return_value = {"items": [{"id": "evt1"}]}
+        assert service.changed_since(since) is True
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_changed_since_sees_event_moved_to_another_day(
+        self, mock_request, mock_credentials, mock_build
+    ):
+        """Test that rescheduling an event out of the digest day is a change."""
+        moved = {
+            "id": "evt1",
+            "start": "2023-06-27T09:00:00+00:00",
+            "updated": "2023-06-26T07:00:00+00:00",
+        }
+
+        def list_events(**params):
+            # Filter like the API: by update time and, if given, by window
+            items = [
+                item
+                for item in [moved]
+                if item["updated"] >= params["updatedMin"]
+                and params.get("timeMin", "") <= item["start"]
+                and item["start"] < params.get("timeMax", "9999")
+            ]
+            return Mock(execute=Mock(return_value={"items": items}))
+
+        mock_build.return_value.events.return_value.list.side_effect = list_events
+        service = CalendarService("test_id", "test_secret", "test_token")
+
+        since = datetime(2023, 6, 26, 6, 0, tzinfo=timezone.utc)
+        assert service.changed_since(since) is True
+
+    @patch("src.calendar.AuthorizedHttp")
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_hedged_caller_runs_list_on_thread_connection(
+        self, mock_request, mock_credentials, mock_build, mock_authorized_http
+    ):
+        """Test that list calls go through the hedged caller per endpoint."""
+        mock_execute = mock_build.return_value.events.return_value.list.return_value
+        mock_execute.execute.return_value = {"items": []}
+        caller = HedgedCaller()
+        service = CalendarService(
+            "test_id", "test_secret", "test_token", hedged_caller=caller
+        )
+
+        service.get_today_events("Europe/London", 22, 7)
+        caller.shutdown()
+
+        mock_execute.execute.assert_called_once_with(
+            http=mock_authorized_http.return_value
+        )
+        assert caller.calls == 1
+        assert len(caller.tracker("events.list")) == 1
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    def test_ready_credentials_skip_refresh(self, mock_credentials, mock_build):
+        """Test that credentials from a CredentialManager are used as is."""
+        credentials = Mock()
+
+        service = CalendarService(
+            "test_id", "test_secret", "test_token", credentials=credentials
+        )
+
+        assert service.credentials is credentials
+        mock_credentials.assert_not_called()
+        credentials.refresh.assert_not_called()
+        mock_build.assert_called_once_with("calendar", "v3", credentials=credentials)
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_estimated_bytes_grows_with_cached_items(
+        self, mock_request, mock_credentials, mock_build
+    ):
+        """Test that pooled clients are measured with their caches."""
+        service = CalendarService(
+            "test_id", "test_secret", "test_token", change_tracker=Mock()
+        )
+        empty = service.estimated_bytes()
+        start = datetime(2023, 6, 26, tzinfo=timezone.utc)
+        service.recurring_cache.put("primary", start, start, [{"id": "1"}, {"id": "2"}])
+
+        assert service.estimated_bytes() == empty + 2 * ITEM_BYTES
+        service.close()
+        mock_build.return_value.close.assert_called_once()
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_reused_client_refetches_without_tracker(
+        self, mock_request, mock_credentials, mock_build
+    ):
+        """Test that a pooled client does not serve the last run's listings."""
+        mock_list = mock_build.return_value.events.return_value.list.return_value
+        mock_list.execute.return_value = {"items": []}
+        service = CalendarService(
+            "test_id", "test_secret", "test_token", expand_recurring_locally=True
+        )
+
+        service.get_today_events("Europe/London", 22, 7)
+        service.get_today_events("Europe/London", 22, 7)
+        assert mock_list.execute.call_count == 1
+        service.begin_run()
+        service.get_today_events("Europe/London", 22, 7)
+
+        assert mock_list.execute.call_count == 2
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+from src.calendar import Event
+from src.checkpoint import BatchCheckpoint
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+def make_event():
+    return Event(
+        summary="Standup",
+        start=datetime(2023, 6, 26, 9, tzinfo=timezone.utc),
+        end=datetime(2023, 6, 26, 9, 30, tzinfo=timezone.utc),
+        attendees=["alice@example.com"],
+        event_id="evt1",
+    )
+
+
+class TestBatchCheckpoint:
+    """Test the batch checkpoint file."""
+
+    def test_resume_restores_stages(self, tmp_path):
+        """Test that a reopened checkpoint has each user's last stage."""
+        path = str(tmp_path / "checkpoint.jsonl")
+        checkpoint = BatchCheckpoint(path, "daily")
+        checkpoint.user("u1").record_fetched([make_event()])
+        checkpoint.user("u1").record_rendered("Digest")
+        checkpoint.user("u1").record_sent()
+        checkpoint.user("u2").record_fetched([make_event()])
+        checkpoint.close()
+
+        resumed = BatchCheckpoint(path, "daily")
+
+        assert resumed.user("u1").stage == "sent"
+        assert resumed.user("u1").events is None
+        u2 = resumed.user("u2")
+        assert u2.stage == "fetched"
+        assert [e.to_dict() for e in u2.events] == [make_event().to_dict()]
+        assert resumed.user("u3").stage is None
+        resumed.close()
+
+    def test_other_run_starts_fresh(self, tmp_path):
+        """Test that a checkpoint from another job is discarded."""
+        path = str(tmp_path / "checkpoint.jsonl")
+        checkpoint = BatchCheckpoint(path, "prepare")
+        checkpoint.user("u1").record_sent()
+        checkpoint.close()
+
+        fresh = BatchCheckpoint(path, "daily")
+
+        assert fresh.user("u1").stage is None
+        fresh.close()
+
+    def test_progress_is_kept_per_local_date(self, tmp_path):
+        """Test that a user's sent record is not reused on their next day."""
+        path = str(tmp_path / "checkpoint.jsonl")
+        today = TODAY.isoformat()
+        tomorrow = (TODAY + timedelta(days=1)).isoformat()
+        checkpoint = BatchCheckpoint(path, "daily")
+        checkpoint.user("tokyo", today).record_sent()
+        checkpoint.close()
+
+        resumed = BatchCheckpoint(path, "daily")
+
+        assert resumed.user("tokyo", today).stage == "sent"
+        assert resumed.user("tokyo", tomorrow).stage is None
+        resumed.close()
+
+    def test_past_days_are_dropped(self, tmp_path):
+        """Test that reopening compacts away days no timezone is still in."""
+        path = tmp_path / "checkpoint.jsonl"
+        old = (TODAY - timedelta(days=2)).isoformat()
+        yesterday = (TODAY - timedelta(days=1)).isoformat()
+        checkpoint = BatchCheckpoint(str(path), "daily")
+        checkpoint.user("u1", old).record_rendered("Old digest")
+        checkpoint.user("u1", yesterday).record_sent()
+        checkpoint.close()
+
+        resumed = BatchCheckpoint(str(path), "daily")
+
+        assert resumed.user("u1", old).stage is None
+        assert resumed.user("u1", yesterday).stage == "sent"
+        resumed.close()
+        assert "Old digest" not in path.read_text(encoding="utf-8")
+
+    def test_torn_line_is_ignored(self, tmp_path):
+        """Test that a record cut off by a crash does not break resuming."""
+        path = tmp_path / "checkpoint.jsonl"
+        checkpoint = BatchCheckpoint(str(path), "daily")
+        checkpoint.user("u1").record_rendered("Digest")
+        checkpoint.close()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"user":"u1","sta')
+
+        resumed = BatchCheckpoint(str(path), "daily")
+        assert resumed.user("u1").stage == "rendered"
+        resumed.user("u1").record_sent()
+        resumed.close()
+
+        again = BatchCheckpoint(str(path), "daily")
+        assert again.user("u1").stage == "sent"
+        again.close()
@@ -0,0 +1,171 @@
+import threading
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.calendar import CalendarService, Event
+from src.coordinator import FetchCoordinator, visible_copy
+
+START = datetime(2023, 6, 26, tzinfo=timezone.utc)
+END = datetime(2023, 6, 27, tzinfo=timezone.utc)
+
+
+def make_event(visibility=None):
+    return Event(
+        summary="Offsite planning",
+        start=datetime(2023, 6, 26, 9, tzinfo=timezone.utc),
+        end=datetime(2023, 6, 26, 10, tzinfo=timezone.utc),
+        location="HQ",
+        attendees=["alice@example.com"],
+        description="Agenda",
+        event_id="evt1",
+        visibility=visibility,
+    )
+
+
+class TestVisibleCopy:
+    """Test per-subscriber visibility rules."""
+
+    def test_reader_sees_details_of_default_events(self):
+        """Test that readers get a full, independent copy."""
+        event = make_event()
+        copy = visible_copy(event, "reader")
+
+        assert copy is not event
+        assert copy.to_dict() == event.to_dict()
+        copy.attendees.append("bob@example.com")
+        assert event.attendees == ["alice@example.com"]
+
+    def test_private_events_are_busy_for_readers(self):
+        """Test that private details are only shown to writers and owners."""
+        event = make_event(visibility="private")
+
+        busy = visible_copy(event, "reader")
+        assert busy.summary == "Busy"
+        assert busy.location is None and busy.attendees == []
+        assert busy.description is None
+        assert visible_copy(event, "writer").summary == "Offsite planning"
+
+    def test_free_busy_readers_only_see_busy_blocks(self):
+        """Test that free/busy access never reveals details."""
+        assert visible_copy(make_event(), "freeBusyReader").summary == "Busy"
+
+
+class TestFetchCoordinator:
+    """Test single-flight fetching of shared calendars."""
+
+    def test_window_is_fetched_once(self):
+        """Test that later subscribers reuse the first fetch."""
+        coordinator = FetchCoordinator()
+        fetch = Mock(return_value=[make_event()])
+
+        first = coordinator.get_events("team", START, END, "UTC", "reader", fetch)
+        second = coordinator.get_events("team", START, END, "UTC", "reader", fetch)
+
+        fetch.assert_called_once()
+        assert first[0] is not second[0]
+        assert (coordinator.fetches, coordinator.shared) == (1, 1)
+
+    def test_higher_role_refetches(self):
+        """Test that a writer does not get data fetched with free/busy access."""
+        coordinator = FetchCoordinator()
+        low = Mock(return_value=[make_event()])
+        high = Mock(return_value=[make_event()])
+
+        coordinator.get_events("team", START, END, "UTC", "freeBusyReader", low)
+        events = coordinator.get_events("team", START, END, "UTC", "writer", high)
+
+        high.assert_called_once()
+        assert events[0].summary == "Offsite planning"
+
+    def test_concurrent_callers_share_one_fetch(self):
+        """Test that callers arriving mid-fetch wait instead of refetching."""
+        coordinator = FetchCoordinator()
+        release = threading.Event()
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            release.wait(5)
+            return [make_event()]
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    coordinator.get_events(
+                        "team", START, END, "UTC", "reader", slow_fetch
+                    )
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert len(results) == 5
+
+    def test_failed_fetch_is_retried_by_next_caller(self):
+        """Test that errors are not cached."""
+        coordinator = FetchCoordinator()
+        fetch = Mock(side_effect=[Exception("boom"), [make_event()]])
+
+        with pytest.raises(Exception, match="boom"):
+            coordinator.get_events("team", START, END, "UTC", "reader", fetch)
+        assert coordinator.get_events("team", START, END, "UTC", "reader", fetch)
+
+
+class TestCalendarServiceCoordination:
+    """Test that CalendarService shares only calendars it may share."""
+
+    @patch("src.calendar.build")
+    @patch("src.calendar.Credentials")
+    @patch("src.calendar.Request")
+    def test_shared_calendar_fetched_once_across_users(
+        self, mock_request, mock_credentials, mock_build
+    ):
+        """Test that two users subscribed to a team calendar trigger one list."""
+        mock_service = mock_build.return_value
+        mock_calendar_list = mock_service.calendarList.return_value.list.return_value
+        mock_calendar_list.execute.return_value = {
+            "items": [
+                {"id": "me@example.com", "accessRole": "owner", "primary": True},
+                {"id": "team@example.com", "accessRole": "reader"},
+            ]
+        }
+        mock_service.events.return_value.list.return_value.execute.return_value = {
+            "items": [
+                {
+                    "id": "evt1",
+                    "summary": "Team sync",
+                    "start": {"dateTime": "2023-06-26T10:00:00Z"},
+                    "end": {"dateTime": "2023-06-26T11:00:00Z"},
+                }
+            ]
+        }
+        coordinator = FetchCoordinator()
+        calendar_ids = ["primary", "team@example.com"]
+        users = [
+            CalendarService(
+                "id",
+                "secret",
+                f"token-{i}",
+                calendar_ids=calendar_ids,
+                fetch_coordinator=coordinator,
+            )
+            for i in range(3)
+        ]
+
+        for service in users:
+            events = service.get_today_events("Europe/London")
+            assert [e.summary for e in events] == ["Team sync"]
+
+        list_calls = mock_service.events.return_value.list.call_args_list
+        calendars = [call.kwargs["calendarId"] for call in list_calls]
+        assert calendars.count("primary") == 3
+        assert calendars.count("team@example.com") == 1
@@ -0,0 +1,211 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+from google.auth.exceptions import RefreshError
+
+from src.batch import BatchRunner
+from src.credentials import CredentialManager
+from src.roster import UserProfile
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class FakeCredentials:
+    """Stand-in for google.oauth2 Credentials refreshed against a fake endpoint."""
+
+    lifetime = timedelta(hours=1)
+    rejected = set()
+    refreshed = []
+
+    def __init__(self, token, refresh_token, **kwargs):
+        self.token = token
+        self.refresh_token = refresh_token
+        self.expiry = None
+
+    def refresh(self, request):
+        FakeCredentials.refreshed.append(
+            (self.refresh_token, threading.current_thread().name)
+        )
+        if self.refresh_token in self.rejected:
+            raise RefreshError("invalid_grant: Token has been expired or revoked.")
+        self.token = f"access-{self.refresh_token}-{len(self.refreshed)}"
+        self.expiry = utcnow() + self.lifetime
+
+
+@pytest.fixture
+def fake_credentials():
+    FakeCredentials.lifetime = timedelta(hours=1)
+    FakeCredentials.rejected = set()
+    FakeCredentials.refreshed = []
+    with (
+        patch("src.credentials.Credentials", FakeCredentials),
+        patch("src.credentials.Request"),
+    ):
+        yield FakeCredentials
+
+
+class TestCredentialManager:
+    """Test token warmup and refresh-ahead."""
+
+    def test_warm_refreshes_in_background(self, fake_credentials):
+        """Test that warmed tokens are handed out without another refresh."""
+        manager = CredentialManager("id", "secret")
+        manager.warm({f"user{i}": f"token-{i}" for i in range(5)})
+
+        credentials = [manager.get(f"token-{i}") for i in range(5)]
+        manager.shutdown()
+
+        assert [c.refresh_token for c in credentials] == [
+            f"token-{i}" for i in range(5)
+        ]
+        assert len(fake_credentials.refreshed) == 5
+        assert all(
+            name.startswith("token-refresh") for _, name in fake_credentials.refreshed
+        )
+        assert manager.get("token-0") is credentials[0]
+
+    def test_warm_skips_fresh_tokens(self, fake_credentials):
+        """Test that warming a token that is still fresh does not refresh it."""
+        manager = CredentialManager("id", "secret")
+        manager.warm({"user0": "token-0"})
+        first = manager.get("token-0")
+
+        manager.warm({"user0": "token-0"})
+        manager.shutdown()
+
+        assert len(fake_credentials.refreshed) == 1
+        assert manager.get("token-0") is first
+
+    def test_waiting_for_refresh_is_profiled(self, fake_credentials):
+        """Test that only a get that waits for a refresh is timed."""
+        manager = CredentialManager("id", "secret")
+
+        with patch("src.credentials.stage") as mock_stage:
+            manager.get("token-0")
+            manager.get("token-0")
+        manager.shutdown()
+
+        mock_stage.assert_called_once_with("token_refresh")
+
+    def test_get_refreshes_unknown_token(self, fake_credentials):
+        """Test that tokens that were not warmed are refreshed on demand."""
+        manager = CredentialManager("id", "secret")
+
+        credentials = manager.get("token-x")
+        manager.shutdown()
+
+        assert credentials.token.startswith("access-token-x")
+
+    def test_rejected_token_is_reported_early(self, fake_credentials):
+        """Test that a revoked refresh token is remembered and raised."""
+        fake_credentials.rejected = {"token-bad"}
+        manager = CredentialManager("id", "secret")
+        manager.warm({"good": "token-good", "bad": "token-bad"})
+
+        with pytest.raises(RefreshError):
+            manager.get("token-bad")
+        assert manager.revoked("token-bad") is not None
+        assert manager.revoked("token-good") is None
+
+        # Not refreshed again
+        with pytest.raises(RefreshError):
+            manager.get("token-bad")
+        manager.shutdown()
+        assert [t for t, _ in fake_credentials.refreshed].count("token-bad") == 1
+
+    def test_expiring_token_is_refreshed_ahead(self, fake_credentials):
+        """Test that a token near expiry is served while a new one is fetched."""
+        fake_credentials.lifetime = timedelta(minutes=2)
+        manager = CredentialManager("id", "secret", refresh_ahead=timedelta(minutes=5))
+        first = manager.get("token-1")
+
+        fake_credentials.lifetime = timedelta(hours=1)
+        # Still valid, so returned at once while a refresh runs
+        assert manager.get("token-1") is first
+        manager._executor.shutdown(wait=True)
+
+        second = manager.get("token-1")
+        assert second is not first
+        assert second.expiry > first.expiry
+        # Credentials already handed out are not modified
+        assert first.token != second.token
+
+    def test_expired_token_blocks_for_refresh(self, fake_credentials):
+        """Test that an expired token is never handed out."""
+        fake_credentials.lifetime = timedelta(seconds=-1)
+        manager = CredentialManager("id", "secret")
+        first = manager.get("token-1")
+
+        fake_credentials.lifetime = timedelta(hours=1)
+        second = manager.get("token-1")
+        manager.shutdown()
+
+        assert second is not first
+        assert second.expiry > utcnow()
+
+
+class TestBatchWarmup:
+    """Test credential warmup in batch runs."""
+
+    def test_revoked_users_fail_without_digest(self, fake_credentials):
+        """Test that users with a rejected token are not run."""
+        fake_credentials.rejected = {"token-1"}
+        profiles = [
+            UserProfile(
+                user_id=f"user{i}@example.com",
+                email_recipient=f"user{i}@example.com",
+                google_refresh_token=f"token-{i}",
+                timezone="Europe/London",
+            )
+            for i in range(3)
+        ]
+        manager = CredentialManager("id", "secret")
+        # Let the warmup finish before the first user runs
+        manager.warm({"user1@example.com": "token-1"})
+        manager._executor.shutdown(wait=True)
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        with patch.object(manager, "warm") as mock_warm:
+            result = BatchRunner(
+                {}, profiles, factory, credential_manager=manager
+            ).run()
+
+        mock_warm.assert_called_once_with(
+            {f"user{i}@example.com": f"token-{i}" for i in range(3)}
+        )
+        assert result.sent == ["user0@example.com", "user2@example.com"]
+        assert result.failed == ["user1@example.com"]
+        assert factory.call_count == 2
+
+    def test_tokens_are_warmed_in_a_window_ahead(self, fake_credentials):
+        """Test that tokens are refreshed shortly before their user runs."""
+        profiles = [
+            UserProfile(
+                user_id=f"user{i}@example.com",
+                email_recipient=f"user{i}@example.com",
+                google_refresh_token=f"token-{i}",
+                timezone="Europe/London",
+            )
+            for i in range(5)
+        ]
+        manager = CredentialManager("id", "secret")
+        factory = Mock()
+        factory.return_value.run_digest.return_value = True
+
+        with patch.object(manager, "warm") as mock_warm:
+            BatchRunner(
+                {}, profiles, factory, credential_manager=manager, warm_ahead=2
+            ).run()
+        manager.shutdown()
+
+        assert [list(call.args[0]) for call in mock_warm.call_args_list] == [
+            ["user0@example.com", "user1@example.com"],
+            ["user2@example.com"],
+            ["user3@example.com"],
+            ["user4@example.com"],
+        ]
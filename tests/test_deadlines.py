@@ -0,0 +1,35 @@
+import time
+
+from src.deadlines import MIN_CALL_TIMEOUT, cap_timeout, deadline_scope, remaining
+
+
+class TestDeadlines:
+    """Test deadline propagation to call timeouts."""
+
+    def test_no_deadline_keeps_timeout(self):
+        """Test that timeouts are unchanged outside a deadline scope."""
+        assert remaining() is None
+        assert cap_timeout(30.0) == 30.0
+
+    def test_timeout_is_capped_to_time_left(self):
+        """Test that a call gets at most the time left before the deadline."""
+        with deadline_scope(time.time() + 12):
+            assert 11 < remaining() <= 12
+            assert 11 < cap_timeout(30.0) <= 12
+            assert cap_timeout(8.0) == 8.0
+
+    def test_passed_deadline_uses_floor(self):
+        """Test that late work still gets the minimum timeout."""
+        with deadline_scope(time.time() - 60):
+            assert remaining() < 0
+            assert cap_timeout(30.0) == MIN_CALL_TIMEOUT
+            assert cap_timeout(30.0, floor=1.0) == 1.0
+            assert cap_timeout(2.0) == 2.0
+
+    def test_scopes_nest_and_reset(self):
+        """Test that leaving a scope restores the outer deadline."""
+        with deadline_scope(time.time() + 100):
+            with deadline_scope(None):
+                assert remaining() is None
+            assert remaining() > 99
+        assert remaining() is None
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from src.calendar import Event
+from src.dedup import dedupe_events
+
+
+def make_event(event_id, start, ical_uid=None, attendees=None, **kwargs):
+    return Event(
+        summary=event_id,
+        start=start,
+        end=start + timedelta(hours=1),
+        attendees=attendees,
+        event_id=event_id,
+        ical_uid=ical_uid,
+        **kwargs,
+    )
+
+
+class TestDedupeEvents:
+    """Test cross-calendar event deduplication."""
+
+    def test_merges_copies_and_attendees(self):
+        """Test that copies collapse into one event with merged attendees."""
+        start = datetime(2023, 6, 26, 9, tzinfo=timezone.utc)
+        events = [
+            make_event("a", start, "uid1", ["alice@example.com"]),
+            make_event("other", start, "uid2"),
+            make_event("b", start, "uid1", ["bob@example.com", "alice@example.com"]),
+        ]
+
+        result = dedupe_events(events)
+
+        assert [e.event_id for e in result] == ["a", "other"]
+        assert result[0].attendees == ["alice@example.com", "bob@example.com"]
+
+    def test_prefers_organizer_copy(self):
+        """Test that the organizer's copy replaces an attendee copy."""
+        start = datetime(2023, 6, 26, 9, tzinfo=timezone.utc)
+        events = [
+            make_event("attendee", start, "uid1", ["alice@example.com"]),
+            make_event(
+                "organizer", start, "uid1", ["bob@example.com"], organizer_copy=True
+            ),
+            make_event("late", start, "uid1", ["carol@example.com"]),
+        ]
+
+        result = dedupe_events(events)
+
+        assert [e.event_id for e in result] == ["organizer"]
+        assert result[0].attendees == [
+            "alice@example.com",
+            "bob@example.com",
+            "carol@example.com",
+        ]
+
+    def test_keeps_instances_of_a_series(self):
+        """Test that instances sharing an iCalUID but not a start are kept."""
+        start = datetime(2023, 6, 26, 9, tzinfo=timezone.utc)
+        events = [
+            make_event("a", start, "series"),
+            make_event("b", start + timedelta(days=1), "series"),
+        ]
+
+        assert len(dedupe_events(events)) == 2
+
+    def test_matches_starts_across_timezones(self):
+        """Test that copies with the same instant in different zones match."""
+        start = datetime(2023, 6, 26, 9, tzinfo=timezone.utc)
+        events = [
+            make_event("a", start, "uid1"),
+            make_event("b", start.astimezone(ZoneInfo("Asia/Tokyo")), "uid1"),
+        ]
+
+        assert len(dedupe_events(events)) == 1
+
+    def test_keeps_events_without_ids(self):
+        """Test that events without any identifier are never merged."""
+        start = datetime(2023, 6, 26, 9, tzinfo=timezone.utc)
+        events = [make_event(None, start), make_event(None, start)]
+
+        assert len(dedupe_events(events)) == 2
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from src.delivery import DeliveryError, ResendBackend, SMTPBackend, backend_from_config
+from src.email_sender import EmailSender
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib to deliver messages."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        delivered = 0
+        self.reply("220 localhost ESMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif verb == "RCPT" and "refused" in command:
+                self.reply("550 No such user")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                    data.append(data_line)
+                with server.lock:
+                    server.messages.append(b"".join(data).decode("utf-8"))
+                self.reply("250 OK")
+                delivered += 1
+                if delivered == server.drop_after:
+                    # Simulate the server closing an idle or busy session
+                    return
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeSMTPHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.messages = []
+    server.drop_after = None
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_backend(server, **kwargs):
+    host, port = server.server_address
+    return SMTPBackend(host, port, security="none", **kwargs)
+
+
+class TestSMTPBackend:
+    """Test SMTP delivery over pooled connections."""
+
+    def test_messages_reuse_one_connection(self, smtp_server):
+        """Test that sequential sends share a single SMTP session."""
+        backend = make_backend(smtp_server)
+
+        ids = [
+            backend.send("d@example.com", f"u{i}@example.com", "Digest", f"Body {i}")
+            for i in range(50)
+        ]
+        backend.close()
+
+        assert smtp_server.connections == 1
+        assert backend.connections_opened == 1
+        assert len(smtp_server.messages) == 50
+        assert len(set(ids)) == 50
+        assert "Subject: Digest" in smtp_server.messages[0]
+        assert "Body 0" in smtp_server.messages[0]
+
+    def test_concurrent_senders_are_bounded_by_pool(self, smtp_server):
+        """Test that threads share at most pool_size connections."""
+        backend = make_backend(smtp_server, pool_size=3)
+
+        def send_many(worker):
+            for i in range(25):
+                backend.send(
+                    "d@example.com", "u@example.com", "Digest", f"{worker}-{i}"
+                )
+
+        threads = [threading.Thread(target=send_many, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        backend.close()
+
+        assert len(smtp_server.messages) == 200
+        assert backend.connections_opened <= 3
+
+    def test_dropped_connection_is_replaced(self, smtp_server):
+        """Test that a send on a connection closed by the server is retried."""
+        smtp_server.drop_after = 2
+        backend = make_backend(smtp_server)
+
+        for i in range(3):
+            backend.send("d@example.com", "u@example.com", "Digest", f"Body {i}")
+        backend.close()
+
+        assert len(smtp_server.messages) == 3
+        assert backend.connections_opened == 2
+
+    def test_failed_reconnect_releases_slot_once(self, smtp_server):
+        """Test that a failed reconnect keeps the pool within pool_size."""
+        smtp_server.drop_after = 1
+        backend = make_backend(smtp_server, pool_size=1)
+        backend.send("d@example.com", "u@example.com", "Digest", "Body 0")
+        connect = backend._connect
+
+        with patch.object(backend, "_connect", side_effect=ConnectionRefusedError):
+            with pytest.raises(ConnectionRefusedError):
+                backend.send("d@example.com", "u@example.com", "Digest", "Body 1")
+        assert backend._open == 0
+
+        with patch.object(backend, "_connect", wraps=connect):
+            backend.send("d@example.com", "u@example.com", "Digest", "Body 2")
+        backend.close()
+
+        assert backend._open == 0
+        assert len(smtp_server.messages) == 2
+
+    def test_connections_are_recycled(self, smtp_server):
+        """Test that a connection is replaced after messages_per_connection."""
+        backend = make_backend(smtp_server, messages_per_connection=10)
+
+        for i in range(25):
+            backend.send("d@example.com", "u@example.com", "Digest", f"Body {i}")
+        backend.close()
+
+        assert backend.connections_opened == 3
+
+    def test_refused_recipient_keeps_connection(self, smtp_server):
+        """Test that a refused recipient fails only that message."""
+        backend = make_backend(smtp_server)
+
+        sender = EmailSender(None, "d@example.com", backend=backend)
+        assert sender.send_email("refused@example.com", "Digest", "Body") is False
+        assert sender.send_digest("user@example.com", "Digest body") is True
+        backend.close()
+
+        assert smtp_server.connections == 1
+        assert len(smtp_server.messages) == 1
+
+
+class FakeResendHandler(BaseHTTPRequestHandler):
+    """Accepts POST /emails like the Resend API."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.headers["Authorization"], payload))
+            server.clients.add(self.client_address)
+            server.idempotency_keys.append(self.headers["Idempotency-Key"])
+            message_id = f"msg-{len(server.requests)}"
+
+        if payload["to"] == ["refused@example.com"]:
+            status, body = 422, {"message": "Invalid `to` field"}
+        elif payload["to"] == ["html@example.com"]:
+            # e.g. a proxy answering for the API
+            status, body = 200, "<html>OK</html>"
+        else:
+            status, body = 200, {"id": message_id}
+        data = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def resend_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeResendHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.clients = set()
+    server.idempotency_keys = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestResendBackend:
+    """Test the instance-scoped Resend HTTP client."""
+
+    def test_concurrent_backends_keep_their_own_keys(self, resend_server):
+        """Test that senders with different API keys do not share state."""
+        backends = {
+            key: ResendBackend(key, base_url=resend_server.url, pool_size=2)
+            for key in ("key-1", "key-2")
+        }
+
+        def send_many(key):
+            for i in range(20):
+                backends[key].send(f"{key}@example.com", "u@example.com", "S", "B")
+
+        threads = [
+            threading.Thread(target=send_many, args=(key,))
+            for key in ("key-1", "key-2", "key-1", "key-2")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for backend in backends.values():
+            backend.close()
+
+        assert len(resend_server.requests) == 80
+        for authorization, payload in resend_server.requests:
+            key = payload["from"].split("@")[0]
+            assert authorization == f"Bearer {key}"
+        # Each backend keeps at most pool_size connections open
+        assert len(resend_server.clients) <= 4
+
+    def test_rejected_email_raises_delivery_error(self, resend_server):
+        """Test that API errors surface with their status code."""
+        backend = ResendBackend("key", base_url=resend_server.url)
+
+        with pytest.raises(DeliveryError) as excinfo:
+            backend.send("d@example.com", "refused@example.com", "S", "B")
+        assert excinfo.value.status_code == 422
+        assert "Invalid `to` field" in str(excinfo.value)
+
+        sender = EmailSender(None, "d@example.com", backend=backend)
+        assert sender.send_email("refused@example.com", "S", "B") is False
+        assert sender.send_email("user@example.com", "S", "B") is True
+        backend.close()
+
+    def test_accepted_email_without_json_body_is_sent(self, resend_server):
+        """Test that an unreadable success response still counts as sent."""
+        backend = ResendBackend("key", base_url=resend_server.url)
+
+        assert backend.send("d@example.com", "html@example.com", "S", "B") == ""
+        sender = EmailSender(None, "d@example.com", backend=backend)
+        assert sender.send_email("html@example.com", "S", "B") is True
+        backend.close()
+
+    def test_resent_message_keeps_idempotency_key(self, resend_server):
+        """Test that a retried send carries the key of the first attempt."""
+        backend = ResendBackend("key", base_url=resend_server.url)
+
+        backend.send("d@example.com", "u@example.com", "S", "Body")
+        backend.send("d@example.com", "u@example.com", "S", "Body")
+        backend.send("d@example.com", "u@example.com", "S", "Other body")
+        backend.close()
+
+        first, retry, other = resend_server.idempotency_keys
+        assert first == retry
+        assert other != first
+
+    def test_send_async(self, resend_server):
+        """Test that sends can be awaited concurrently from asyncio."""
+        backend = ResendBackend("key", base_url=resend_server.url, pool_size=4)
+
+        async def send_all():
+            return await asyncio.gather(
+                *(
+                    backend.send_async("d@example.com", "u@example.com", "S", "B")
+                    for _ in range(10)
+                )
+            )
+
+        ids = asyncio.run(send_all())
+        backend.close()
+
+        assert len(set(ids)) == 10
+
+
+def test_backend_from_config_selects_smtp():
+    """Test that EMAIL_BACKEND=smtp builds a pooled SMTP backend."""
+    backend = backend_from_config(
+        {
+            "email_backend": "smtp",
+            "smtp_host": "smtp.example.com",
+            "smtp_port": None,
+            "smtp_security": "ssl",
+            "smtp_pool_size": 8,
+        }
+    )
+
+    assert isinstance(backend, SMTPBackend)
+    assert backend.port == 465
+    assert backend.pool_size == 8
+    assert isinstance(backend_from_config({"resend_api_key": "k"}), ResendBackend)
@@ -6,6 +6,7 @@ import pytest
 
 from src.calendar import Event
 from src.formatter import DigestFormatter
+from src.timezones import LocalDay
 
 
 class TestDigestFormatter:
@@ -254,3 +255,149 @@ class TestDigestFormatter:
 
             # Should handle midnight crossing correctly
             assert "23:30 – 00:30" in digest or "23:30 – 01:30" in digest
+
+    def test_format_update(self):
+        """Test formatting a compact update from an event diff."""
+        from src.snapshot import EventDiff
+
+        old = Event(
+            summary="Product Sync",
+            start=datetime(2023, 6, 26, 13, 0, tzinfo=timezone.utc),
+            end=datetime(2023, 6, 26, 14, 0, tzinfo=timezone.utc),
+        )
+        new = Event(
+            summary="Product Sync",
+            start=datetime(2023, 6, 26, 15, 0, tzinfo=timezone.utc),
+            end=datetime(2023, 6, 26, 16, 0, tzinfo=timezone.utc),
+        )
+        added = Event(
+            summary="Coffee Chat",
+            start=datetime(2023, 6, 26, 10, 0, tzinfo=timezone.utc),
+            end=datetime(2023, 6, 26, 10, 30, tzinfo=timezone.utc),
+        )
+
+        formatter = DigestFormatter("Europe/London")
+        update = formatter.format_update(EventDiff(added=[added], moved=[(old, new)]))
+
+        assert update == "\n".join(
+            [
+                "Here's what changed since your last digest:",
+                "",
+                "New:",
+                "- 10:00 – 10:30 Coffee Chat",
+                "",
+                "Moved:",
+                "- Product Sync: 13:00 – 14:00 → 15:00 – 16:00",
+            ]
+        )
+
+    def test_format_update_no_changes(self):
+        """Test formatting an empty update."""
+        from src.snapshot import EventDiff
+
+        formatter = DigestFormatter("Europe/London")
+
+        assert formatter.format_update(EventDiff()) == (
+            "No changes to your schedule since your last digest."
+        )
+
+    def test_format_aggregate(self):
+        """Test formatting monthly meeting statistics."""
+        from datetime import date
+
+        from src.history import HistoryAggregate
+
+        formatter = DigestFormatter("Europe/London")
+        aggregate = HistoryAggregate(
+            start=date(2023, 6, 1),
+            end=date(2023, 6, 30),
+            meetings=3,
+            hours=2.5,
+            weekly_hours=[(date(2023, 6, 19), 2.5)],
+            busiest_days=[(date(2023, 6, 19), 1.5, 2)],
+            top_attendees=[("alice@example.com", 2)],
+        )
+
+        message = formatter.format_aggregate(aggregate, "month")
+
+        assert message.splitlines() == [
+            "Here's your month in meetings (Jun 01 – Jun 30):",
+            "",
+            "Total: 3 meetings, 2.5 hours",
+            "",
+            "Meeting hours per week:",
+            "- Week of Jun 19: 2.5h",
+            "",
+            "Busiest days:",
+            "- Mon, Jun 19: 1.5h (2 meetings)",
+            "",
+            "Who you met most:",
+            "- alice@example.com: 2 meetings",
+        ]
+
+    def test_format_digest_truncates_large_events(self):
+        """Test description truncation and attendee summarization."""
+        event = Event(
+            summary="Town Hall",
+            start=datetime(2023, 6, 26, 9, 0, tzinfo=timezone.utc),
+            end=datetime(2023, 6, 26, 10, 0, tzinfo=timezone.utc),
+            attendees=[f"person{i}@example.com" for i in range(5)],
+            description="x" * 50,
+        )
+        formatter = DigestFormatter(
+            "Europe/London", max_description_chars=10, max_attendees=2
+        )
+
+        message = formatter.format_digest([event])
+
+        assert (
+            "  Attendees: person0@example.com, person1@example.com and 3 others"
+            in message
+        )
+        assert f"  Description: {'x' * 10}…\n" in message
+
+    def test_format_digest_caps_size(self):
+        """Test that events past the size cap are counted, not rendered."""
+        events = [
+            Event(
+                summary=f"Booking {i}",
+                start=datetime(2023, 6, 26, 9, i, tzinfo=timezone.utc),
+                end=datetime(2023, 6, 26, 10, 0, tzinfo=timezone.utc),
+                description="y" * 200,
+            )
+            for i in range(50)
+        ]
+        formatter = DigestFormatter("Europe/London", max_chars=2000)
+
+        message = formatter.format_digest(events)
+
+        assert len(message) <= 2000
+        assert "Booking 0" in message
+        assert "Booking 49" not in message
+        assert "more events not shown." in message
+        assert message.endswith("Here's to a day full of wins, big and small!")
+
+        # The reused buffer does not leak a previous, longer render
+        short = formatter.format_digest(events[:1])
+        assert "more events not shown" not in short
+
+    def test_header_uses_user_timezone(self):
+        """Test that the header date is the user's, not the server's."""
+        # 23:30 UTC on Monday is already Tuesday in Tokyo
+        server_now = datetime(2023, 6, 26, 23, 30, tzinfo=timezone.utc)
+        events = [
+            Event(
+                summary="Breakfast",
+                start=datetime(2023, 6, 27, 8, 0, tzinfo=timezone.utc),
+                end=datetime(2023, 6, 27, 9, 0, tzinfo=timezone.utc),
+            )
+        ]
+        formatter = DigestFormatter("Asia/Tokyo")
+
+        with patch("src.formatter.datetime") as mock_datetime:
+            mock_datetime.now.side_effect = lambda tz=None: server_now.astimezone(tz)
+            message = formatter.format_digest(events)
+
+        shared_day = LocalDay("Asia/Tokyo", server_now)
+        assert "(Tue, June 27)" in message
+        assert formatter.format_digest(events, shared_day) == message
@@ -0,0 +1,174 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.hedging import HedgedCaller, LatencyTracker
+
+
+def warm_up(caller, endpoint, seconds, count=20):
+    tracker = caller.tracker(endpoint)
+    for _ in range(count):
+        tracker.record(seconds)
+
+
+class TestLatencyTracker:
+    """Test the sliding latency window."""
+
+    def test_percentile_nearest_rank(self):
+        """Test percentiles over the window."""
+        tracker = LatencyTracker(window=100)
+        assert tracker.percentile(99) is None
+
+        for i in range(1, 101):
+            tracker.record(i / 100)
+
+        assert tracker.percentile(50) == 0.5
+        assert tracker.percentile(95) == 0.95
+        assert tracker.percentile(100) == 1.0
+
+    def test_window_drops_old_samples(self):
+        """Test that only the most recent samples count."""
+        tracker = LatencyTracker(window=10)
+        for _ in range(10):
+            tracker.record(5.0)
+        for _ in range(10):
+            tracker.record(0.1)
+
+        assert len(tracker) == 10
+        assert tracker.percentile(99) == 0.1
+
+
+class TestHedgedCaller:
+    """Test adaptive timeouts and hedged calls."""
+
+    def test_timeout_adapts_to_latency(self):
+        """Test that the timeout follows p99 within its bounds."""
+        caller = HedgedCaller(min_timeout=2.0, max_timeout=30.0)
+        assert caller.timeout("events.list") == 30.0
+
+        warm_up(caller, "events.list", 0.1)
+        assert caller.timeout("events.list") == 2.0
+
+        warm_up(caller, "events.list", 4.0, count=256)
+        assert caller.timeout("events.list") == 12.0
+
+        warm_up(caller, "events.list", 20.0, count=256)
+        assert caller.timeout("events.list") == 30.0
+        # Endpoints are tracked separately
+        assert caller.timeout("events.list:masters") == 30.0
+        caller.shutdown()
+
+    def test_slow_call_times_out(self):
+        """Test that a call slower than the adaptive timeout raises."""
+        caller = HedgedCaller(min_timeout=0.05, timeout_multiplier=1.0)
+        warm_up(caller, "events.list", 0.01)
+        release = threading.Event()
+
+        with pytest.raises(TimeoutError):
+            caller.call("events.list", lambda: release.wait(5))
+        release.set()
+        caller.shutdown()
+
+        assert caller.timeouts == 1
+
+    def test_slow_primary_is_hedged(self):
+        """Test that a duplicate is sent after p95 and the first reply wins."""
+        caller = HedgedCaller(hedge=True, hedge_budget=1.0, max_timeout=5.0)
+        warm_up(caller, "events.list", 0.02)
+        release = threading.Event()
+        attempts = []
+
+        def fetch():
+            attempts.append(1)
+            if len(attempts) == 1:
+                release.wait(5)
+                return "primary"
+            return "hedge"
+
+        started = time.monotonic()
+        assert caller.call("events.list", fetch) == "hedge"
+        assert time.monotonic() - started < 1
+        release.set()
+        caller.shutdown()
+
+        assert caller.hedges == 1
+        assert caller.hedge_wins == 1
+
+    def test_fast_call_is_not_hedged(self):
+        """Test that calls finishing before p95 run once."""
+        caller = HedgedCaller(hedge=True, hedge_budget=1.0)
+        warm_up(caller, "events.list", 1.0)
+        attempts = []
+
+        assert caller.call("events.list", lambda: attempts.append(1)) is None
+        caller.shutdown()
+
+        assert len(attempts) == 1
+        assert caller.hedges == 0
+
+    def test_hedges_are_limited_by_budget(self):
+        """Test that at most hedge_budget of calls are hedged."""
+        caller = HedgedCaller(hedge=True, hedge_budget=0.25, window=1000)
+        # Enough fast samples that the slow calls below keep p95 low
+        warm_up(caller, "events.list", 0.001, count=500)
+
+        for _ in range(20):
+            caller.call("events.list", lambda: time.sleep(0.02))
+        caller.shutdown()
+
+        assert caller.calls == 20
+        assert caller.hedges == 5
+
+    def test_hedging_off_by_default(self):
+        """Test that without hedge=True slow calls are never duplicated."""
+        caller = HedgedCaller()
+        warm_up(caller, "events.list", 0.001)
+
+        caller.call("events.list", lambda: time.sleep(0.02))
+        caller.shutdown()
+
+        assert caller.hedge_delay("events.list") is None
+        assert caller.hedges == 0
+
+    def test_failed_attempt_falls_back_to_other(self):
+        """Test that a failing primary is covered by its hedge."""
+        caller = HedgedCaller(hedge=True, hedge_budget=1.0, max_timeout=5.0)
+        warm_up(caller, "events.list", 0.01)
+        attempts = []
+
+        def fetch():
+            attempts.append(1)
+            if len(attempts) == 1:
+                time.sleep(0.1)
+                raise ConnectionError("reset")
+            time.sleep(0.2)
+            return "hedge"
+
+        assert caller.call("events.list", fetch) == "hedge"
+        caller.shutdown()
+
+    def test_errors_are_raised(self):
+        """Test that an unhedged failure propagates unchanged."""
+        caller = HedgedCaller()
+
+        def fetch():
+            raise ConnectionError("reset")
+
+        with pytest.raises(ConnectionError):
+            caller.call("events.list", fetch)
+        caller.shutdown()
+
+    def test_timeout_is_capped_by_deadline(self):
+        """Test that calls get no more than the time left to the deadline."""
+        caller = HedgedCaller(max_timeout=30.0)
+        release = threading.Event()
+
+        with patch("src.hedging.cap_timeout", return_value=0.05) as cap:
+            with pytest.raises(TimeoutError, match="within 0.1s"):
+                caller.call("events.list", lambda: release.wait(5))
+        release.set()
+        caller.shutdown()
+
+        cap.assert_called_once_with(30.0)
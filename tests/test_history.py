@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.calendar import Event
+from src.history import HistoryStore, period_bounds
+
+TZ = ZoneInfo("Europe/Berlin")
+
+
+def make_event(event_id, day, hour, minutes, attendees=None):
+    start = datetime(day.year, day.month, day.day, hour, tzinfo=TZ)
+    return Event(
+        summary=event_id,
+        start=start,
+        end=start + timedelta(minutes=minutes),
+        attendees=attendees,
+        event_id=event_id,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"))
+    yield history
+    history.close()
+
+
+class TestPeriodBounds:
+    """Test aggregate period calculation."""
+
+    def test_week_is_last_monday_to_sunday(self):
+        """Test that the week period is the previous full week."""
+        assert period_bounds("week", date(2023, 6, 28)) == (
+            date(2023, 6, 19),
+            date(2023, 6, 25),
+        )
+
+    def test_month_is_previous_calendar_month(self):
+        """Test that the month period is the previous calendar month."""
+        assert period_bounds("month", date(2023, 3, 1)) == (
+            date(2023, 2, 1),
+            date(2023, 2, 28),
+        )
+
+    def test_invalid_period(self):
+        """Test that unknown periods are rejected."""
+        with pytest.raises(ValueError, match="Invalid aggregate period"):
+            period_bounds("year", date(2023, 6, 28))
+
+
+class TestHistoryStore:
+    """Test the event history store and aggregates."""
+
+    def test_aggregate(self, store):
+        """Test totals, weekly hours, busiest days and top attendees."""
+        monday = date(2023, 6, 19)
+        store.record_day(
+            "u1",
+            monday,
+            [
+                make_event("a", monday, 9, 60, ["me@example.com", "alice@example.com"]),
+                make_event("b", monday, 11, 30, ["bob@example.com"]),
+            ],
+        )
+        tuesday = monday + timedelta(days=1)
+        store.record_day(
+            "u1", tuesday, [make_event("c", tuesday, 9, 30, ["alice@example.com"])]
+        )
+        next_monday = monday + timedelta(days=7)
+        store.record_day("u1", next_monday, [make_event("d", next_monday, 9, 120)])
+        # Other users and days outside the range are ignored
+        store.record_day("u2", monday, [make_event("x", monday, 9, 600)])
+
+        result = store.aggregate(
+            "u1",
+            monday,
+            monday + timedelta(days=6),
+            exclude_attendees=["me@example.com"],
+        )
+
+        assert result.meetings == 3
+        assert result.hours == 2.0
+        assert result.weekly_hours == [(monday, 2.0)]
+        assert result.busiest_days == [(monday, 1.5, 2), (tuesday, 0.5, 1)]
+        assert result.top_attendees == [
+            ("alice@example.com", 2),
+            ("bob@example.com", 1),
+        ]
+
+        month = store.aggregate("u1", date(2023, 6, 1), date(2023, 6, 30))
+        assert month.weekly_hours == [(monday, 2.0), (next_monday, 2.0)]
+
+    def test_record_day_replaces_earlier_run(self, store):
+        """Test that rerunning a day does not double count."""
+        day = date(2023, 6, 19)
+        store.record_day("u1", day, [make_event("a", day, 9, 60, ["a@example.com"])])
+        store.record_day("u1", day, [make_event("a", day, 10, 30, ["a@example.com"])])
+
+        result = store.aggregate("u1", day, day)
+
+        assert result.meetings == 1
+        assert result.hours == 0.5
+        assert result.top_attendees == [("a@example.com", 1)]
@@ -0,0 +1,112 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.email_sender import EmailSender
+from src.ledger import SendLedger, content_hash
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    send_ledger = SendLedger(str(tmp_path / "ledger.db"))
+    yield send_ledger
+    send_ledger.close()
+
+
+class TestSendLedger:
+    """Test the send-once ledger."""
+
+    def test_claim_is_exclusive_until_released(self, ledger):
+        """Test that only one sender holds a claim."""
+        assert ledger.claim("u1", "2023-06-26", "digest", "h1") is True
+        assert ledger.claim("u1", "2023-06-26", "digest", "h1") is False
+        # Other days and kinds are independent
+        assert ledger.claim("u1", "2023-06-27", "digest", "h1") is True
+        assert ledger.claim("u1", "2023-06-26", "update", "h1") is True
+
+        ledger.release("u1", "2023-06-26", "digest")
+        assert ledger.claim("u1", "2023-06-26", "digest", "h1") is True
+
+    def test_completed_send_is_never_claimed_again(self, ledger):
+        """Test that a sent digest blocks further claims."""
+        ledger.claim("u1", "2023-06-26", "digest", "h1")
+        ledger.complete("u1", "2023-06-26", "digest", "msg-1")
+        ledger.release("u1", "2023-06-26", "digest")
+
+        assert ledger.is_sent("u1", "2023-06-26") is True
+        assert ledger.claim("u1", "2023-06-26", "digest", "h2") is False
+
+    def test_expired_claim_can_be_taken_over(self, tmp_path):
+        """Test that a crashed sender's claim expires."""
+        ledger = SendLedger(str(tmp_path / "ledger.db"), lease_seconds=0)
+
+        assert ledger.claim("u1", "2023-06-26", "digest", "h1") is True
+        assert ledger.claim("u1", "2023-06-26", "digest", "h1") is True
+        ledger.close()
+
+
+class TestEmailSenderLedger:
+    """Test that EmailSender sends a digest at most once per day."""
+
+    def make_sender(self, ledger):
+        sender = EmailSender("key", "digest@example.com", ledger=ledger)
+        sender.backend = Mock()
+        sender.backend.send.return_value = "msg-1"
+        return sender
+
+    def test_second_send_is_skipped(self, ledger):
+        """Test that a retried run does not send the digest again."""
+        sender = self.make_sender(ledger)
+
+        assert sender.send_digest("user@example.com", "Digest") is True
+        assert sender.send_digest("user@example.com", "Digest") is True
+
+        sender.backend.send.assert_called_once()
+        row = ledger._conn.execute(
+            "SELECT content_hash, message_id, status FROM sends"
+        ).fetchone()
+        assert row == (content_hash("Digest"), "msg-1", "sent")
+
+    def test_failed_send_releases_claim(self, ledger):
+        """Test that a provider error leaves the digest retryable."""
+        sender = self.make_sender(ledger)
+        sender.backend.send.side_effect = [Exception("boom"), "msg-2"]
+
+        assert sender.send_digest("user@example.com", "Digest") is False
+        assert sender.send_digest("user@example.com", "Digest") is True
+        assert sender.backend.send.call_count == 2
+
+    @patch("src.email_sender.today_in_timezone")
+    def test_concurrent_send_is_not_duplicated(self, mock_today, ledger):
+        """Test that a digest claimed by another run is not sent."""
+        from datetime import date
+
+        mock_today.return_value = date(2023, 6, 26)
+        sender = EmailSender(
+            "key", "digest@example.com", ledger=ledger, timezone_str="Asia/Tokyo"
+        )
+        sender.backend = Mock()
+        ledger.claim("user@example.com", "2023-06-26", "digest", "other")
+
+        assert sender.send_digest("user@example.com", "Digest") is False
+        sender.backend.send.assert_not_called()
+
+    @patch("src.email_sender.today_in_timezone")
+    def test_subjects_use_recipient_date(self, mock_today, ledger):
+        """Test that subjects carry the same local date as the ledger."""
+        from datetime import date
+
+        mock_today.return_value = date(2023, 6, 27)
+        sender = EmailSender(
+            "key", "digest@example.com", ledger=ledger, timezone_str="Asia/Tokyo"
+        )
+        sender.backend = Mock()
+        sender.backend.send.return_value = "msg-1"
+
+        sender.send_digest("user@example.com", "Digest")
+        sender.send_update("user@example.com", "Update")
+        sender.send_aggregate("user@example.com", "Summary", "week")
+
+        subjects = [call.args[2] for call in sender.backend.send.call_args_list]
+        assert all(subject.endswith("2023-06-27") for subject in subjects)
+        assert ledger.is_sent("user@example.com", "2023-06-27", "digest")
@@ -0,0 +1,84 @@
+import sys
+
+import pytest
+from loguru import logger
+
+from src.logging_config import (
+    LogSampler,
+    ModuleLevelFilter,
+    configure_logging,
+    parse_module_levels,
+)
+
+
+def make_record(name, level):
+    return {"name": name, "level": logger.level(level)}
+
+
+@pytest.fixture
+def restore_logger():
+    yield
+    logger.remove()
+    logger.add(sys.stderr)
+
+
+class TestLoggingConfig:
+    """Test logging configuration helpers."""
+
+    def test_parse_module_levels(self):
+        """Test parsing per-module level overrides."""
+        assert parse_module_levels("src.calendar=debug, src.formatter=WARNING") == {
+            "src.calendar": "DEBUG",
+            "src.formatter": "WARNING",
+        }
+        assert parse_module_levels(None) == {}
+
+    def test_parse_module_levels_invalid(self):
+        """Test that malformed overrides raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid module log level"):
+            parse_module_levels("src.calendar")
+        with pytest.raises(ValueError):
+            parse_module_levels("src.calendar=LOUD")
+
+    def test_module_level_filter_prefers_most_specific(self):
+        """Test that the longest matching module prefix decides the level."""
+        level_filter = ModuleLevelFilter(
+            "INFO", {"src": "WARNING", "src.calendar": "DEBUG"}
+        )
+
+        assert level_filter(make_record("src.calendar", "DEBUG")) is True
+        assert level_filter(make_record("src.formatter", "INFO")) is False
+        assert level_filter(make_record("src.formatter", "WARNING")) is True
+        assert level_filter(make_record("other", "INFO")) is True
+        assert level_filter(make_record("other", "DEBUG")) is False
+
+    def test_log_sampler(self):
+        """Test that the sampler lets one in every N calls through."""
+        sampler = LogSampler(every=3)
+
+        assert [sampler() for _ in range(7)] == [
+            True,
+            False,
+            False,
+            True,
+            False,
+            False,
+            True,
+        ]
+
+    def test_configure_logging_writes_in_background(self, tmp_path, restore_logger):
+        """Test that the enqueued file sink receives filtered messages."""
+        configure_logging(
+            log_dir=str(tmp_path),
+            level="WARNING",
+            module_levels={__name__: "INFO"},
+            enqueue=True,
+        )
+
+        logger.info("visible {}", "message")
+        logger.debug("hidden message")
+        logger.complete()
+
+        content = (tmp_path / "orbit_digest.log").read_text()
+        assert "visible message" in content
+        assert "hidden message" not in content
@@ -1,8 +1,9 @@
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, patch
 
 import pytest
 
 from src.main import OrbitDigest
+from src.resilience import CircuitOpenError
 
 
 class TestOrbitDigest:
@@ -99,10 +100,12 @@ class TestOrbitDigest:
         result = digest.run_digest()
 
         assert result is True
+        day = mock_calendar_instance.get_today_events.call_args.kwargs["day"]
+        assert day.timezone_str == "Europe/London"
         mock_calendar_instance.get_today_events.assert_called_once_with(
-            timezone_str="Europe/London", quiet_start=22, quiet_end=7
+            timezone_str="Europe/London", quiet_start=22, quiet_end=7, day=day
         )
-        mock_formatter_instance.format_digest.assert_called_once_with(events)
+        mock_formatter_instance.format_digest.assert_called_once_with(events, day)
         mock_email_instance.send_digest.assert_called_once_with(
             recipient="test@example.com", content="Formatted digest content"
         )
@@ -150,7 +153,7 @@ class TestOrbitDigest:
         result = digest.run_digest()
 
         assert result is True
-        mock_formatter_instance.format_digest.assert_called_once_with([])
+        mock_formatter_instance.format_digest.assert_called_once_with([], ANY)
 
     @patch("src.main.EmailSender")
     @patch("src.main.CalendarService")
@@ -197,6 +200,13 @@ class TestOrbitDigest:
         mock_formatter_instance.format_digest.assert_not_called()
         mock_email_instance.send_digest.assert_not_called()
 
+        # An open circuit is raised so the batch can defer the user
+        mock_calendar_instance.get_today_events.side_effect = CircuitOpenError(
+            "calendar", 30
+        )
+        with pytest.raises(CircuitOpenError):
+            digest.run_digest()
+
     @patch("src.main.EmailSender")
     @patch("src.main.CalendarService")
     @patch("src.main.DigestFormatter")
@@ -252,3 +262,372 @@ class TestOrbitDigest:
         # Should return False if email fails
         assert result is False
         mock_email_instance.send_digest.assert_called_once()
+
+    @patch("src.main.EmailSender")
+    @patch("src.main.CalendarService")
+    @patch("src.main.DigestFormatter")
+    @patch("src.main.get_env_config")
+    def test_run_digest_suppresses_duplicate_send(
+        self, mock_get_config, mock_formatter, mock_calendar, mock_email, tmp_path
+    ):
+        """Test that an unchanged digest is rendered and sent only once."""
+        mock_config = {
+            "google_client_id": "test_id",
+            "google_client_secret": "test_secret",
+            "google_refresh_token": "test_token",
+            "resend_api_key": "test_resend_key",
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+            "digest_hour": 7,
+            "quiet_hours_start": 22,
+            "quiet_hours_end": 7,
+            "sender_email": "test@example.com",
+            "digest_cache_dir": str(tmp_path),
+            "suppress_duplicate_digests": True,
+        }
+        mock_get_config.return_value = mock_config
+
+        mock_calendar.return_value.get_today_events.return_value = []
+        mock_formatter_instance = mock_formatter.return_value
+        mock_formatter_instance.format_digest.return_value = "Formatted digest"
+        mock_email_instance = mock_email.return_value
+        mock_email_instance.send_digest.return_value = True
+
+        digest = OrbitDigest()
+
+        assert digest.run_digest() is True
+        assert digest.run_digest() is True
+
+        mock_formatter_instance.format_digest.assert_called_once_with([], ANY)
+        mock_email_instance.send_digest.assert_called_once_with(
+            recipient="test@example.com", content="Formatted digest"
+        )
+
+    @patch("src.main.EmailSender")
+    @patch("src.main.CalendarService")
+    @patch("src.main.DigestFormatter")
+    @patch("src.main.get_env_config")
+    def test_run_digest_update_mode(
+        self, mock_get_config, mock_formatter, mock_calendar, mock_email, tmp_path
+    ):
+        """Test that update mode sends only changes after the first digest."""
+        from src.calendar import Event
+        from datetime import datetime, timezone
+
+        mock_config = {
+            "google_client_id": "test_id",
+            "google_client_secret": "test_secret",
+            "google_refresh_token": "test_token",
+            "resend_api_key": "test_resend_key",
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+            "digest_hour": 7,
+            "quiet_hours_start": 22,
+            "quiet_hours_end": 7,
+            "sender_email": "test@example.com",
+            "digest_mode": "update",
+            "snapshot_dir": str(tmp_path),
+        }
+        mock_get_config.return_value = mock_config
+
+        standup = Event(
+            summary="Team Standup",
+            start=datetime(2023, 6, 26, 9, 0, tzinfo=timezone.utc),
+            end=datetime(2023, 6, 26, 9, 30, tzinfo=timezone.utc),
+            event_id="standup",
+            etag="1",
+        )
+        mock_get_events = mock_calendar.return_value.get_today_events
+        mock_get_events.return_value = [standup]
+
+        mock_formatter_instance = mock_formatter.return_value
+        mock_formatter_instance.format_digest.return_value = "Full digest"
+        mock_formatter_instance.format_update.return_value = "Update digest"
+        mock_email_instance = mock_email.return_value
+        mock_email_instance.send_digest.return_value = True
+        mock_email_instance.send_update.return_value = True
+
+        digest = OrbitDigest()
+
+        # First run has no snapshot and sends the full digest
+        assert digest.run_digest() is True
+        mock_email_instance.send_digest.assert_called_once()
+
+        # Unchanged calendar sends nothing
+        assert digest.run_digest() is True
+        mock_email_instance.send_update.assert_not_called()
+
+        # A new event produces an update email
+        coffee = Event(
+            summary="Coffee Chat",
+            start=datetime(2023, 6, 26, 10, 0, tzinfo=timezone.utc),
+            end=datetime(2023, 6, 26, 10, 30, tzinfo=timezone.utc),
+            event_id="coffee",
+            etag="1",
+        )
+        mock_get_events.return_value = [standup, coffee]
+        assert digest.run_digest() is True
+
+        diff = mock_formatter_instance.format_update.call_args[0][0]
+        assert [e.event_id for e in diff.added] == ["coffee"]
+        mock_email_instance.send_update.assert_called_once_with(
+            recipient="test@example.com", content="Update digest"
+        )
+
+        # The first run of a new local day is a full digest again
+        from datetime import timedelta
+
+        from src.timezones import LocalDay
+
+        tomorrow = LocalDay("Europe/London", datetime.now(timezone.utc) + timedelta(1))
+        assert digest.run_digest(day=tomorrow) is True
+        assert mock_email_instance.send_digest.call_count == 2
+        mock_email_instance.send_update.assert_called_once()
+
+    @patch("src.main.EmailSender")
+    @patch("src.main.CalendarService")
+    @patch("src.main.DigestFormatter")
+    @patch("src.main.get_env_config")
+    def test_run_digest_resumes_from_checkpoint(
+        self, mock_get_config, mock_formatter, mock_calendar, mock_email, tmp_path
+    ):
+        """Test that a resumed run sends the checkpointed render without fetching."""
+        from src.checkpoint import BatchCheckpoint
+
+        mock_get_config.return_value = {
+            "google_client_id": "test_id",
+            "google_client_secret": "test_secret",
+            "google_refresh_token": "test_token",
+            "resend_api_key": "test_resend_key",
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+            "digest_hour": 7,
+            "quiet_hours_start": 22,
+            "quiet_hours_end": 7,
+            "sender_email": "test@example.com",
+        }
+        mock_email_instance = mock_email.return_value
+        mock_email_instance.send_digest.return_value = False
+
+        path = str(tmp_path / "checkpoint.jsonl")
+        checkpoint = BatchCheckpoint(path, "daily")
+        checkpoint.user("u1").record_fetched([])
+        checkpoint.user("u1").record_rendered("Rendered before crash")
+        checkpoint.close()
+
+        resumed = BatchCheckpoint(path, "daily")
+        digest = OrbitDigest()
+
+        assert digest.run_digest(checkpoint=resumed.user("u1")) is False
+        mock_email_instance.send_digest.return_value = True
+        assert digest.run_digest(checkpoint=resumed.user("u1")) is True
+
+        mock_calendar.assert_not_called()
+        mock_formatter.return_value.format_digest.assert_not_called()
+        mock_email_instance.send_digest.assert_called_with(
+            recipient="test@example.com", content="Rendered before crash"
+        )
+        assert resumed.user("u1").stage == "sent"
+        resumed.close()
+
+    @patch("src.main.EmailSender")
+    @patch("src.main.CalendarService")
+    @patch("src.main.DigestFormatter")
+    @patch("src.main.get_env_config")
+    def test_prepare_then_deliver_sends_staged_digest(
+        self, mock_get_config, mock_formatter, mock_calendar, mock_email, tmp_path
+    ):
+        """Test that delivery sends the prepared render when nothing changed."""
+        config = {
+            "google_client_id": "test_id",
+            "google_client_secret": "test_secret",
+            "google_refresh_token": "test_token",
+            "resend_api_key": "test_resend_key",
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+            "digest_hour": 7,
+            "quiet_hours_start": 22,
+            "quiet_hours_end": 7,
+            "sender_email": "test@example.com",
+            "staging_db": str(tmp_path / "staging.db"),
+        }
+        mock_get_config.return_value = dict(config, digest_phase="prepare")
+        mock_calendar_instance = mock_calendar.return_value
+        mock_calendar_instance.get_today_events.return_value = []
+        mock_calendar_instance.changed_since.return_value = False
+        mock_formatter.return_value.format_digest.return_value = "Prepared digest"
+        mock_email_instance = mock_email.return_value
+        mock_email_instance.send_digest.return_value = True
+
+        assert OrbitDigest().run_digest() is True
+        mock_email_instance.send_digest.assert_not_called()
+
+        mock_get_config.return_value = dict(config, digest_phase="deliver")
+        assert OrbitDigest().run_digest() is True
+
+        mock_calendar_instance.get_today_events.assert_called_once()
+        mock_calendar_instance.changed_since.assert_called_once()
+        mock_email_instance.send_digest.assert_called_once_with(
+            recipient="test@example.com", content="Prepared digest"
+        )
+
+    @patch("src.main.EmailSender")
+    @patch("src.main.CalendarService")
+    @patch("src.main.DigestFormatter")
+    @patch("src.main.get_env_config")
+    def test_deliver_rerenders_stale_digest(
+        self, mock_get_config, mock_formatter, mock_calendar, mock_email, tmp_path
+    ):
+        """Test that delivery refetches when the calendar changed after prepare."""
+        config = {
+            "google_client_id": "test_id",
+            "google_client_secret": "test_secret",
+            "google_refresh_token": "test_token",
+            "resend_api_key": "test_resend_key",
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+            "digest_hour": 7,
+            "quiet_hours_start": 22,
+            "quiet_hours_end": 7,
+            "sender_email": "test@example.com",
+            "staging_db": str(tmp_path / "staging.db"),
+        }
+        mock_get_config.return_value = dict(config, digest_phase="prepare")
+        mock_calendar_instance = mock_calendar.return_value
+        mock_calendar_instance.get_today_events.return_value = []
+        mock_calendar_instance.changed_since.return_value = True
+        mock_formatter.return_value.format_digest.side_effect = [
+            "Prepared digest",
+            "Fresh digest",
+        ]
+        mock_email_instance = mock_email.return_value
+        mock_email_instance.send_digest.return_value = True
+
+        assert OrbitDigest().run_digest() is True
+        mock_get_config.return_value = dict(config, digest_phase="deliver")
+        assert OrbitDigest().run_digest() is True
+
+        assert mock_calendar_instance.get_today_events.call_count == 2
+        mock_email_instance.send_digest.assert_called_once_with(
+            recipient="test@example.com", content="Fresh digest"
+        )
+
+
+class TestMain:
+    """Test the command line entry point."""
+
+    @patch("src.main.configure_logging_from_env")
+    @patch("src.main.OrbitDigest")
+    @patch("src.main.get_env_config")
+    def test_main_skips_users_of_other_shards(
+        self, mock_get_config, mock_digest, mock_configure_logging
+    ):
+        """Test that a shard only runs the users it owns."""
+        from src.main import main
+        from src.sharding import ShardRing
+
+        mock_get_config.return_value = {
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+        }
+        mock_digest.return_value.run_digest.return_value = True
+        owner = ShardRing(2).owner("test@example.com")
+
+        assert main(["--shard", f"{1 - owner}/2"]) == 0
+        mock_digest.assert_not_called()
+
+        assert main(["--shard", f"{owner}/2"]) == 0
+        mock_digest.assert_called_once()
+
+    @patch("src.main.configure_logging_from_env")
+    @patch("src.main.OrbitDigest")
+    @patch("src.main.get_env_config")
+    def test_main_claims_prevent_double_send(
+        self, mock_get_config, mock_digest, mock_configure_logging, tmp_path
+    ):
+        """Test that a rerun after a successful send does nothing."""
+        from src.main import main
+
+        mock_get_config.return_value = {
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+        }
+        mock_digest.return_value.run_digest.return_value = True
+        claims_db = str(tmp_path / "claims.db")
+
+        assert main(["--claims-db", claims_db]) == 0
+        assert main(["--claims-db", claims_db]) == 0
+
+        mock_digest.return_value.run_digest.assert_called_once()
+
+    @patch("src.main.configure_logging_from_env")
+    @patch("src.main.OrbitDigest")
+    @patch("src.main.get_env_config")
+    def test_main_shares_and_closes_stores(
+        self, mock_get_config, mock_digest, mock_configure_logging, tmp_path
+    ):
+        """Test that stores are opened once for the run and closed after it."""
+        import sqlite3
+
+        from src.main import main
+
+        mock_get_config.return_value = {
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+            "send_ledger_db": str(tmp_path / "ledger.db"),
+            "history_db": str(tmp_path / "history.db"),
+            "staging_db": str(tmp_path / "staging.db"),
+            "change_tracker_db": str(tmp_path / "tracker.db"),
+        }
+        mock_digest.return_value.run_digest.return_value = True
+
+        assert main([]) == 0
+
+        stores = {
+            name: mock_digest.call_args.kwargs[name]
+            for name in (
+                "send_ledger",
+                "history_store",
+                "search_index",
+                "staging_store",
+                "change_tracker",
+            )
+        }
+        for name, store in stores.items():
+            assert store is not None, name
+            with pytest.raises(sqlite3.ProgrammingError):
+                store._conn.execute("SELECT 1")
+
+    @patch("src.main.configure_logging_from_env")
+    @patch("src.main.OrbitDigest")
+    @patch("src.main.get_env_config")
+    def test_main_profile_writes_output(
+        self, mock_get_config, mock_digest, mock_configure_logging, tmp_path
+    ):
+        """Test that --profile writes pstats, collapsed stacks and a summary."""
+        from src.main import main
+
+        mock_get_config.return_value = {
+            "email_recipient": "test@example.com",
+            "timezone": "Europe/London",
+        }
+        mock_digest.return_value.run_digest.return_value = True
+
+        assert main(["--profile", str(tmp_path)]) == 0
+
+        assert (tmp_path / "orbit_digest.pstats").exists()
+        assert (tmp_path / "orbit_digest.collapsed").exists()
+        assert "Total wall time" in (tmp_path / "orbit_digest.txt").read_text()
+
+    @patch.dict("os.environ", {"CLAIMS_DB": "", "SEND_LEDGER_DB": ""})
+    def test_deliver_phase_requires_send_record(self, tmp_path):
+        """Test that hourly delivery refuses to run without a ledger or claims."""
+        from src.main import parse_args
+
+        with pytest.raises(SystemExit):
+            parse_args(["--phase", "deliver"])
+
+        claims_db = str(tmp_path / "claims.db")
+        assert parse_args(["--phase", "deliver", "--claims-db", claims_db]).phase
+        with patch.dict("os.environ", {"SEND_LEDGER_DB": "ledger.db"}):
+            assert parse_args(["--phase", "deliver"]).phase == "deliver"
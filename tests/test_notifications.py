@@ -0,0 +1,195 @@
+import sqlite3
+import threading
+import time
+import urllib.request
+from unittest.mock import Mock
+
+import pytest
+
+from src.notifications import ChangeTracker, WatchChannel, create_receiver
+
+
+def make_tracker(tmp_path, expiration_offset=3600):
+    tracker = ChangeTracker(str(tmp_path / "tracker.db"))
+    tracker.add_channel(
+        WatchChannel(
+            channel_id="channel-1",
+            calendar_id="primary",
+            resource_id="resource-1",
+            token="secret",
+            expiration=time.time() + expiration_offset,
+        )
+    )
+    return tracker
+
+
+class TestChangeTracker:
+    """Test ChangeTracker channel and dirty-calendar bookkeeping."""
+
+    def test_unwatched_calendar_is_polled(self, tmp_path):
+        """Test that calendars without an active channel always refresh."""
+        tracker = make_tracker(tmp_path, expiration_offset=-1)
+
+        assert tracker.needs_refresh("primary") is True
+        assert tracker.needs_refresh("team@example.com") is True
+        assert [c.channel_id for c in tracker.expired_channels()] == ["channel-1"]
+
+    def test_notification_marks_calendar_dirty(self, tmp_path):
+        """Test that change notifications mark the watched calendar dirty."""
+        tracker = make_tracker(tmp_path)
+        assert tracker.needs_refresh("primary") is False
+
+        assert tracker.record_notification("channel-1", "sync", "secret") is None
+        assert tracker.needs_refresh("primary") is False
+
+        assert tracker.record_notification("channel-1", "exists", "secret") == (
+            "primary"
+        )
+        assert tracker.needs_refresh("primary") is True
+
+        tracker.mark_clean("primary")
+        assert tracker.needs_refresh("primary") is False
+
+    def test_notification_with_bad_token_is_ignored(self, tmp_path):
+        """Test that notifications with a wrong token or channel are ignored."""
+        tracker = make_tracker(tmp_path)
+
+        assert tracker.record_notification("channel-1", "exists", "wrong") is None
+        assert tracker.record_notification("unknown", "exists", "secret") is None
+        assert tracker.needs_refresh("primary") is False
+
+    def test_ensure_channel_registers_once(self, tmp_path):
+        """Test that a watch channel is registered and then reused."""
+        tracker = ChangeTracker(str(tmp_path / "tracker.db"))
+        service = Mock()
+        service.events.return_value.watch.return_value.execute.return_value = {
+            "id": "channel-2",
+            "resourceId": "resource-2",
+            "expiration": str(int((time.time() + 7 * 24 * 3600) * 1000)),
+        }
+
+        first = tracker.ensure_channel(service, "primary", "https://example.com/hook")
+        second = tracker.ensure_channel(service, "primary", "https://example.com/hook")
+
+        assert first.channel_id == second.channel_id == "channel-2"
+        service.events.return_value.watch.assert_called_once()
+        body = service.events.return_value.watch.call_args.kwargs["body"]
+        assert body["type"] == "web_hook"
+        assert body["address"] == "https://example.com/hook"
+        assert tracker.get_channel("channel-2").token == body["token"]
+
+    def test_users_sharing_a_database_are_kept_apart(self, tmp_path):
+        """Test that each user's "primary" has its own channel and state."""
+        db_path = str(tmp_path / "tracker.db")
+        trackers = {owner: ChangeTracker(db_path, owner=owner) for owner in ("a", "b")}
+        service = Mock()
+        service.events.return_value.watch.return_value.execute.side_effect = [
+            {
+                "id": f"channel-{owner}",
+                "resourceId": f"resource-{owner}",
+                "expiration": str(int((time.time() + 3600) * 1000)),
+            }
+            for owner in ("a", "b")
+        ]
+        for tracker in trackers.values():
+            tracker.ensure_channel(service, "primary", "https://example.com/hook")
+            tracker.mark_clean("primary")
+
+        assert service.events.return_value.watch.call_count == 2
+        receiver = ChangeTracker(db_path)
+        token = trackers["b"].get_channel("channel-b").token
+        receiver.record_notification("channel-b", "exists", token)
+
+        assert trackers["a"].needs_refresh("primary") is False
+        assert trackers["b"].needs_refresh("primary") is True
+        trackers["a"].mark_clean("primary")
+        assert trackers["b"].needs_refresh("primary") is True
+
+    def test_owner_view_shares_the_connection(self, tmp_path):
+        """Test that one tracker opened for a run serves each user."""
+        shared = ChangeTracker(str(tmp_path / "tracker.db"))
+        alice = shared.for_owner("alice")
+
+        alice.mark_dirty("primary")
+
+        assert alice._conn is shared._conn
+        rows = shared._conn.execute("SELECT owner, calendar_id FROM dirty")
+        assert rows.fetchall() == [("alice", "primary")]
+        shared.close()
+
+    def test_database_without_owners_is_reset(self, tmp_path):
+        """Test that rows of the former schema are dropped, not misattributed."""
+        db_path = str(tmp_path / "tracker.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript(
+            """
+            CREATE TABLE channels (
+                channel_id TEXT PRIMARY KEY,
+                calendar_id TEXT NOT NULL,
+                resource_id TEXT NOT NULL,
+                token TEXT NOT NULL,
+                expiration REAL NOT NULL
+            );
+            CREATE TABLE dirty (
+                calendar_id TEXT PRIMARY KEY,
+                marked_at REAL NOT NULL
+            );
+            """
+        )
+        conn.execute(
+            "INSERT INTO channels VALUES ('old', 'primary', 'r', 't', ?)",
+            (time.time() + 3600,),
+        )
+        conn.commit()
+        conn.close()
+
+        tracker = ChangeTracker(db_path, owner="a")
+
+        assert tracker.get_channel("old") is None
+        assert tracker.needs_refresh("primary") is True
+
+
+class TestNotificationReceiver:
+    """Test the webhook receiver against a local notification stand-in."""
+
+    @pytest.fixture
+    def receiver(self, tmp_path):
+        tracker = make_tracker(tmp_path)
+        server = create_receiver(tracker, host="127.0.0.1", port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield tracker, f"http://127.0.0.1:{server.server_address[1]}/"
+        server.shutdown()
+        server.server_close()
+
+    def post(self, url, headers):
+        request = urllib.request.Request(url, data=b"", headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def test_receiver_records_change(self, receiver):
+        """Test that a posted notification marks the calendar dirty."""
+        tracker, url = receiver
+
+        status = self.post(
+            url,
+            {
+                "X-Goog-Channel-ID": "channel-1",
+                "X-Goog-Channel-Token": "secret",
+                "X-Goog-Resource-State": "exists",
+                "X-Goog-Resource-ID": "resource-1",
+            },
+        )
+
+        assert status == 200
+        assert tracker.needs_refresh("primary") is True
+
+    def test_receiver_rejects_missing_headers(self, receiver):
+        """Test that requests without notification headers are rejected."""
+        tracker, url = receiver
+
+        assert self.post(url, {}) == 400
+        assert tracker.needs_refresh("primary") is False
@@ -0,0 +1,120 @@
+from unittest.mock import Mock, patch
+
+from src.main import OrbitDigest
+from src.pool import ServicePool
+
+
+class Client:
+    """Pooled object whose size grows like a client filling its caches."""
+
+    def __init__(self, name, size=100):
+        self.name = name
+        self.size = size
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(max_bytes):
+    return ServicePool(lambda c: c.size, max_bytes=max_bytes, on_evict=Client.close)
+
+
+class TestServicePool:
+    """Test the memory-bounded LRU pool."""
+
+    def test_reuses_clients_by_key(self):
+        """Test that a key is built once and then served from the pool."""
+        pool = make_pool(1000)
+        create = Mock(side_effect=lambda: Client("a"))
+
+        first = pool.get("a", create)
+        second = pool.get("a", create)
+
+        assert first is second
+        create.assert_called_once()
+        assert (pool.hits, pool.misses) == (1, 1)
+        assert pool.hit_rate == 0.5
+        assert pool.bytes == 100
+
+    def test_evicts_least_recently_used(self):
+        """Test that the budget evicts the client unused the longest."""
+        pool = make_pool(300)
+        clients = {name: pool.get(name, lambda n=name: Client(n)) for name in "abc"}
+        # Touch a, so b is the least recently used
+        pool.get("a", Mock())
+
+        pool.get("d", lambda: Client("d"))
+
+        assert len(pool) == 3
+        assert pool.evictions == 1
+        assert clients["b"].closed is True
+        assert clients["a"].closed is False
+        assert pool.bytes == 300
+
+    def test_grown_client_is_remeasured(self):
+        """Test that caches filled after a get count on the next get."""
+        pool = make_pool(500)
+        a = pool.get("a", lambda: Client("a"))
+        b = pool.get("b", lambda: Client("b"))
+        b.size = 350
+
+        pool.get("b", Mock())
+
+        assert pool.bytes == 450
+        pool.get("c", lambda: Client("c"))
+        assert a.closed is True
+        assert pool.bytes == 450
+        assert pool.peak_bytes == 550
+
+    def test_oversized_client_is_kept(self):
+        """Test that the client being handed out is never evicted."""
+        pool = make_pool(50)
+
+        client = pool.get("a", lambda: Client("a", size=80))
+
+        assert client.closed is False
+        assert len(pool) == 1
+
+    def test_discard_and_clear_release_clients(self):
+        """Test that removed clients are closed."""
+        pool = make_pool(1000)
+        a = pool.get("a", lambda: Client("a"))
+        b = pool.get("b", lambda: Client("b"))
+
+        pool.discard("a")
+        assert a.closed is True
+        assert pool.bytes == 100
+
+        pool.clear()
+        assert b.closed is True
+        assert len(pool) == 0
+        assert pool.bytes == 0
+
+
+@patch("src.main.CalendarService")
+def test_digests_share_pooled_calendar_client(mock_calendar):
+    """Test that OrbitDigest takes the calendar client from the pool."""
+    config = {
+        "google_client_id": "id",
+        "google_client_secret": "secret",
+        "google_refresh_token": "token",
+        "email_recipient": "user@example.com",
+        "sender_email": "digest@example.com",
+        "timezone": "Europe/London",
+        "calendar_ids": ["primary"],
+    }
+    pool = ServicePool(lambda service: 1)
+
+    first = OrbitDigest(config, delivery_backend=Mock(), service_pool=pool)
+    second = OrbitDigest(config, delivery_backend=Mock(), service_pool=pool)
+    other = OrbitDigest(
+        dict(config, calendar_ids=["team@example.com"]),
+        delivery_backend=Mock(),
+        service_pool=pool,
+    )
+
+    assert first.calendar_service is second.calendar_service
+    other.calendar_service
+    assert mock_calendar.call_count == 2
+    assert pool.hits == 1
@@ -0,0 +1,61 @@
+import pstats
+import time
+
+import pytest
+
+from src.profiling import Profiler, stage
+
+
+class TestProfiler:
+    """Test the run profiler and stage annotations."""
+
+    def test_stage_is_noop_without_profiler(self):
+        """Test that stages outside a profiled run do nothing."""
+        with stage("list"):
+            pass
+
+    def test_profiler_records_nested_stages(self, tmp_path):
+        """Test that nested stages are timed under their full path."""
+        with Profiler(str(tmp_path)) as profiler:
+            with stage("fetch"):
+                with stage("list"):
+                    time.sleep(0.01)
+                with stage("list"):
+                    pass
+
+        assert set(profiler.stages) == {"fetch", "fetch;list"}
+        assert profiler.stages["fetch;list"].calls == 2
+        assert profiler.stages["fetch;list"].seconds >= 0.01
+        assert profiler.stages["fetch"].seconds >= profiler.stages["fetch;list"].seconds
+
+    def test_profiler_writes_outputs(self, tmp_path):
+        """Test that pstats and collapsed stacks annotated by stage are written."""
+
+        def busy_send():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with Profiler(str(tmp_path), sample_interval=0.001):
+            with stage("send"):
+                busy_send()
+
+        stats = pstats.Stats(str(tmp_path / "orbit_digest.pstats"))
+        assert any(func[2] == "busy_send" for func in stats.stats)
+
+        lines = (tmp_path / "orbit_digest.collapsed").read_text().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert any(
+            line.startswith("stage:send;") and "busy_send" in line for line in lines
+        )
+
+        summary = (tmp_path / "orbit_digest.txt").read_text()
+        assert "send" in summary
+
+    def test_profilers_do_not_nest(self, tmp_path):
+        """Test that starting a second profiler fails."""
+        with Profiler(str(tmp_path)):
+            with pytest.raises(RuntimeError, match="already active"):
+                Profiler(str(tmp_path / "inner")).__enter__()
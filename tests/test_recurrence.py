@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.recurrence import (
+    RecurrenceRule,
+    RecurringEventCache,
+    expand_items,
+    expand_master,
+)
+from src.timezones import get_timezone
+
+BERLIN = get_timezone("Europe/Berlin")
+
+
+def window(day, days=1):
+    start = datetime(2023, 3, day, tzinfo=BERLIN)
+    return start, start + timedelta(days=days)
+
+
+def make_master(recurrence, event_id="series"):
+    return {
+        "id": event_id,
+        "summary": "Weekly Sync",
+        "start": {"dateTime": "2023-03-06T09:00:00+01:00", "timeZone": "Europe/Berlin"},
+        "end": {"dateTime": "2023-03-06T09:30:00+01:00", "timeZone": "Europe/Berlin"},
+        "recurrence": recurrence,
+    }
+
+
+class TestRecurrenceRule:
+    """Test RRULE parsing and occurrence generation."""
+
+    def test_weekly_byday(self):
+        """Test weekly occurrences on several weekdays."""
+        rule = RecurrenceRule("FREQ=WEEKLY;BYDAY=MO,WE")
+        dtstart = datetime(2023, 3, 6, 9, 0, tzinfo=BERLIN)
+
+        days = [
+            o.day
+            for o in rule.occurrences(dtstart, datetime(2023, 3, 16, tzinfo=BERLIN))
+        ]
+
+        assert days == [6, 8, 13, 15]
+
+    def test_count_and_until(self):
+        """Test that COUNT and UNTIL end the series."""
+        dtstart = datetime(2023, 3, 6, 9, 0, tzinfo=BERLIN)
+        end = datetime(2024, 1, 1, tzinfo=BERLIN)
+
+        counted = list(RecurrenceRule("FREQ=DAILY;COUNT=3").occurrences(dtstart, end))
+        until = list(
+            RecurrenceRule("FREQ=DAILY;UNTIL=20230308T235959Z").occurrences(
+                dtstart, end
+            )
+        )
+
+        assert [o.day for o in counted] == [6, 7, 8]
+        assert [o.day for o in until] == [6, 7, 8]
+
+    def test_monthly_last_friday(self):
+        """Test monthly rules with a negative weekday ordinal."""
+        rule = RecurrenceRule("FREQ=MONTHLY;BYDAY=-1FR")
+        dtstart = datetime(2023, 1, 27, 16, 0, tzinfo=BERLIN)
+
+        dates = [
+            o.date().isoformat()
+            for o in rule.occurrences(dtstart, datetime(2023, 4, 1, tzinfo=BERLIN))
+        ]
+
+        assert dates == ["2023-01-27", "2023-02-24", "2023-03-31"]
+
+    def test_monthly_bymonthday_and_byday_intersect(self):
+        """Test that BYMONTHDAY and BYDAY both limit the days, as in Friday 13th."""
+        rule = RecurrenceRule("FREQ=MONTHLY;BYDAY=FR;BYMONTHDAY=13")
+        dtstart = datetime(2023, 1, 13, 18, 0, tzinfo=BERLIN)
+
+        dates = [
+            o.date().isoformat()
+            for o in rule.occurrences(dtstart, datetime(2024, 1, 1, tzinfo=BERLIN))
+        ]
+
+        assert dates == ["2023-01-13", "2023-10-13"]
+
+    def test_week_start_decides_skipped_weeks(self):
+        """Test the RFC 5545 WKST example for biweekly rules."""
+        dtstart = datetime(1997, 8, 5, 9, 0, tzinfo=BERLIN)
+        end = datetime(1998, 1, 1, tzinfo=BERLIN)
+
+        monday = RecurrenceRule("FREQ=WEEKLY;INTERVAL=2;COUNT=4;BYDAY=TU,SU;WKST=MO")
+        sunday = RecurrenceRule("FREQ=WEEKLY;INTERVAL=2;COUNT=4;BYDAY=TU,SU;WKST=SU")
+
+        assert [o.day for o in monday.occurrences(dtstart, end)] == [5, 10, 19, 24]
+        assert [o.day for o in sunday.occurrences(dtstart, end)] == [5, 17, 19, 31]
+        # Skipping ahead to a window must land on the same weeks
+        window_start = datetime(1997, 8, 18, tzinfo=BERLIN)
+        open_ended = RecurrenceRule("FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SU;WKST=SU")
+        assert [
+            o.day
+            for o in open_ended.occurrences(
+                dtstart, datetime(1997, 9, 1, tzinfo=BERLIN), window_start
+            )
+            if o >= window_start
+        ] == [19, 31]
+
+    def test_unsupported_parts(self):
+        """Test that unsupported rules raise ValueError."""
+        with pytest.raises(ValueError, match="Unsupported RRULE parts"):
+            RecurrenceRule("FREQ=DAILY;BYSETPOS=1")
+        with pytest.raises(ValueError, match="Unsupported RRULE frequency"):
+            RecurrenceRule("FREQ=HOURLY")
+
+    def test_yearly_byday_without_bymonth_is_unsupported(self):
+        """Test that yearly rules expanding across the year are left to the API."""
+        with pytest.raises(ValueError, match="without BYMONTH"):
+            RecurrenceRule("FREQ=YEARLY;BYDAY=MO")
+        with pytest.raises(ValueError, match="without BYMONTH"):
+            RecurrenceRule("FREQ=YEARLY;BYMONTHDAY=1")
+        assert RecurrenceRule("FREQ=YEARLY;BYMONTH=11;BYDAY=4TH").by_month == [11]
+
+
+class TestExpandMaster:
+    """Test expansion of recurring masters into instances."""
+
+    def test_keeps_local_time_across_dst(self):
+        """Test that a 09:00 Berlin series stays at 09:00 after DST starts."""
+        master = make_master(["RRULE:FREQ=WEEKLY"])
+
+        instances = expand_master(master, *window(27))
+
+        assert len(instances) == 1
+        assert instances[0]["start"]["dateTime"] == "2023-03-27T09:00:00+02:00"
+        assert instances[0]["end"]["dateTime"] == "2023-03-27T09:30:00+02:00"
+        assert instances[0]["id"] == "series_20230327T070000Z"
+        assert instances[0]["recurringEventId"] == "series"
+        assert "recurrence" not in instances[0]
+
+    def test_exdate_removes_occurrence(self):
+        """Test that excluded dates are skipped."""
+        master = make_master(
+            ["RRULE:FREQ=DAILY", "EXDATE;TZID=Europe/Berlin:20230307T090000"]
+        )
+
+        instances = expand_master(master, *window(6, days=3))
+
+        assert [i["start"]["dateTime"][:10] for i in instances] == [
+            "2023-03-06",
+            "2023-03-08",
+        ]
+
+
+class TestExpandItems:
+    """Test expansion of a full singleEvents=False listing."""
+
+    def test_overrides_and_one_off_events(self):
+        """Test moved and cancelled exceptions alongside one-off events."""
+        items = [
+            make_master(["RRULE:FREQ=DAILY"]),
+            {
+                "id": "series_20230307T080000Z",
+                "recurringEventId": "series",
+                "originalStartTime": {"dateTime": "2023-03-07T09:00:00+01:00"},
+                "summary": "Weekly Sync (moved)",
+                "start": {"dateTime": "2023-03-07T14:00:00+01:00"},
+                "end": {"dateTime": "2023-03-07T14:30:00+01:00"},
+            },
+            {
+                "id": "series_20230308T080000Z",
+                "recurringEventId": "series",
+                "originalStartTime": {"dateTime": "2023-03-08T09:00:00+01:00"},
+                "status": "cancelled",
+            },
+            {
+                "id": "lunch",
+                "summary": "Lunch",
+                "start": {"dateTime": "2023-03-07T12:00:00+01:00"},
+                "end": {"dateTime": "2023-03-07T13:00:00+01:00"},
+            },
+            {
+                "id": "later",
+                "summary": "Next month",
+                "start": {"dateTime": "2023-04-07T12:00:00+02:00"},
+                "end": {"dateTime": "2023-04-07T13:00:00+02:00"},
+            },
+        ]
+
+        result = expand_items(items, *window(7, days=2))
+
+        assert [item["id"] for item in result] == [
+            "lunch",
+            "series_20230307T080000Z",
+        ]
+
+
+class TestRecurringEventCache:
+    """Test the recurring listing cache."""
+
+    def test_covers_windows_inside_fetched_range(self):
+        """Test that windows inside a cached range are served from cache."""
+        cache = RecurringEventCache(horizon_days=7)
+        start, end = window(6)
+        fetch_start, fetch_end = cache.fetch_range(start, end)
+        cache.put("primary", fetch_start, fetch_end, [{"id": "a"}])
+
+        assert cache.get("primary", *window(10)) == [{"id": "a"}]
+        assert cache.get("primary", *window(20)) is None
+        assert cache.get("other", start, end) is None
+
+        cache.invalidate("primary")
+        assert cache.get("primary", start, end) is None
@@ -0,0 +1,211 @@
+import json
+import smtplib
+import time
+from unittest.mock import Mock, patch
+
+import httplib2
+import pytest
+from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+
+from src.deadlines import deadline_scope
+from src.delivery import DeliveryError
+from src.email_sender import EmailSender
+from src.ledger import SendLedger
+from src.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    is_transient,
+)
+
+
+def http_error(status, reason=None):
+    content = b"error"
+    if reason:
+        content = json.dumps(
+            {
+                "error": {
+                    "code": status,
+                    "message": reason,
+                    "errors": [{"reason": reason}],
+                }
+            }
+        ).encode("utf-8")
+    return HttpError(httplib2.Response({"status": status}), content)
+
+
+class TestIsTransient:
+    """Test the classification of provider errors."""
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            http_error(429),
+            http_error(503),
+            http_error(403, "rateLimitExceeded"),
+            DeliveryError("timed out"),
+            DeliveryError("busy", status_code=502),
+            smtplib.SMTPServerDisconnected("gone"),
+            smtplib.SMTPResponseException(421, b"try later"),
+            TimeoutError("slow"),
+            ConnectionResetError("reset"),
+        ],
+    )
+    def test_transient_errors(self, error):
+        """Test that rate limits, 5xx and network errors are retried."""
+        assert is_transient(error) is True
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            http_error(400),
+            http_error(404),
+            http_error(403, "forbidden"),
+            http_error(403),
+            RefreshError("invalid_grant"),
+            DeliveryError("bad address", status_code=422),
+            smtplib.SMTPRecipientsRefused({}),
+            smtplib.SMTPResponseException(550, b"no such user"),
+            ValueError("bug"),
+        ],
+    )
+    def test_permanent_errors(self, error):
+        """Test that auth and client errors are not retried."""
+        assert is_transient(error) is False
+
+
+@patch("src.resilience.time.sleep")
+class TestRetryPolicy:
+    """Test retries with backoff."""
+
+    def test_transient_failure_is_retried(self, mock_sleep):
+        """Test that a call succeeding on a later attempt returns its result."""
+        fn = Mock(side_effect=[http_error(503), TimeoutError(), "ok"])
+
+        assert RetryPolicy(max_attempts=3).call(fn) == "ok"
+        assert fn.call_count == 3
+        assert mock_sleep.call_count == 2
+
+    def test_permanent_failure_is_not_retried(self, mock_sleep):
+        """Test that client errors are raised at once."""
+        fn = Mock(side_effect=http_error(401))
+
+        with pytest.raises(HttpError):
+            RetryPolicy(max_attempts=3).call(fn)
+        fn.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_attempts_are_limited(self, mock_sleep):
+        """Test that the last transient error is raised after max_attempts."""
+        fn = Mock(side_effect=http_error(500))
+
+        with pytest.raises(HttpError):
+            RetryPolicy(max_attempts=2).call(fn)
+        assert fn.call_count == 2
+
+    def test_backoff_is_capped(self, mock_sleep):
+        """Test that backoff grows exponentially up to max_delay."""
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+
+        for attempt in range(1, 10):
+            assert 0 <= policy.backoff(attempt) <= min(5.0, 2 ** (attempt - 1))
+
+    def test_backoff_stops_at_deadline(self, mock_sleep):
+        """Test that retries do not sleep past the current deadline."""
+        fn = Mock(side_effect=[http_error(503), http_error(503), "ok"])
+        policy = RetryPolicy(base_delay=10.0, max_delay=10.0)
+
+        with patch("src.resilience.random.uniform", return_value=10.0):
+            with deadline_scope(time.time() + 2):
+                assert policy.call(fn) == "ok"
+            with deadline_scope(time.time() - 60):
+                fn.side_effect = [http_error(503), "ok"]
+                assert policy.call(fn) == "ok"
+
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        assert all(0 < delay <= 2 for delay in delays[:2])
+        assert delays[2] == 0
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def fail(self, breaker, times):
+        for _ in range(times):
+            breaker.before_call()
+            breaker.record_failure()
+
+    def test_opens_when_error_rate_spikes(self):
+        """Test that the breaker opens at the failure rate and fast-fails."""
+        breaker = CircuitBreaker("calendar", failure_rate=0.5, min_calls=4)
+        for _ in range(3):
+            breaker.record_success()
+        self.fail(breaker, 2)
+        assert breaker.state == "closed"
+
+        self.fail(breaker, 1)
+        assert breaker.state == "open"
+        assert breaker.opened == 1
+
+        fn = Mock()
+        with pytest.raises(CircuitOpenError) as excinfo:
+            RetryPolicy().call(fn, breaker)
+        fn.assert_not_called()
+        assert excinfo.value.provider == "calendar"
+        assert 0 < excinfo.value.retry_after <= 30
+        assert breaker.rejected == 1
+
+    def test_permanent_errors_do_not_open(self):
+        """Test that one user's auth failures do not trip the provider."""
+        breaker = CircuitBreaker("calendar", min_calls=2)
+
+        for _ in range(5):
+            with pytest.raises(RefreshError):
+                RetryPolicy().call(Mock(side_effect=RefreshError("bad")), breaker)
+
+        assert breaker.state == "closed"
+
+    def test_probe_after_cooldown(self):
+        """Test that one probe is let through after cooldown."""
+        breaker = CircuitBreaker("resend", min_calls=1, cooldown=0)
+        self.fail(breaker, 1)
+        assert breaker.state == "half_open"
+
+        breaker.before_call()
+        # Only one probe at a time
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        # A failed probe opens the circuit again
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        breaker.before_call()
+
+
+class TestEmailSenderBreaker:
+    """Test deliveries while the delivery circuit is open."""
+
+    def test_open_circuit_raises_and_releases_claim(self, tmp_path):
+        """Test that a rejected send is deferred, not recorded as failed."""
+        ledger = SendLedger(str(tmp_path / "ledger.db"))
+        breaker = CircuitBreaker("resend", min_calls=1)
+        sender = EmailSender(
+            "key", "digest@example.com", ledger=ledger, circuit_breaker=breaker
+        )
+        sender.backend = Mock()
+        sender.backend.send.side_effect = DeliveryError("timed out")
+
+        # The failure opens the circuit
+        assert sender.send_digest("user@example.com", "Digest") is False
+        with pytest.raises(CircuitOpenError):
+            sender.send_digest("user@example.com", "Digest")
+
+        assert sender.backend.send.call_count == 1
+        # The claim was released, so a later run may send
+        breaker.cooldown = 0
+        sender.backend.send.side_effect = None
+        sender.backend.send.return_value = "msg-1"
+        assert sender.send_digest("user@example.com", "Digest") is True
@@ -0,0 +1,144 @@
+import csv
+import json
+import time
+
+import pytest
+
+from src.roster import UserProfile, load_roster, validate_profiles
+
+
+def make_record(index=0, **overrides):
+    record = {
+        "email_recipient": f"user{index}@example.com",
+        "google_refresh_token": f"token-{index}",
+        "timezone": "Europe/London",
+        "digest_hour": 7,
+    }
+    record.update(overrides)
+    return record
+
+
+class TestLoadRoster:
+    """Test loading rosters from files."""
+
+    def test_load_json(self, tmp_path):
+        """Test loading a JSON roster."""
+        path = tmp_path / "roster.json"
+        path.write_text(json.dumps({"users": [make_record(0), make_record(1)]}))
+
+        profiles = load_roster(str(path))
+
+        assert [p.user_id for p in profiles] == [
+            "user0@example.com",
+            "user1@example.com",
+        ]
+        assert profiles[0].timezone == "Europe/London"
+        assert profiles[0].quiet_hours_start == 22
+
+    def test_load_csv_with_defaults(self, tmp_path):
+        """Test loading a CSV roster with defaults for missing settings."""
+        path = tmp_path / "roster.csv"
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(
+                f, fieldnames=["user_id", "email", "google_refresh_token", "timezone"]
+            )
+            writer.writeheader()
+            writer.writerow(
+                {
+                    "user_id": "u1",
+                    "email": "alice@example.com",
+                    "google_refresh_token": "token",
+                    "timezone": "",
+                }
+            )
+
+        profiles = load_roster(
+            str(path), defaults={"timezone": "America/New_York", "digest_hour": "8"}
+        )
+
+        assert profiles[0].user_id == "u1"
+        assert profiles[0].timezone == "America/New_York"
+        assert profiles[0].digest_hour == 8
+
+    def test_load_toml(self, tmp_path):
+        """Test loading a TOML roster."""
+        pytest.importorskip("tomllib")
+        path = tmp_path / "roster.toml"
+        path.write_text(
+            "[[users]]\n"
+            'email_recipient = "alice@example.com"\n'
+            'google_refresh_token = "token"\n'
+            "digest_hour = 6\n"
+        )
+
+        profiles = load_roster(str(path))
+
+        assert profiles[0].digest_hour == 6
+
+    def test_unsupported_format(self, tmp_path):
+        """Test that unknown roster formats raise ValueError."""
+        path = tmp_path / "roster.yaml"
+        path.write_text("")
+
+        with pytest.raises(ValueError, match="Unsupported roster format"):
+            load_roster(str(path))
+
+
+class TestValidateProfiles:
+    """Test bulk validation of roster entries."""
+
+    def test_reports_all_errors(self):
+        """Test that every invalid entry is reported at once."""
+        records = [
+            make_record(0, email_recipient="not-an-email"),
+            make_record(1, timezone="Invalid/Timezone"),
+            make_record(2, digest_hour=25),
+            make_record(3),
+            make_record(3),
+        ]
+
+        with pytest.raises(ValueError) as excinfo:
+            validate_profiles(records)
+
+        message = str(excinfo.value)
+        assert "entry 1: invalid email" in message
+        assert "entry 2: Invalid timezone" in message
+        assert "entry 3: Invalid hour value" in message
+        assert "entry 5: duplicate user_id" in message
+
+    def test_ten_thousand_profiles_load_quickly(self):
+        """Test that validating 10k profiles stays well under a second."""
+        zones = ["Europe/London", "America/New_York", "Asia/Tokyo", "UTC"]
+        records = [make_record(i, timezone=zones[i % 4]) for i in range(10000)]
+
+        started = time.perf_counter()
+        profiles = validate_profiles(records)
+        elapsed = time.perf_counter() - started
+
+        assert len(profiles) == 10000
+        assert elapsed < 1.0
+
+    def test_profiles_are_compact(self):
+        """Test that profiles have no per-instance dict."""
+        profile = validate_profiles([make_record()])[0]
+
+        assert not hasattr(profile, "__dict__")
+
+
+class TestUserProfile:
+    """Test UserProfile conversions."""
+
+    def test_config_roundtrip(self):
+        """Test building a user config on top of shared settings."""
+        profile = UserProfile(
+            user_id="u1",
+            email_recipient="alice@example.com",
+            google_refresh_token="token",
+            timezone="Europe/London",
+        )
+
+        config = profile.to_config({"sender_email": "digest@example.com"})
+
+        assert config["sender_email"] == "digest@example.com"
+        assert config["email_recipient"] == "alice@example.com"
+        assert UserProfile.from_config(config).user_id == "u1"
@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.calendar import Event
+from src.search import SearchIndex, build_match_query, main
+
+TZ = ZoneInfo("Europe/Berlin")
+
+
+def make_event(summary, day, attendees=None, description=None):
+    start = datetime(day.year, day.month, day.day, 10, tzinfo=TZ)
+    return Event(
+        summary=summary,
+        start=start,
+        end=start + timedelta(hours=1),
+        attendees=attendees,
+        description=description,
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    search_index = SearchIndex(str(tmp_path / "history.db"))
+    yield search_index
+    search_index.close()
+
+
+class TestBuildMatchQuery:
+    """Test free-text to FTS5 query conversion."""
+
+    def test_quotes_every_word(self):
+        """Test that words are quoted and combined with AND."""
+        assert build_match_query('budget OR "alice"*') == (
+            '"budget" AND "OR" AND "alice"'
+        )
+
+    def test_empty_query(self):
+        """Test that queries without words match nothing."""
+        assert build_match_query("  ?! ") is None
+
+
+class TestSearchIndex:
+    """Test the event search index."""
+
+    def test_search_returns_most_recent_first(self, index):
+        """Test that all words must match and recent events come first."""
+        first = date(2023, 6, 19)
+        second = date(2023, 6, 26)
+        index.index_day(
+            "u1",
+            first,
+            [
+                make_event("Budget review", first, ["alice@example.com"]),
+                make_event("Budget review", first, ["bob@example.com"]),
+            ],
+        )
+        index.index_day(
+            "u1",
+            second,
+            [make_event("Sync", second, ["alice@example.com"], "Q3 budget")],
+        )
+
+        hits = index.search("u1", "alice budget")
+
+        assert [(hit.day, hit.summary) for hit in hits] == [
+            (second, "Sync"),
+            (first, "Budget review"),
+        ]
+        assert hits[0].attendees == ["alice@example.com"]
+        assert hits[0].start == datetime(2023, 6, 26, 10, tzinfo=TZ)
+
+    def test_search_is_scoped_to_user(self, index):
+        """Test that other users' events are never returned."""
+        day = date(2023, 6, 19)
+        index.index_day("u1", day, [make_event("Offsite", day)])
+        index.index_day("u2", day, [make_event("Offsite", day)])
+
+        assert len(index.search("u1", "offsite")) == 1
+        assert index.search("u3", "offsite") == []
+
+    def test_reindexing_a_day_replaces_entries(self, index):
+        """Test that rerunning a day does not leave stale entries."""
+        day = date(2023, 6, 19)
+        index.index_day("u1", day, [make_event("Old title", day)])
+        index.index_day("u1", day, [make_event("New title", day)])
+
+        assert index.search("u1", "old") == []
+        assert [hit.summary for hit in index.search("u1", "title")] == ["New title"]
+
+
+class TestSearchMain:
+    """Test the search command line."""
+
+    def test_main_prints_hits(self, tmp_path, capsys):
+        """Test that matching events are printed."""
+        db_path = str(tmp_path / "history.db")
+        day = date(2023, 6, 19)
+        search_index = SearchIndex(db_path)
+        search_index.index_day(
+            "u1", day, [make_event("Budget review", day, ["alice@example.com"])]
+        )
+        search_index.close()
+
+        assert main(["budget", "--user", "u1", "--history-db", db_path]) == 0
+        output = capsys.readouterr().out
+        assert "Mon 2023-06-19 10:00  Budget review" in output
+        assert "with alice@example.com" in output
+
+        assert main(["missing", "--user", "u1", "--history-db", db_path]) == 1
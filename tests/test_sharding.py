@@ -0,0 +1,101 @@
+import time
+from collections import Counter
+
+import pytest
+
+from src.sharding import ClaimTable, ShardRing, parse_shard
+
+
+class TestParseShard:
+    """Test shard specification parsing."""
+
+    def test_parse_shard_valid(self):
+        """Test parsing valid shard specifications."""
+        assert parse_shard("0/1") == (0, 1)
+        assert parse_shard("2/4") == (2, 4)
+
+    def test_parse_shard_invalid(self):
+        """Test that invalid shard specifications raise ValueError."""
+        for spec in ["4/4", "-1/2", "1/0", "a/b", "1", ""]:
+            with pytest.raises(ValueError, match="Invalid shard specification"):
+                parse_shard(spec)
+
+
+class TestShardRing:
+    """Test consistent hashing of users onto shards."""
+
+    def test_owner_is_deterministic_and_balanced(self):
+        """Test that every shard gets a fair share of users."""
+        ring = ShardRing(4)
+        users = [f"user{i}@example.com" for i in range(4000)]
+
+        owners = [ring.owner(user) for user in users]
+
+        other_ring = ShardRing(4)
+        assert owners == [other_ring.owner(user) for user in users]
+        counts = Counter(owners)
+        assert set(counts) == {0, 1, 2, 3}
+        assert min(counts.values()) > 600
+
+    def test_dead_shard_users_move_to_live_shards(self):
+        """Test that only the dead shard's users are reassigned."""
+        ring = ShardRing(4)
+        users = [f"user{i}@example.com" for i in range(1000)]
+
+        for user in users:
+            before = ring.owner(user)
+            after = ring.owner(user, live_shards={0, 1, 3})
+            if before == 2:
+                assert after in {0, 1, 3}
+            else:
+                assert after == before
+
+    def test_no_live_shards(self):
+        """Test that an empty live set raises ValueError."""
+        with pytest.raises(ValueError, match="No live shards"):
+            ShardRing(2).owner("user@example.com", live_shards=set())
+
+
+class TestClaimTable:
+    """Test the SQLite claim table."""
+
+    def test_claim_is_exclusive(self, tmp_path):
+        """Test that a second runner cannot claim a held user."""
+        db_path = str(tmp_path / "claims.db")
+        first = ClaimTable(db_path)
+        second = ClaimTable(db_path)
+
+        assert first.claim("user@example.com", "2023-06-26", "runner-a") is True
+        assert second.claim("user@example.com", "2023-06-26", "runner-b") is False
+        assert second.claim("user@example.com", "2023-06-27", "runner-b") is True
+
+    def test_completed_claim_is_never_repeated(self, tmp_path):
+        """Test that a completed run cannot be claimed again."""
+        claims = ClaimTable(str(tmp_path / "claims.db"))
+        claims.claim("user@example.com", "2023-06-26", "runner-a")
+        claims.complete("user@example.com", "2023-06-26")
+
+        assert claims.claim("user@example.com", "2023-06-26", "runner-a") is False
+        assert claims.claim("user@example.com", "2023-06-26", "runner-b") is False
+
+    def test_expired_and_released_claims_can_be_taken(self, tmp_path):
+        """Test takeover of expired claims and retry of released claims."""
+        claims = ClaimTable(str(tmp_path / "claims.db"), lease_seconds=0)
+        claims.claim("user@example.com", "2023-06-26", "runner-a")
+        assert claims.claim("user@example.com", "2023-06-26", "runner-b") is True
+
+        claims = ClaimTable(str(tmp_path / "claims.db"))
+        claims.release("user@example.com", "2023-06-26", "runner-b")
+        assert claims.claim("user@example.com", "2023-06-26", "runner-c") is True
+
+    def test_live_shards(self, tmp_path):
+        """Test shard heartbeats within the lease window."""
+        claims = ClaimTable(str(tmp_path / "claims.db"), lease_seconds=60)
+        claims.heartbeat(0)
+        claims.heartbeat(2)
+        claims._conn.execute(
+            "UPDATE shards SET heartbeat_at = ? WHERE shard_index = 2",
+            (time.time() - 120,),
+        )
+
+        assert claims.live_shards() == {0}
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timezone
+
+from src.calendar import Event
+from src.snapshot import SnapshotStore, diff_events
+
+
+def make_event(event_id, etag, hour=9, summary="Team Standup"):
+    return Event(
+        summary=summary,
+        start=datetime(2023, 6, 26, hour, 0, tzinfo=timezone.utc),
+        end=datetime(2023, 6, 26, hour, 30, tzinfo=timezone.utc),
+        event_id=event_id,
+        etag=etag,
+    )
+
+
+class TestDiffEvents:
+    """Test the snapshot diff engine."""
+
+    def test_diff_detects_all_change_kinds(self):
+        """Test added, moved, updated and cancelled detection."""
+        previous = [
+            make_event("same", "1"),
+            make_event("moved", "1", hour=10),
+            make_event("renamed", "1", hour=11),
+            make_event("gone", "1", hour=12),
+        ]
+        current = [
+            make_event("same", "1"),
+            make_event("moved", "2", hour=15),
+            make_event("renamed", "2", hour=11, summary="Renamed"),
+            make_event("new", "1", hour=16),
+        ]
+
+        diff = diff_events(previous, current)
+
+        assert [e.event_id for e in diff.added] == ["new"]
+        assert [(old.start.hour, new.start.hour) for old, new in diff.moved] == [
+            (10, 15)
+        ]
+        assert [e.summary for e in diff.updated] == ["Renamed"]
+        assert [e.event_id for e in diff.cancelled] == ["gone"]
+
+    def test_diff_identical_is_empty(self):
+        """Test that identical event sets produce an empty diff."""
+        events = [make_event("a", "1"), make_event("b", "1", hour=10)]
+
+        assert diff_events(events, list(events)).is_empty() is True
+
+    def test_diff_without_ids_uses_fallback_key(self):
+        """Test that events without ids are matched by summary and start."""
+        previous = [make_event(None, None)]
+        current = [make_event(None, None)]
+
+        assert diff_events(previous, current).is_empty() is True
+
+
+class TestSnapshotStore:
+    """Test SnapshotStore persistence."""
+
+    def test_save_and_load(self, tmp_path):
+        """Test that a saved snapshot round-trips."""
+        store = SnapshotStore(str(tmp_path))
+        store.save("test@example.com", [make_event("a", "etag-1")])
+
+        events = store.load("test@example.com")
+
+        assert len(events) == 1
+        assert events[0].event_id == "a"
+        assert events[0].etag == "etag-1"
+        assert events[0].start == datetime(2023, 6, 26, 9, 0, tzinfo=timezone.utc)
+
+    def test_load_missing_returns_none(self, tmp_path):
+        """Test loading a user without a snapshot."""
+        store = SnapshotStore(str(tmp_path))
+
+        assert store.load("unknown@example.com") is None
+
+    def test_snapshot_of_another_day_is_ignored(self, tmp_path):
+        """Test that a new local day starts without a snapshot."""
+        store = SnapshotStore(str(tmp_path))
+        store.save("test@example.com", [make_event("a", "etag-1")], date(2023, 6, 26))
+
+        assert len(store.load("test@example.com", date(2023, 6, 26))) == 1
+        assert store.load("test@example.com", date(2023, 6, 27)) is None
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.calendar import Event
+from src.staging import StagingStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    staging = StagingStore(str(tmp_path / "staging.db"))
+    yield staging
+    staging.close()
+
+
+def make_events():
+    return [
+        Event(
+            summary="Standup",
+            start=datetime(2023, 6, 26, 9, 0, tzinfo=timezone.utc),
+            end=datetime(2023, 6, 26, 9, 15, tzinfo=timezone.utc),
+            attendees=["alice@example.com"],
+            event_id="evt1",
+        )
+    ]
+
+
+class TestStagingStore:
+    """Test the staging store for prepared digests."""
+
+    def test_round_trip(self, store):
+        """Test that a staged digest comes back with its events."""
+        store.put("u1", "2023-06-26", "Rendered", make_events(), 1687750000.0)
+
+        staged = store.get("u1", "2023-06-26")
+
+        assert staged.content == "Rendered"
+        assert staged.prepared_at == 1687750000.0
+        assert [e.to_dict() for e in staged.events] == [
+            e.to_dict() for e in make_events()
+        ]
+        assert store.get("u1", "2023-06-27") is None
+        assert store.get("u2", "2023-06-26") is None
+
+    def test_put_drops_older_days(self, store):
+        """Test that a user's undelivered digests of past days are removed."""
+        store.put("u1", "2023-06-25", "Old", [], 1.0)
+        store.put("u2", "2023-06-25", "Other user", [], 1.0)
+        store.put("u1", "2023-06-26", "New", [], 2.0)
+
+        assert store.get("u1", "2023-06-25") is None
+        assert store.get("u2", "2023-06-25").content == "Other user"
+
+    def test_discard(self, store):
+        """Test that a delivered digest is removed."""
+        store.put("u1", "2023-06-26", "Rendered", [], 1.0)
+
+        store.discard("u1", "2023-06-26")
+
+        assert store.get("u1", "2023-06-26") is None
@@ -0,0 +1,77 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from src.timezones import LocalDay, day_bounds, get_timezone, today_bounds
+
+
+class TestTimezones:
+    """Test the zoneinfo timezone backend."""
+
+    def test_get_timezone_is_cached(self):
+        """Test that timezone objects are shared across lookups."""
+        assert get_timezone("Europe/London") is get_timezone("Europe/London")
+
+    def test_get_timezone_invalid(self):
+        """Test that invalid timezone strings raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid timezone"):
+            get_timezone("Invalid/Timezone")
+        with pytest.raises(ValueError, match="Invalid timezone"):
+            get_timezone("")
+
+    def test_day_bounds_regular_day(self):
+        """Test the bounds of a day without DST transition."""
+        start, end = day_bounds(get_timezone("Europe/Berlin"), date(2023, 6, 26))
+
+        assert start.astimezone(timezone.utc) == datetime(
+            2023, 6, 25, 22, 0, tzinfo=timezone.utc
+        )
+        assert end - start == timedelta(hours=24)
+
+    def test_day_bounds_dst_transitions(self):
+        """Test that DST days are 23 and 25 hours long."""
+        london = get_timezone("Europe/London")
+
+        spring_start, spring_end = day_bounds(london, date(2023, 3, 26))
+        autumn_start, autumn_end = day_bounds(london, date(2023, 10, 29))
+
+        assert spring_end.astimezone(timezone.utc) - spring_start.astimezone(
+            timezone.utc
+        ) == timedelta(hours=23)
+        assert autumn_end.astimezone(timezone.utc) - autumn_start.astimezone(
+            timezone.utc
+        ) == timedelta(hours=25)
+
+    def test_today_bounds_uses_local_date(self):
+        """Test that today is computed in the target timezone."""
+        tokyo = get_timezone("Asia/Tokyo")
+        now = datetime(2023, 6, 26, 20, 0, tzinfo=timezone.utc)  # 05:00 in Tokyo
+
+        start, end = today_bounds(tokyo, now)
+
+        assert start.date() == date(2023, 6, 27)
+        assert start.utcoffset() == timedelta(hours=9)
+        assert end.date() == date(2023, 6, 28)
+
+    def test_local_day_matches_today_bounds(self):
+        """Test that a LocalDay carries the local date and its bounds."""
+        now = datetime(2023, 6, 26, 20, 0, tzinfo=timezone.utc)
+
+        day = LocalDay("Asia/Tokyo", now)
+
+        assert day.date == date(2023, 6, 27)
+        assert (day.start, day.end) == today_bounds(get_timezone("Asia/Tokyo"), now)
+
+    def test_local_day_at_hour(self):
+        """Test that hours of a LocalDay are local wall-clock times."""
+        now = datetime(2023, 3, 26, 12, 0, tzinfo=timezone.utc)
+
+        day = LocalDay("Europe/London", now)
+
+        # Clocks went forward at 01:00 UTC that day
+        assert day.at(0).astimezone(timezone.utc) == datetime(
+            2023, 3, 26, 0, 0, tzinfo=timezone.utc
+        )
+        assert day.at(9).astimezone(timezone.utc) == datetime(
+            2023, 3, 26, 8, 0, tzinfo=timezone.utc
+        )
@@ -9,6 +9,7 @@ import pytz
 from src.utils import (
     get_env_config,
     is_quiet_hours,
+    parse_bool,
     parse_time_string,
     validate_timezone,
 )
@@ -82,6 +83,15 @@ class TestUtils:
         with pytest.raises(ValueError, match="Invalid timezone"):
             validate_timezone("Invalid/Timezone")
 
+    def test_parse_bool(self):
+        """Test parsing boolean flags."""
+        assert parse_bool("true") is True
+        assert parse_bool("1") is True
+        assert parse_bool("No") is False
+        assert parse_bool("") is False
+        with pytest.raises(ValueError, match="Invalid boolean value"):
+            parse_bool("maybe")
+
     def test_parse_time_string_valid(self):
         """Test parsing valid time strings."""
         assert parse_time_string("07") == time(7, 0)
@@ -131,3 +141,29 @@ class TestUtils:
 
         # Exactly at end time (7:00 is not in quiet hours, it's the end)
         assert is_quiet_hours(datetime(2023, 1, 1, 7, 0), 22, 7) is False
+
+    def test_get_env_config_smtp_backend(self):
+        """Test that the SMTP backend needs SMTP_HOST instead of RESEND_API_KEY."""
+        env = {
+            "GOOGLE_REFRESH_TOKEN": "test_token",
+            "GOOGLE_CLIENT_ID": "test_id",
+            "GOOGLE_CLIENT_SECRET": "test_secret",
+            "EMAIL_BACKEND": "smtp",
+            "TIMEZONE": "Europe/London",
+            "DIGEST_HOUR": "7",
+            "QUIET_HOURS_START": "22",
+            "QUIET_HOURS_END": "07",
+            "EMAIL_RECIPIENT": "test@example.com",
+            "SENDER_EMAIL": "test@example.com",
+        }
+        with patch.dict(os.environ, env, clear=True):
+            with pytest.raises(ValueError, match="SMTP_HOST"):
+                get_env_config()
+
+        with patch.dict(
+            os.environ, dict(env, SMTP_HOST="smtp.example.com", SMTP_PORT="2525")
+        ):
+            config = get_env_config()
+            assert config["email_backend"] == "smtp"
+            assert config["smtp_host"] == "smtp.example.com"
+            assert config["smtp_port"] == 2525